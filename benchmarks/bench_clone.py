@@ -0,0 +1,60 @@
+"""
+So sánh nhân bản N todo: từng bản (get_by_id + create, kiểu cũ) với clone_many (1 câu INSERT ... SELECT).
+Các bản sao được xoá mềm sau mỗi lần đo.
+
+Chạy với DB trong .env (cần có ít nhất 1 todo):
+    python benchmarks/bench_clone.py --copies 10,100,500
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import update
+
+from database.db import SessionLocal
+from modules.todo.todo_model import TodoModel
+from modules.todo.todo_service import todo_service
+from modules.user.user_model import UserModel  # noqa: F401  (bảng users cho foreign key todo.owner_id)
+
+
+def legacy_clone(db, obj_id):
+    src = todo_service.get_by_id(db, obj_id)
+    payload = {col: getattr(src, col) for col in todo_service._writable_columns()}
+    payload["owner_id"] = src.owner_id
+    return todo_service.create(db, payload)
+
+
+def cleanup(db, ids):
+    db.execute(update(TodoModel).where(TodoModel.todo_id.in_(ids)).values(IsDeleted=True))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", default="10,100,500")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        first = todo_service.get_page_rows(db, 0, 1)
+        if not first:
+            sys.exit("Bảng todo đang trống")
+        obj_id = first[0].todo_id
+        print(f"{'copies':>8}{'legacy ms':>12}{'bulk ms':>10}")
+        for n in (int(s) for s in args.copies.split(",")):
+            start = time.perf_counter()
+            ids = [legacy_clone(db, obj_id).todo_id for _ in range(n)]
+            legacy_ms = (time.perf_counter() - start) * 1e3
+            cleanup(db, ids)
+
+            start = time.perf_counter()
+            ids = [o.todo_id for o in todo_service.clone_many(db, [obj_id] * n)]
+            bulk_ms = (time.perf_counter() - start) * 1e3
+            cleanup(db, ids)
+            print(f"{n:>8}{legacy_ms:>12.1f}{bulk_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
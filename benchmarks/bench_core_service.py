@@ -0,0 +1,72 @@
+"""
+Micro-benchmark chi phí mỗi lần gọi CoreService: query dựng lại mỗi lần (kiểu cũ)
+so với statement dựng sẵn + bind param.
+
+Chạy với DB trong .env (cần có dữ liệu trong bảng todo):
+    python benchmarks/bench_core_service.py --n 2000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import or_
+
+from database.db import SessionLocal
+from modules.todo.todo_model import TodoModel
+from modules.todo.todo_service import todo_service
+
+
+def legacy_get_by_id(db, obj_id):
+    return db.query(TodoModel).filter(TodoModel.todo_id == obj_id, TodoModel.IsDeleted == False).first()
+
+
+def legacy_get_page(db, skip, limit):
+    return db.query(TodoModel).filter(TodoModel.IsDeleted == False).offset(skip).limit(limit).all()
+
+
+def legacy_search(db, keyword, fields):
+    filters = [getattr(TodoModel, f).ilike(f"%{keyword}%") for f in fields]
+    return db.query(TodoModel).filter(TodoModel.IsDeleted == False).filter(or_(*filters)).all()
+
+
+def timeit(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=2000)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        first = todo_service.get_page(db, 0, 1)
+        obj_id = first[0].todo_id if first else 1
+        cases = [
+            ("get_by_id", lambda: legacy_get_by_id(db, obj_id), lambda: todo_service.get_by_id(db, obj_id)),
+            ("get_page", lambda: legacy_get_page(db, 0, 10), lambda: todo_service.get_page(db, 0, 10)),
+            ("search", lambda: legacy_search(db, "a", ["name", "description"]),
+             lambda: todo_service.search(db, "a", ["name", "description"])),
+        ]
+        print(f"{'case':<12}{'variant':<10}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}")
+        for name, legacy, cached in cases:
+            # warm-up: compile cache + prepared statement phía server
+            timeit(legacy, 50)
+            timeit(cached, 50)
+            for variant, fn in (("legacy", legacy), ("cached", cached)):
+                mean, p50, p99 = timeit(fn, args.n)
+                print(f"{name:<12}{variant:<10}{mean:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+                db.expunge_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+So sánh đường ORM (get_page) với chế độ chỉ đọc (get_page_rows) của CoreService:
+thời gian mỗi trang (query + chuyển sang Pydantic) và bộ nhớ đỉnh.
+
+Dữ liệu seed được flush trong transaction rồi rollback, không để lại gì trong DB:
+    python benchmarks/bench_readonly_rows.py --seed 5000 --sizes 10,100,1000
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database.db import SessionLocal
+from modules.todo.todo_model import TodoModel
+from modules.todo.todo_schema import TodoOut
+from modules.todo.todo_service import todo_service
+
+
+def run(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return statistics.median(samples)
+
+
+def peak_kib(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=5000)
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        deadline = datetime.datetime.now(datetime.timezone.utc)
+        db.add_all(
+            TodoModel(name=f"bench {i}", description="x" * 64, complete=False, deadline=deadline)
+            for i in range(args.seed)
+        )
+        db.flush()
+        db.expunge_all()
+
+        def orm_page(size):
+            items = todo_service.get_page(db, 0, size)
+            result = [TodoOut.model_validate(i) for i in items]
+            db.expunge_all()  # route thật dùng session mới cho mỗi request
+            return result
+
+        def rows_page(size):
+            return [TodoOut.model_validate(i) for i in todo_service.get_page_rows(db, 0, size)]
+
+        print(f"{'size':>6}{'variant':>9}{'median ms':>11}{'peak KiB':>10}")
+        for size in (int(s) for s in args.sizes.split(",")):
+            for variant, fn in (("orm", orm_page), ("rows", rows_page)):
+                fn(size)  # warm-up
+                ms = run(lambda: fn(size), args.repeat)
+                kib = peak_kib(lambda: fn(size))
+                print(f"{size:>6}{variant:>9}{ms:>11.2f}{kib:>10.0f}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
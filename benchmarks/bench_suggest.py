@@ -0,0 +1,54 @@
+"""
+Đo thời gian gợi ý theo tiền tố của TodoSuggestIndex (index trong bộ nhớ, không cần DB)
+với số todo mỗi user khác nhau:
+    python benchmarks/bench_suggest.py --sizes 100,10000,100000
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.todo.todo_suggest import TodoSuggestIndex
+
+
+class FakeTodo:
+    __slots__ = ("todo_id", "owner_id", "name", "IsDeleted")
+
+    def __init__(self, todo_id, owner_id, name):
+        self.todo_id, self.owner_id, self.name, self.IsDeleted = todo_id, owner_id, name, False
+
+
+def random_name(rng):
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))) for _ in range(3))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,10000,100000")
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'todos':>8}{'build ms':>10}{'suggest us':>12}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        index = TodoSuggestIndex(max_entries=size + 1, rebuild_seconds=3600)
+        index.ready = True
+        start = time.perf_counter()
+        for i in range(size):
+            index.on_write("created", FakeTodo(i, 1, random_name(rng)))
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        prefixes = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 3))) for _ in range(args.queries)]
+        start = time.perf_counter()
+        for prefix in prefixes:
+            index.suggest(None, 1, prefix, 10)
+        per_query_us = (time.perf_counter() - start) / len(prefixes) * 1e6
+        print(f"{size:>8}{build_ms:>10.1f}{per_query_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
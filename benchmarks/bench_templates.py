@@ -0,0 +1,72 @@
+"""
+Đo thời gian render trang danh sách todo (index.html) theo kích thước trang:
+  - default: Jinja2Templates mặc định, render cả trang mỗi lần;
+  - cached:  environment production + fragment cache cho từng dòng (trạng thái ấm);
+  - ttfb:    thời gian tới đoạn HTML đầu tiên khi render dạng stream.
+
+Không cần DB, dữ liệu là DTO giả lập:
+    python benchmarks/bench_templates.py --sizes 10,100,1000
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+
+from modules.todo.todo_service import todo_service
+from modules.todo.view.controller import BASE_DIR, render_row, templates
+
+
+def make_rows(n):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    row_class = todo_service.row_class
+    values = {key: None for key in todo_service.row_keys}
+    rows = []
+    for i in range(n):
+        values.update(todo_id=i, name=f"todo {i}", description="x" * 64, complete=i % 3 == 0,
+                      deadline=now, UpdatedAt=now, IsDeleted=False, IsActive=True, CreatedAt=now)
+        rows.append(row_class(*(values[k] for k in todo_service.row_keys)))
+    return rows
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    default_env = Jinja2Templates(directory=str(BASE_DIR / "templates")).env
+    default_tpl = default_env.get_template("index.html")
+    default_row = default_env.get_template("_row.html")
+    prod_tpl = templates.get_template("index.html")
+
+    print(f"{'size':>6}{'default ms':>12}{'cached ms':>11}{'ttfb ms':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        rows = make_rows(size)
+        ctx = {"items": rows, "q": None, "page": 1, "size": size}
+        default = median_ms(
+            lambda: default_tpl.render(**ctx, render_row=lambda t: Markup(default_row.render(t=t))), args.repeat
+        )
+        prod_tpl.render(**ctx, render_row=render_row)  # làm ấm fragment cache
+        cached = median_ms(lambda: prod_tpl.render(**ctx, render_row=render_row), args.repeat)
+        ttfb = median_ms(lambda: next(prod_tpl.generate(**ctx, render_row=render_row)), args.repeat)
+        print(f"{size:>6}{default:>12.2f}{cached:>11.2f}{ttfb:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,140 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _env_bool(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
 class Settings(BaseModel):
     DB_HOST: str = os.getenv("DB_HOST")
     DB_PORT: str = os.getenv("DB_PORT")
     DB_USER: str = os.getenv("DB_USER")
     DB_PASS: str = os.getenv("DB_PASS")
     DB_NAME: str = os.getenv("DB_NAME")
+    # psycopg tự PREPARE statement phía server sau N lần chạy; "none" để tắt (vd khi dùng pgbouncer transaction mode)
+    DB_PREPARE_THRESHOLD: int | None = (
+        None if os.getenv("DB_PREPARE_THRESHOLD", "5").lower() == "none" else int(os.getenv("DB_PREPARE_THRESHOLD", "5"))
+    )
+
+    # --- Server (serve.py) ---
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    LOOP: str = os.getenv("LOOP", "auto")          # auto | uvloop | asyncio
+    HTTP: str = os.getenv("HTTP", "auto")          # auto | httptools | h11
+    KEEPALIVE_SECONDS: int = int(os.getenv("KEEPALIVE_SECONDS", "5"))
+    BACKLOG: int = int(os.getenv("BACKLOG", "2048"))
+    GRACEFUL_TIMEOUT_SECONDS: int = int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30"))
+    WORKER_TIMEOUT_SECONDS: int = int(os.getenv("WORKER_TIMEOUT_SECONDS", "60"))
+
+    # --- Admission control / load shedding ---
+    ADMISSION_ENABLED: bool = _env_bool("ADMISSION_ENABLED", "true")
+    ADMISSION_BY_ID_LIMIT: int = int(os.getenv("ADMISSION_BY_ID_LIMIT", "16"))
+    ADMISSION_BY_ID_QUEUE: int = int(os.getenv("ADMISSION_BY_ID_QUEUE", "64"))
+    ADMISSION_BULK_LIMIT: int = int(os.getenv("ADMISSION_BULK_LIMIT", "8"))
+    ADMISSION_BULK_QUEUE: int = int(os.getenv("ADMISSION_BULK_QUEUE", "16"))
+    ADMISSION_WRITE_LIMIT: int = int(os.getenv("ADMISSION_WRITE_LIMIT", "8"))
+    ADMISSION_WRITE_QUEUE: int = int(os.getenv("ADMISSION_WRITE_QUEUE", "32"))
+    ADMISSION_MAX_WAIT_MS: int = int(os.getenv("ADMISSION_MAX_WAIT_MS", "500"))
+    ADMISSION_RETRY_AFTER_SECONDS: int = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+    LOGIN_RATE_PER_MINUTE: int = int(os.getenv("LOGIN_RATE_PER_MINUTE", "10"))
+    LOGIN_BURST: int = int(os.getenv("LOGIN_BURST", "5"))
+
+    # --- Idempotency-Key ---
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_WAIT_SECONDS: float = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+    # Lease của dòng "pending": worker chết giữa chừng thì sau thời gian này key được nhận lại (mặc định 3 x WORKER_TIMEOUT)
+    IDEMPOTENCY_LEASE_SECONDS: int = int(
+        os.getenv("IDEMPOTENCY_LEASE_SECONDS", str(3 * int(os.getenv("WORKER_TIMEOUT_SECONDS", "60"))))
+    )
+
+    # --- Cookie phiên cho trang HTML (/auths/view/login) ---
+    AUTH_COOKIE_SECURE: bool = _env_bool("AUTH_COOKIE_SECURE", "false")   # true khi chạy sau HTTPS
+
+    # --- Request coalescing (single-flight) cho các route đọc nóng ---
+    SINGLEFLIGHT_ENABLED: bool = _env_bool("SINGLEFLIGHT_ENABLED", "true")
+    SINGLEFLIGHT_WAIT_MS: int = int(os.getenv("SINGLEFLIGHT_WAIT_MS", "2000"))
+
+    # --- Activity log (lịch sử thay đổi, ghi write-behind) ---
+    ACTIVITY_LOG_ENABLED: bool = _env_bool("ACTIVITY_LOG_ENABLED", "true")
+    ACTIVITY_LOG_ENTITIES: str = os.getenv("ACTIVITY_LOG_ENTITIES", "*")          # vd "todo,users"
+    ACTIVITY_LOG_EXCLUDE_FIELDS: str = os.getenv("ACTIVITY_LOG_EXCLUDE_FIELDS", "password")
+    ACTIVITY_LOG_DURABILITY: str = os.getenv("ACTIVITY_LOG_DURABILITY", "async")  # async | commit
+    ACTIVITY_LOG_WRITER: str = os.getenv("ACTIVITY_LOG_WRITER", "copy")           # copy | insert
+    ACTIVITY_LOG_MAX_QUEUE: int = int(os.getenv("ACTIVITY_LOG_MAX_QUEUE", "10000"))
+    ACTIVITY_LOG_BATCH_SIZE: int = int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", "500"))
+    ACTIVITY_LOG_FLUSH_MS: float = float(os.getenv("ACTIVITY_LOG_FLUSH_MS", "500"))
+    ACTIVITY_LOG_BLOCK_MS: float = float(os.getenv("ACTIVITY_LOG_BLOCK_MS", "50"))
+
+    # --- Bulk clone (POST /api/<module>/clone) ---
+    CLONE_MAX_COPIES: int = int(os.getenv("CLONE_MAX_COPIES", "1000"))
+
+    # --- Tổng số record cho phân trang ---
+    COUNT_EXACT_THRESHOLD: int = int(os.getenv("COUNT_EXACT_THRESHOLD", "10000"))
+    COUNT_CACHE_TTL_SECONDS: int = int(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+
+    # --- Jinja templates ---
+    TEMPLATE_AUTO_RELOAD: bool = _env_bool("DEBUG")
+    TEMPLATE_CACHE_DIR: str | None = os.getenv("TEMPLATE_CACHE_DIR")
+    TEMPLATE_FRAGMENT_CACHE_SIZE: int = int(os.getenv("TEMPLATE_FRAGMENT_CACHE_SIZE", "5000"))
+    TEMPLATE_STREAM_THRESHOLD: int = int(os.getenv("TEMPLATE_STREAM_THRESHOLD", "50"))
+
+    # --- Deadline scheduler ---
+    SCHEDULER_ENABLED: bool = _env_bool("SCHEDULER_ENABLED", "false")
+    SCHEDULER_SINK: str = os.getenv("SCHEDULER_SINK", "log")  # log | webhook | sse
+    SCHEDULER_WEBHOOK_URL: str | None = os.getenv("SCHEDULER_WEBHOOK_URL")
+    SCHEDULER_LOOKAHEAD_SECONDS: int = int(os.getenv("SCHEDULER_LOOKAHEAD_SECONDS", "3600"))
+    SCHEDULER_REFRESH_SECONDS: int = int(os.getenv("SCHEDULER_REFRESH_SECONDS", "60"))
+
+    # --- Todo stats ---
+    STATS_MAX_STALENESS_SECONDS: int = int(os.getenv("STATS_MAX_STALENESS_SECONDS", "30"))
+    STATS_REFRESH_ENABLED: bool = _env_bool("STATS_REFRESH_ENABLED", "true")   # thread nền refresh todo_stats
+    STATS_REFRESH_INTERVAL_SECONDS: float = float(os.getenv("STATS_REFRESH_INTERVAL_SECONDS", "10"))  # < max staleness
+
+    # --- Gợi ý tên todo (/api/todo/suggest) ---
+    SUGGEST_ENABLED: bool = _env_bool("SUGGEST_ENABLED", "true")
+    SUGGEST_MAX_ENTRIES: int = int(os.getenv("SUGGEST_MAX_ENTRIES", "100000"))
+    SUGGEST_REBUILD_SECONDS: float = float(os.getenv("SUGGEST_REBUILD_SECONDS", "300"))
+
+    # --- Query monitor (slow query / N+1) ---
+    QUERY_MONITOR_ENABLED: bool = _env_bool("QUERY_MONITOR_ENABLED", "true")
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "200"))
+    SLOW_QUERY_LOG_SIZE: int = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+    # Tỉ lệ slow query (chỉ SELECT) được chạy lại với EXPLAIN (ANALYZE, BUFFERS); 0 để tắt
+    EXPLAIN_SAMPLE_RATE: float = float(os.getenv("EXPLAIN_SAMPLE_RATE", "0.1"))
+    EXPLAIN_MIN_INTERVAL_SECONDS: int = int(os.getenv("EXPLAIN_MIN_INTERVAL_SECONDS", "300"))
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+    # --- Health / readiness (/healthz, /readyz) ---
+    HEALTH_CHECK_INTERVAL_SECONDS: float = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "5"))
+    HEALTH_DB_TIMEOUT_SECONDS: int = int(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", "2"))
+    HEALTH_MAX_POOL_SATURATION: float = float(os.getenv("HEALTH_MAX_POOL_SATURATION", "0.95"))
+    HEALTH_MAX_REPLICATION_LAG_SECONDS: float = float(os.getenv("HEALTH_MAX_REPLICATION_LAG_SECONDS", "30"))
+
+    # --- Sampling profiler (xem /admin/profiler) ---
+    PROFILER_ENABLED: bool = _env_bool("PROFILER_ENABLED")
+    PROFILER_ROUTES: str = os.getenv("PROFILER_ROUTES", "")   # vd "GET /api/todo/page,GET /api/todo/search"
+    PROFILER_SAMPLE_RATE: float = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+    PROFILER_HEADER: str = os.getenv("PROFILER_HEADER", "X-Profile")
+    PROFILER_INTERVAL_MS: float = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+    PROFILER_MAX_STACKS: int = int(os.getenv("PROFILER_MAX_STACKS", "2000"))
+
+    # --- Online migration (python migrate.py upgrade head --online) ---
+    MIGRATION_LOCK_TIMEOUT: str = os.getenv("MIGRATION_LOCK_TIMEOUT", "2s")
+    MIGRATION_STATEMENT_TIMEOUT: str = os.getenv("MIGRATION_STATEMENT_TIMEOUT", "5min")
+    MIGRATION_RETRIES: int = int(os.getenv("MIGRATION_RETRIES", "5"))
+    MIGRATION_RETRY_BACKOFF_SECONDS: float = float(os.getenv("MIGRATION_RETRY_BACKOFF_SECONDS", "2"))
+
+    # --- Sharding dữ liệu todo (database/sharding.py, python shard.py ...) ---
+    # "s0=postgresql+psycopg://...,s1=postgresql+psycopg://..."; để trống là không shard (1 DB)
+    SHARD_URLS: str = os.getenv("SHARD_URLS", "")
+    SHARDED_TABLES: str = os.getenv("SHARDED_TABLES", "todo")
+    SHARD_KEY: str = os.getenv("SHARD_KEY", "owner_id")        # cột làm shard key trong các bảng được shard
+    SHARD_VNODES: int = int(os.getenv("SHARD_VNODES", "64"))     # số điểm trên ring cho mỗi shard
+    # Mỗi shard sinh id cách nhau SHARD_ID_STRIDE (id không trùng giữa các shard, tối đa chừng ấy shard)
+    SHARD_ID_STRIDE: int = int(os.getenv("SHARD_ID_STRIDE", "64"))
+    SHARD_RING_REFRESH_SECONDS: float = float(os.getenv("SHARD_RING_REFRESH_SECONDS", "5"))
 
     @property
     def DATABASE_URL(self) -> str:
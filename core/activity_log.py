@@ -0,0 +1,274 @@
+import atexit
+import datetime
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, JSON, String, Text, bindparam, cast, insert, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from config import settings
+from database.db import Base, engine
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogModel(Base):
+    __tablename__ = "activity_log"
+
+    id = Column(BigInteger, primary_key=True)
+    at = Column(DateTime(timezone=True), nullable=False)
+    entity = Column(String(50), nullable=False)          # tên bảng, vd "todo"
+    entity_id = Column(BigInteger, nullable=False)
+    action = Column(String(10), nullable=False)          # "created" | "updated" | "deleted"
+    actor = Column(String(50), nullable=True)
+    changes = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)  # {"field": [cũ, mới]}
+
+    __table_args__ = (
+        # Lịch sử của 1 record theo thứ tự ghi
+        Index("ix_activity_log_entity", "entity", "entity_id", "id"),
+    )
+
+
+_COLUMNS = ("at", "entity", "entity_id", "action", "actor", "changes")
+# changes đã là chuỗi JSON (json.dumps với default=str cho datetime...): cast thẳng sang JSONB
+_INSERT = insert(ActivityLogModel.__table__).values(changes=cast(bindparam("changes", type_=Text), JSONB))
+
+
+class ActivityLog:
+    """
+    Nhật ký thay đổi append-only, ghi kiểu write-behind:
+      - CoreService gửi diff theo field (sau khi commit) qua `record`, entry được đưa vào buffer
+        có giới hạn trong process;
+      - thread nền gom entry thành lô (tối đa `batch_size`) và ghi bằng COPY (hoặc INSERT nhiều dòng);
+      - durability "async": request không chờ, entry có thể mất nếu process chết trước lần flush;
+        "commit": request chờ tới khi lô chứa entry của nó đã ghi xong (group commit, vẫn 1 lần ghi
+        cho nhiều request chạy đồng thời), nhưng không cùng transaction với thay đổi dữ liệu;
+      - buffer đầy: chờ tối đa `block_ms` rồi bỏ entry (đếm trong `dropped`), không làm hỏng request.
+    Số liệu backpressure xem qua `stats()` (/admin/activity-log/stats).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        entities: str = "*",
+        exclude_fields: str = "password",
+        durability: str = "async",
+        writer: str = "copy",
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_ms: float = 500,
+        block_ms: float = 50,
+        commit_timeout: float = 5.0,
+    ):
+        if durability not in ("async", "commit"):
+            raise ValueError(f"Unknown activity log durability: {durability}")
+        if writer not in ("copy", "insert"):
+            raise ValueError(f"Unknown activity log writer: {writer}")
+        self.enabled = enabled
+        self.entities = {e.strip() for e in entities.split(",") if e.strip()}
+        self.exclude_fields = {f.strip() for f in exclude_fields.split(",") if f.strip()}
+        self.durability = durability
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.block_timeout = block_ms / 1000
+        self.commit_timeout = commit_timeout
+        self._queue: "queue.Queue[Tuple[tuple, Optional[threading.Event]]]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._atexit = False
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "blocked_ms": 0.0,
+            "max_depth": 0,
+            "last_batch": 0,
+            "last_flush_ms": 0.0,
+            "flush_ms_total": 0.0,
+        }
+
+    def tracks(self, entity: str) -> bool:
+        return self.enabled and ("*" in self.entities or entity in self.entities)
+
+    # --- phía request ---
+    def record(self, entity: str, entity_id: Any, action: str, changes: Dict[str, list], actor: Optional[str]) -> None:
+        """
+        Đưa 1 thay đổi vào buffer (listener của CoreService, gọi sau khi commit).
+
+        Args:
+            entity (str): Tên bảng.
+            entity_id (Any): Id record.
+            action (str): "created" | "updated" | "deleted".
+            changes (Dict[str, list]): {field: [giá trị cũ, giá trị mới]}.
+            actor (str, optional): Người thực hiện (CreatedBy / UpdatedBy / user id).
+        """
+        changes = {k: v for k, v in changes.items() if k not in self.exclude_fields}
+        if action == "updated" and not changes:
+            return
+        row = (
+            datetime.datetime.now(datetime.timezone.utc),
+            entity,
+            entity_id,
+            action,
+            actor,
+            json.dumps(changes, default=str),
+        )
+        done = threading.Event() if self.durability == "commit" else None
+        self._ensure_started()
+        start = time.perf_counter()
+        try:
+            self._queue.put((row, done), timeout=self.block_timeout)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+                self._stats["blocked_ms"] += (time.perf_counter() - start) * 1000
+            logger.warning("Activity log buffer full, dropped %s %s #%s", action, entity, entity_id)
+            return
+        with self._lock:
+            self._stats["enqueued"] += 1
+            self._stats["blocked_ms"] += (time.perf_counter() - start) * 1000
+            self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+        if done is not None and not done.wait(self.commit_timeout):
+            logger.warning("Activity log flush did not finish within %.1fs", self.commit_timeout)
+
+    def listener(self, entity: str):
+        """Tạo change listener cho CoreService của bảng `entity`."""
+        def on_change(event: str, obj_id: Any, changes: Dict[str, list], actor: Optional[str]) -> None:
+            self.record(entity, obj_id, event, changes, actor)
+        return on_change
+
+    # --- writer nền ---
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            # Khởi động lười: cả app lẫn script dùng service đều có writer; sau fork thread cũ không còn
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+                self._thread.start()
+                if not self._atexit:
+                    atexit.register(self.stop)
+                    self._atexit = True
+
+    def _take(self) -> List[Tuple[tuple, Optional[threading.Event]]]:
+        try:
+            batch = [self._queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        # async: chờ thêm tối đa flush_interval để lô đầy hơn; commit: lấy ngay những gì đang chờ
+        linger_until = time.monotonic() + (self.flush_interval if self.durability == "async" else 0)
+        while len(batch) < self.batch_size:
+            try:
+                remaining = linger_until - time.monotonic()
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows: List[tuple]) -> None:
+        if self.writer == "insert":
+            with engine.begin() as conn:
+                conn.execute(_INSERT, [dict(zip(_COLUMNS, row)) for row in rows])
+            return
+        with engine.connect() as conn:
+            # COPY đi thẳng qua connection psycopg: commit ở tầng driver (SQLAlchemy không biết transaction này)
+            raw = conn.connection.driver_connection
+            with raw.cursor() as cur:
+                with cur.copy(f"COPY activity_log ({', '.join(_COLUMNS)}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            raw.commit()
+
+    def _flush(self, batch: List[Tuple[tuple, Optional[threading.Event]]]) -> None:
+        rows = [row for row, _ in batch]
+        start = time.perf_counter()
+        ok = False
+        for attempt in range(3):
+            try:
+                self._write(rows)
+                ok = True
+                break
+            except Exception:
+                logger.exception("Writing %d activity log entries failed (attempt %d)", len(rows), attempt + 1)
+                if attempt < 2:
+                    time.sleep(0.5 * 2 ** attempt)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["written" if ok else "failed"] += len(rows)
+            self._stats["batches"] += 1
+            self._stats["last_batch"] = len(rows)
+            self._stats["last_flush_ms"] = round(elapsed, 3)
+            self._stats["flush_ms_total"] += elapsed
+        for _, done in batch:
+            if done is not None:
+                done.set()
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._take()
+            if batch:
+                self._flush(batch)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Ghi nốt buffer còn lại rồi dừng writer (gọi khi tắt app)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    # --- đọc ---
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        total_ms = stats.pop("flush_ms_total")
+        stats["avg_flush_ms"] = round(total_ms / stats["batches"], 3) if stats["batches"] else 0.0
+        stats["blocked_ms"] = round(stats["blocked_ms"], 3)
+        stats.update(
+            enabled=self.enabled,
+            durability=self.durability,
+            writer=self.writer,
+            depth=self._queue.qsize(),
+            capacity=self._queue.maxsize,
+            running=self._thread is not None and self._thread.is_alive(),
+        )
+        return stats
+
+    @staticmethod
+    def history(db: Session, entity: str, entity_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Lịch sử thay đổi của 1 record, mới nhất trước (chỉ gồm các entry đã flush).
+
+        Example:
+            activity_log.history(db, "todo", 5)
+        """
+        t = ActivityLogModel.__table__
+        stmt = (
+            select(t.c.id, t.c.at, t.c.action, t.c.actor, t.c.changes)
+            .where(t.c.entity == entity, t.c.entity_id == entity_id)
+            .order_by(t.c.id.desc())
+            .limit(limit)
+        )
+        return [dict(row._mapping) for row in db.execute(stmt)]
+
+
+activity_log = ActivityLog(
+    enabled=settings.ACTIVITY_LOG_ENABLED,
+    entities=settings.ACTIVITY_LOG_ENTITIES,
+    exclude_fields=settings.ACTIVITY_LOG_EXCLUDE_FIELDS,
+    durability=settings.ACTIVITY_LOG_DURABILITY,
+    writer=settings.ACTIVITY_LOG_WRITER,
+    max_queue=settings.ACTIVITY_LOG_MAX_QUEUE,
+    batch_size=settings.ACTIVITY_LOG_BATCH_SIZE,
+    flush_ms=settings.ACTIVITY_LOG_FLUSH_MS,
+    block_ms=settings.ACTIVITY_LOG_BLOCK_MS,
+)
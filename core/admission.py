@@ -0,0 +1,195 @@
+import asyncio
+import json
+import math
+import re
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+from config import settings
+
+
+@dataclass
+class GroupLimit:
+    limit: int          # số request chạy đồng thời tối đa
+    max_queue: int      # số request được xếp hàng chờ tối đa
+    max_wait: float     # giây chờ tối đa trong hàng trước khi bị từ chối
+
+
+class Bulkhead:
+    """
+    Giới hạn đồng thời cho 1 nhóm route, kèm hàng chờ có giới hạn và deadline.
+    Chỉ dùng trong event loop (không cần lock); slot được chuyển thẳng cho người chờ kế tiếp.
+    """
+
+    def __init__(self, cfg: GroupLimit):
+        self.cfg = cfg
+        self.active = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        if self.active < self.cfg.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.cfg.max_queue:
+            self.rejected += 1
+            return False
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.cfg.max_wait)
+            return True
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                return True  # slot vừa được trao đúng lúc hết giờ
+            fut.cancel()
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            # Client bỏ đi: nếu đã được trao slot thì phải trả lại
+            if fut.done() and not fut.cancelled():
+                self.release()
+            fut.cancel()
+            raise
+        finally:
+            if fut in self._waiters:
+                self._waiters.remove(fut)
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(True)  # chuyển slot, active giữ nguyên
+                return
+        self.active -= 1
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+
+class TokenBucket:
+    """Token bucket theo từng client (vd IP) cho các route nhạy cảm như /auths/login."""
+
+    def __init__(self, rate_per_second: float, burst: int, max_clients: int = 10_000):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """
+        Lấy 1 token cho client.
+
+        Returns:
+            float: 0 nếu được phép, ngược lại là số giây cần chờ tới khi có token.
+        """
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)  # bỏ client lâu không thấy nhất
+        return wait
+
+
+# (methods, pattern, group): rule đầu tiên khớp sẽ được dùng; không khớp thì không giới hạn
+DEFAULT_RULES: List[Tuple[Set[str], str, str]] = [
+    ({"GET"}, r"^/api/[^/]+/\d+$", "by_id"),
+    ({"GET"}, r"^/api/[^/]+(/page|/search)?$", "bulk"),
+    ({"POST", "PUT", "PATCH", "DELETE"}, r"^/api/", "write"),
+]
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware chống quá tải:
+      - mỗi nhóm route có bulkhead riêng, nên khi nhóm "bulk" (list/search/page) bão hoà
+        thì get_by_id vẫn còn slot và vẫn phục vụ được;
+      - request vượt hàng chờ hoặc chờ quá deadline bị trả 503 ngay kèm `Retry-After`;
+      - các path rate-limit (mặc định /auths/login) trả 429 khi client hết token.
+    Tổng limit các nhóm nên nhỏ hơn threadpool của anyio (40) để route sync không xếp hàng ở đó.
+    """
+
+    def __init__(
+        self,
+        app,
+        groups: Optional[Dict[str, GroupLimit]] = None,
+        rules: Iterable[Tuple[Set[str], str, str]] = DEFAULT_RULES,
+        rate_limited_paths: Iterable[str] = ("/auths/login",),
+        retry_after: int = 1,
+    ):
+        self.app = app
+        self.groups = {name: Bulkhead(cfg) for name, cfg in (groups or default_groups()).items()}
+        self.rules: List[Tuple[Set[str], Pattern, str]] = [(m, re.compile(p), g) for m, p, g in rules]
+        self.rate_limited_paths = set(rate_limited_paths)
+        self.bucket = TokenBucket(settings.LOGIN_RATE_PER_MINUTE / 60.0, settings.LOGIN_BURST)
+        self.retry_after = retry_after
+
+    def classify(self, method: str, path: str) -> Optional[str]:
+        for methods, pattern, group in self.rules:
+            if method in methods and pattern.match(path):
+                return group if group in self.groups else None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path, method = scope["path"], scope["method"]
+
+        if path in self.rate_limited_paths:
+            client = scope.get("client")
+            wait = self.bucket.take(client[0] if client else "unknown")
+            if wait > 0:
+                await self._reject(send, 429, "Too many requests", math.ceil(wait))
+                return
+
+        group = self.classify(method, path)
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+        bulkhead = self.groups[group]
+        if not await bulkhead.acquire():
+            await self._reject(send, 503, f"Server overloaded ({group})", self.retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bulkhead.release()
+
+    @staticmethod
+    async def _reject(send, status: int, message: str, retry_after: int) -> None:
+        body = json.dumps({"status_code": status, "is_success": False, "message": message, "data": None}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"active": b.active, "queued": b.queued, "limit": b.cfg.limit, "rejected": b.rejected}
+            for name, b in self.groups.items()
+        }
+
+
+def default_groups() -> Dict[str, GroupLimit]:
+    max_wait = settings.ADMISSION_MAX_WAIT_MS / 1000
+    return {
+        "by_id": GroupLimit(settings.ADMISSION_BY_ID_LIMIT, settings.ADMISSION_BY_ID_QUEUE, max_wait),
+        "bulk": GroupLimit(settings.ADMISSION_BULK_LIMIT, settings.ADMISSION_BULK_QUEUE, max_wait),
+        "write": GroupLimit(settings.ADMISSION_WRITE_LIMIT, settings.ADMISSION_WRITE_QUEUE, max_wait),
+    }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Boolean, String, func
+from sqlalchemy import Column, DateTime, Boolean, Integer, String, func
 from sqlalchemy.orm import declared_attr
 
 from database.db import Base
@@ -18,3 +18,15 @@ class BaseModel(Base):
     UpdatedBy = Column(String(50), nullable=True)
     IsDeleted = Column(Boolean, default=False, nullable=False)
     IsActive = Column(Boolean, default=True, nullable=False)
+
+
+class VersionedMixin:
+    """
+    Thêm cột `version` cho optimistic concurrency: CoreService cập nhật bằng 1 câu
+    `UPDATE ... WHERE version = :v` và tăng version, xung đột thì báo lỗi thay vì ghi đè.
+
+    Example:
+        class TodoModel(BaseModel, VersionedMixin): ...
+    """
+
+    version = Column(Integer, nullable=False, default=1, server_default="1")
@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Depends, Query
-from typing import Generic, TypeVar, List
+from fastapi import APIRouter, Body, Depends, Header, Query, Response
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar, List
 from sqlalchemy.orm import Session
+from config import settings
 from database.db import get_db
-from core.core_service import CoreService
-from core.response_schema import ResponseSchema
+from core.core_schema import BulkCloneRequest
+from core.core_service import CoreService, VersionConflictError
+from core.idempotency import IdempotencyError, idempotency_store
+from core.profiler import ProfiledRoute
+from core.response_schema import PageMeta, ResponseSchema
+from core.singleflight import SingleFlight, singleflights
+from database.sharding import ShardMovingError
 
 TModel = TypeVar("TModel")
 TCreate = TypeVar("TCreate")
 TUpdate = TypeVar("TUpdate")
 TOut = TypeVar("TOut")
 
+def _no_owner() -> None:
+    return None
+
 class CoreController(Generic[TModel, TCreate, TUpdate, TOut]):
     def __init__(
         self,
@@ -19,77 +28,242 @@ class CoreController(Generic[TModel, TCreate, TUpdate, TOut]):
         out_schema,
         prefix: str,
         tag: str,
-        search_fields: List[str] = None
+        search_fields: List[str] = None,
+        owner_dependency: Optional[Callable[..., int]] = None,
+        max_page_size: Optional[int] = None,
     ):
-        self.router = APIRouter(prefix="/api" + prefix, tags=[tag])
+        self.router = APIRouter(prefix="/api" + prefix, tags=[tag], route_class=ProfiledRoute)
         self.service = service
+        # owner_dependency (vd get_current_user_id): mọi route chỉ đọc/ghi record của user hiện tại
+        if owner_dependency is not None and service.owner_field is None:
+            raise ValueError("owner_dependency requires a service created with owner_field")
+        owner = Depends(owner_dependency or _no_owner)
+        # Gộp các request đọc giống nhau đang chạy đồng thời (get_by_id, get_page)
+        self.reads = SingleFlight(wait_timeout=settings.SINGLEFLIGHT_WAIT_MS / 1000)
+        singleflights[self.router.prefix] = self.reads
+
+        def coalesce(key, fn):
+            return self.reads.do(key, fn) if settings.SINGLEFLIGHT_ENABLED else fn()
 
         CreateSchema = create_schema
         UpdateSchema = update_schema
         OutSchema = out_schema
+        base_path = self.router.prefix
+
+        def to_json(result: ResponseSchema) -> Dict[str, Any]:
+            # Chuẩn hoá response (data là ORM object) về dict JSON để lưu làm kết quả idempotent
+            data = result.data
+            if isinstance(data, list):
+                data = [OutSchema.model_validate(d).model_dump(mode="json") for d in data]
+            elif data is not None and not isinstance(data, dict):
+                data = OutSchema.model_validate(data).model_dump(mode="json")
+            return {**result.model_dump(exclude={"data"}), "data": data}
+
+        def idempotent(scope: str, key: Optional[str], payload: Any, response: Response, fn: Callable[[], ResponseSchema]):
+            # Không có header Idempotency-Key thì chạy như bình thường
+            if not key:
+                return fn()
+            try:
+                body, replayed = idempotency_store.run(scope, key, payload, lambda: to_json(fn()))
+            except IdempotencyError as e:
+                return ResponseSchema.fail(message=e.message, status_code=e.status_code)
+            if replayed:
+                response.headers["Idempotent-Replayed"] = "true"
+            return body
+
+        def scope_of(scope: str, owner_id: Optional[int]) -> str:
+            # Idempotency-Key của mỗi user là không gian riêng
+            return scope if owner_id is None else f"{scope} @{owner_id}"
+
+        def parse_if_match(value: Optional[str]) -> Optional[int]:
+            # If-Match: "3" | W/"3" | * (bỏ qua kiểm tra); ValueError nếu không phải version hợp lệ
+            if not value or value.strip() == "*":
+                return None
+            tag = value.split(",")[0].strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            return int(tag.strip('"'))
+
+        def set_etag(response: Response, obj: Any) -> None:
+            if self.service.versioned and obj is not None:
+                response.headers["ETag"] = f'"{obj.version}"'
+
+        def shard_moving(response: Response, e: ShardMovingError) -> ResponseSchema:
+            # Dữ liệu của user đang được chuyển shard (python shard.py ...): ghi lại sau ít giây
+            response.status_code = 503
+            response.headers["Retry-After"] = str(e.retry_after)
+            return ResponseSchema.fail(message=str(e), status_code=503)
 
         # --- CRUD ---
         @self.router.get("", response_model=ResponseSchema[List[OutSchema]])
-        def get_all(db: Session = Depends(get_db)):
+        def get_all(db: Session = Depends(get_db), owner_id: Optional[int] = owner):
             try:
-                items = self.service.get_all(db)
+                items = self.service.get_all_rows(db, owner_id=owner_id)
                 return ResponseSchema.success(data=items, message="Fetched successfully")
             except Exception as e:
                 return ResponseSchema.fail(message=f"Error fetching data: {str(e)}", status_code=500)
 
         @self.router.post("", response_model=ResponseSchema[OutSchema], status_code=201)
-        def create(item: CreateSchema, db: Session = Depends(get_db)):
-            try:
-                obj = self.service.create(db, item.dict())
-                return ResponseSchema.success(data=obj, message="Created successfully", status_code=201)
-            except Exception as e:
-                return ResponseSchema.fail(message=f"Error creating: {str(e)}", status_code=500)
+        def create(
+            item: CreateSchema,
+            response: Response,
+            db: Session = Depends(get_db),
+            idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+            owner_id: Optional[int] = owner,
+        ):
+            def run():
+                try:
+                    obj = self.service.create(db, item.dict(), owner_id=owner_id)
+                    return ResponseSchema.success(data=obj, message="Created successfully", status_code=201)
+                except ShardMovingError as e:
+                    return shard_moving(response, e)
+                except Exception as e:
+                    return ResponseSchema.fail(message=f"Error creating: {str(e)}", status_code=500)
+
+            return idempotent(scope_of(f"POST {base_path}", owner_id), idempotency_key, item.dict(), response, run)
+
+        @self.router.post("/{obj_id}/clone", response_model=ResponseSchema[OutSchema], status_code=201)
+        def clone(
+            obj_id: int,
+            response: Response,
+            overrides: Optional[Dict[str, Any]] = Body(None),
+            db: Session = Depends(get_db),
+            idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+            owner_id: Optional[int] = owner,
+        ):
+            def run():
+                try:
+                    obj = self.service.clone(db, obj_id, overrides=overrides, owner_id=owner_id)
+                    if not obj:
+                        return ResponseSchema.fail(message="Not found", status_code=404)
+                    return ResponseSchema.success(data=obj, message="Cloned successfully", status_code=201)
+                except ShardMovingError as e:
+                    return shard_moving(response, e)
+                except Exception as e:
+                    return ResponseSchema.fail(message=f"Error cloning: {str(e)}", status_code=500)
+
+            return idempotent(scope_of(f"POST {base_path}/{obj_id}/clone", owner_id), idempotency_key, overrides, response, run)
+
+        @self.router.post("/clone", response_model=ResponseSchema[List[OutSchema]], status_code=201)
+        def clone_many(
+            request: BulkCloneRequest,
+            response: Response,
+            db: Session = Depends(get_db),
+            idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+            owner_id: Optional[int] = owner,
+        ):
+            # Kiểm tra tổng số bản sao trước khi bung danh sách id
+            if sum(item.copies for item in request.items) > settings.CLONE_MAX_COPIES:
+                return ResponseSchema.fail(message=f"Too many copies (max {settings.CLONE_MAX_COPIES})", status_code=400)
+            obj_ids, overrides = [], []
+            for item in request.items:
+                obj_ids += [item.id] * item.copies
+                overrides += [item.overrides] * item.copies
+
+            def run():
+                try:
+                    objs = self.service.clone_many(db, obj_ids, overrides=overrides, owner_id=owner_id)
+                    if objs is None:
+                        return ResponseSchema.fail(message="Not found", status_code=404)
+                    return ResponseSchema.success(data=objs, message="Cloned successfully", status_code=201)
+                except ShardMovingError as e:
+                    return shard_moving(response, e)
+                except Exception as e:
+                    return ResponseSchema.fail(message=f"Error cloning: {str(e)}", status_code=500)
+
+            return idempotent(
+                scope_of(f"POST {base_path}/clone", owner_id), idempotency_key, request.model_dump(), response, run
+            )
 
         @self.router.delete("/{obj_id}", response_model=ResponseSchema[dict])
-        def delete(obj_id: int, db: Session = Depends(get_db)):
+        def delete(obj_id: int, response: Response, db: Session = Depends(get_db), owner_id: Optional[int] = owner):
             try:
-                ok = self.service.soft_delete(db, obj_id)
+                ok = self.service.soft_delete(db, obj_id, owner_id=owner_id)
                 if not ok:
                     return ResponseSchema.fail(message="Not found", status_code=404)
                 return ResponseSchema.success(data={"status": "deleted"}, message="Deleted successfully")
+            except ShardMovingError as e:
+                return shard_moving(response, e)
             except Exception as e:
                 return ResponseSchema.fail(message=f"Error deleting: {str(e)}", status_code=500)
 
         # --- Search (nếu có truyền search_fields) ---
         if search_fields:
             @self.router.get("/search", response_model=ResponseSchema[List[OutSchema]])
-            def search(q: str = Query(...), db: Session = Depends(get_db)):
+            def search(q: str = Query(...), db: Session = Depends(get_db), owner_id: Optional[int] = owner):
                 try:
-                    results = self.service.search(db, q, fields=search_fields)
+                    results = self.service.search_rows(db, q, fields=search_fields, owner_id=owner_id)
                     return ResponseSchema.success(data=results, message="Search results")
                 except Exception as e:
                     return ResponseSchema.fail(message=f"Error searching: {str(e)}", status_code=500)
 
         # --- Pagination ---
         @self.router.get("/page", response_model=ResponseSchema[List[OutSchema]])
-        def get_page(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+        def get_page(
+            skip: int = Query(0, ge=0),
+            limit: int = Query(10, ge=1, le=max_page_size),  # max_page_size=None: không giới hạn
+            with_total: bool = False,
+            db: Session = Depends(get_db),
+            owner_id: Optional[int] = owner,
+        ):
             try:
-                items = self.service.get_page(db, skip=skip, limit=limit)
-                return ResponseSchema.success(data=items, message="Paged results")
+                items = coalesce(
+                    ("page", owner_id, skip, limit),
+                    lambda: self.service.get_page_rows(db, skip=skip, limit=limit, owner_id=owner_id),
+                )
+                meta = PageMeta(skip=skip, limit=limit)
+                if with_total:
+                    meta.total, meta.total_is_estimate = self.service.count_total(
+                        db,
+                        exact_threshold=settings.COUNT_EXACT_THRESHOLD,
+                        ttl=settings.COUNT_CACHE_TTL_SECONDS,
+                        owner_id=owner_id,
+                    )
+                return ResponseSchema.success(data=items, message="Paged results", meta=meta)
             except Exception as e:
                 return ResponseSchema.fail(message=f"Error pagination: {str(e)}", status_code=500)
 
         @self.router.get("/{obj_id}", response_model=ResponseSchema[OutSchema])
-        def get_by_id(obj_id: int, db: Session = Depends(get_db)):
+        def get_by_id(obj_id: int, response: Response, db: Session = Depends(get_db), owner_id: Optional[int] = owner):
             try:
-                obj = self.service.get_by_id(db, obj_id)
+                obj = coalesce(
+                    ("by_id", owner_id, obj_id),
+                    lambda: self.service.get_by_id_row(db, obj_id, owner_id=owner_id),
+                )
                 if not obj:
                     return ResponseSchema.fail(message="Not found", status_code=404)
+                set_etag(response, obj)
                 return ResponseSchema.success(data=obj, message="Found")
             except Exception as e:
                 return ResponseSchema.fail(message=f"Error fetching by id: {str(e)}", status_code=500)
 
         @self.router.put("/{obj_id}", response_model=ResponseSchema[OutSchema])
-        def update(obj_id: int, item: UpdateSchema, db: Session = Depends(get_db)):
+        def update(
+            obj_id: int,
+            item: UpdateSchema,
+            response: Response,
+            db: Session = Depends(get_db),
+            if_match: Optional[str] = Header(None, alias="If-Match"),
+            owner_id: Optional[int] = owner,
+        ):
+            try:
+                expected_version = parse_if_match(if_match)
+            except ValueError:
+                return ResponseSchema.fail(message="Invalid If-Match header", status_code=400)
             try:
-                obj = self.service.update(db, obj_id, item.dict(exclude_unset=True))
+                obj = self.service.update(
+                    db, obj_id, item.dict(exclude_unset=True), expected_version=expected_version, owner_id=owner_id
+                )
                 if not obj:
                     return ResponseSchema.fail(message="Not found", status_code=404)
+                set_etag(response, obj)
                 return ResponseSchema.success(data=obj, message="Updated successfully")
+            except VersionConflictError as e:
+                # HTTP status cũng là 409 để client dùng If-Match nhận biết cần đọc lại
+                response.status_code = 409
+                response.headers["ETag"] = f'"{e.current_version}"'
+                return ResponseSchema.fail(message=str(e), status_code=409)
+            except ShardMovingError as e:
+                return shard_moving(response, e)
             except Exception as e:
                 return ResponseSchema.fail(message=f"Error updating: {str(e)}", status_code=500)
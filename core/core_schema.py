@@ -1,6 +1,7 @@
-from typing import Generic, TypeVar, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, Generic, List, TypeVar, Optional
+from pydantic import BaseModel, Field
 from datetime import datetime
+from config import settings
 
 TId = TypeVar("TId", bound=int)
 
@@ -12,6 +13,7 @@ class CoreSchema(BaseModel, Generic[TId]):
     UpdatedBy: Optional[str] = None
     IsDeleted: Optional[bool] = False
     IsActive: Optional[bool] = True
+    version: Optional[int] = None   # chỉ có với model dùng VersionedMixin
 
     class Config:
         from_attributes = True
@@ -21,4 +23,13 @@ class CoreCreateSchema(BaseModel):
 
 class CoreUpdateSchema(BaseModel):
     UpdatedBy: Optional[str] = None
-    IsActive: Optional[bool] = None
\ No newline at end of file
+    IsActive: Optional[bool] = None
+    version: Optional[int] = None   # version client đã đọc (thay cho header If-Match)
+
+class CloneItem(BaseModel):
+    id: int
+    copies: int = Field(1, ge=1, le=settings.CLONE_MAX_COPIES)
+    overrides: Optional[Dict[str, Any]] = None   # áp cho mọi bản sao của item này
+
+class BulkCloneRequest(BaseModel):
+    items: List[CloneItem] = Field(..., max_length=settings.CLONE_MAX_COPIES)   # mỗi item >= 1 bản sao
@@ -1,29 +1,367 @@
-from typing import Generic, TypeVar, Type, Optional, List, Iterable, Any, Dict
+from typing import Generic, TypeVar, Type, Optional, List, Iterable, Any, Dict, Callable, Sequence
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, inspect as sa_inspect
+from sqlalchemy import (
+    or_, select, insert, update, bindparam, false, func, text, case, cast, column, literal, values,
+    Boolean, Integer, inspect as sa_inspect,
+)
+from core.activity_log import activity_log
 from core.basemodel import BaseModel
+from database.sharding import shard_router
 import datetime
+import logging
+import time
 
 TModel = TypeVar("TModel", bound=BaseModel)
 
+logger = logging.getLogger(__name__)
+
+# Callback nhận (event, obj) với event là "created" | "updated" | "deleted"
+WriteListener = Callable[[str, Any], None]
+# Callback nhận (event, obj_id, changes, actor), changes = {field: [giá trị cũ, giá trị mới]}
+ChangeListener = Callable[[str, Any, Dict[str, list], Optional[str]], None]
+
+# Cột tự đổi theo mỗi lần ghi, không đưa vào diff
+_DIFF_IGNORED = {"CreatedAt", "UpdatedAt", "version"}
+
+
+class VersionConflictError(Exception):
+    """Record đã bị người khác sửa: version hiện tại khác version client gửi lên."""
+
+    def __init__(self, obj_id: Any, expected_version: int, current_version: int):
+        super().__init__(f"Version conflict: expected {expected_version}, current is {current_version}")
+        self.obj_id = obj_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+def make_row_class(name: str, keys: tuple) -> type:
+    """
+    Tạo class DTO chỉ đọc dùng __slots__ cho 1 model (không __dict__, không gắn Session).
+
+    Args:
+        name (str): Tên class.
+        keys (tuple): Tên các cột theo đúng thứ tự select.
+
+    Returns:
+        type: Class nhận giá trị cột theo thứ tự, đọc được qua thuộc tính (Pydantic from_attributes).
+    """
+    def __init__(self, *values):
+        for key, value in zip(keys, values):
+            setattr(self, key, value)
+
+    def __repr__(self):
+        return f"{name}({', '.join(f'{k}={getattr(self, k)!r}' for k in keys)})"
+
+    return type(name, (), {"__slots__": keys, "__init__": __init__, "__repr__": __repr__})
+
 
 class CoreService(Generic[TModel]):
-    def __init__(self, model: Type[TModel]):
+    def __init__(self, model: Type[TModel], owner_field: Optional[str] = None):
         """
         Khởi tạo service cho 1 model.
 
         Args:
             model (Type[TModel]): SQLAlchemy model kế thừa từ BaseModel.
+            owner_field (str, optional): Cột chứa id user sở hữu record (vd "owner_id");
+                khi có, các hàm nhận `owner_id` để chỉ đọc/ghi record của user đó.
         """
         self.model = model
         self.pk = model.__mapper__.primary_key[0]
+        self.owner_field = owner_field
+        self.owner_col = getattr(model, owner_field) if owner_field else None
+        # Model dùng VersionedMixin: update bằng 1 câu UPDATE có điều kiện theo version
+        self.versioned = "version" in model.__table__.c
+        self._listeners: List[WriteListener] = []
+        self._change_listeners: List[ChangeListener] = []
+        # Lịch sử thay đổi theo field (core/activity_log.py) cho các bảng được bật
+        if activity_log.tracks(model.__tablename__):
+            self.add_change_listener(activity_log.listener(model.__tablename__))
+        # Sharding (database/sharding.py): bảng trong SHARDED_TABLES được định tuyến theo cột owner
+        self.sharded = shard_router is not None and shard_router.shards_table(model.__tablename__)
+        if self.sharded and owner_field != shard_router.key_column:
+            raise ValueError(f"{model.__name__} is sharded by {shard_router.key_column}, owner_field must match")
+
+        # Statement dựng sẵn 1 lần với bind param: mỗi request chỉ truyền giá trị,
+        # không dựng lại expression tree; SQLAlchemy dùng lại SQL đã compile trong cache.
+        alive = model.IsDeleted == false()
+        self._stmt_all = select(model).where(alive)
+        self._stmt_by_id = select(model).where(self.pk == bindparam("obj_id"), alive)
+        self._stmt_page = (
+            select(model)
+            .where(alive)
+            .offset(bindparam("skip", type_=Integer))
+            .limit(bindparam("limit", type_=Integer))
+        )
+        self._stmt_search: Dict[tuple, Any] = {}
+        self._stmt_count = select(func.count()).select_from(model).where(alive)
+        # Dạng không aggregate của _stmt_count, chỉ để EXPLAIN lấy số dòng ước lượng
+        self._stmt_alive_rows = select(literal(1)).select_from(model).where(alive)
+        self._count_cache: Dict[Any, tuple] = {}
+
+        # Chế độ chỉ đọc: select cột trần, trả DTO __slots__ thay vì ORM instance
+        # (bỏ qua identity map, không theo dõi thay đổi).
+        self.row_keys = tuple(attr.key for attr in sa_inspect(model).column_attrs)
+        self.row_class = make_row_class(f"{model.__name__}Row", self.row_keys)
+        self._row_columns = [getattr(model, key) for key in self.row_keys]
+        self._rows_all = select(*self._row_columns).where(alive)
+        self._rows_by_id = select(*self._row_columns).where(self.pk == bindparam("obj_id"), alive)
+        self._rows_page = (
+            select(*self._row_columns)
+            .where(alive)
+            .offset(bindparam("skip", type_=Integer))
+            .limit(bindparam("limit", type_=Integer))
+        )
+        if self.versioned:
+            self._stmt_version = select(model.version).where(self.pk == bindparam("obj_id"), alive)
+        if self.sharded:
+            # Trang không lọc owner trên nhiều shard: mỗi shard lấy skip+limit dòng đầu theo PK rồi trộn
+            self._pk_index = self.row_keys.index(self.pk.key)
+            self._gather_page = select(model).where(alive).order_by(self.pk).limit(bindparam("limit", type_=Integer))
+            self._gather_rows_page = (
+                select(*self._row_columns).where(alive).order_by(self.pk).limit(bindparam("limit", type_=Integer))
+            )
+
+        # Bản có lọc theo owner (bind param "owner_id") của các statement trên
+        self._scoped: Dict[str, Any] = {}
+        if self.owner_col is not None:
+            owned = self.owner_col == bindparam("owner_id")
+            names = ["_stmt_all", "_stmt_by_id", "_stmt_page", "_stmt_count", "_rows_all", "_rows_by_id", "_rows_page"]
+            if self.versioned:
+                names.append("_stmt_version")
+            for name in names:
+                self._scoped[name] = getattr(self, name).where(owned)
+
+    def _stmt(self, name: str, params: Dict[str, Any], owner_id: Optional[int]) -> tuple:
+        """
+        Chọn statement dựng sẵn (bản lọc theo owner nếu có owner_id) kèm tham số.
+
+        Args:
+            name (str): Tên thuộc tính statement (vd "_rows_page").
+            params (Dict[str, Any]): Tham số bind.
+            owner_id (int, optional): Id user sở hữu; None là không lọc.
+
+        Returns:
+            tuple: (statement, params).
+        """
+        if owner_id is None:
+            return getattr(self, name), params
+        if self.owner_col is None:
+            raise ValueError(f"{self.model.__name__} has no owner column")
+        return self._scoped[name], {**params, "owner_id": owner_id}
+
+    def _search_stmt(self, fields: Iterable[str], rows: bool = False, owned: bool = False, ordered: bool = False):
+        """
+        Lấy statement search dựng sẵn cho bộ field (cache theo tuple field).
+
+        Args:
+            fields (Iterable[str]): Danh sách tên cột tìm kiếm.
+            rows (bool): True để select cột trần cho chế độ chỉ đọc.
+            owned (bool): True để thêm điều kiện owner (bind param "owner_id").
+            ordered (bool): True để sắp theo PK (trộn kết quả từ nhiều shard).
+
+        Returns:
+            Select: Statement với bind param "pattern".
+        """
+        key = (tuple(fields), rows, owned, ordered)
+        stmt = self._stmt_search.get(key)
+        if stmt is None:
+            pattern = bindparam("pattern")
+            filters = [getattr(self.model, f).ilike(pattern) for f in key[0]]
+            target = self._row_columns if rows else [self.model]
+            stmt = select(*target).where(self.model.IsDeleted == false(), or_(*filters))
+            if owned:
+                stmt = stmt.where(self.owner_col == bindparam("owner_id"))
+            if ordered:
+                stmt = stmt.order_by(self.pk)
+            self._stmt_search[key] = stmt
+        return stmt
+
+    def _search(self, fields: Iterable[str], keyword: str, rows: bool, owner_id: Optional[int]) -> tuple:
+        params = {"pattern": f"%{keyword}%"}
+        if owner_id is None:
+            return self._search_stmt(fields, rows=rows), params
+        if self.owner_col is None:
+            raise ValueError(f"{self.model.__name__} has no owner column")
+        return self._search_stmt(fields, rows=rows, owned=True), {**params, "owner_id": owner_id}
+
+    def _to_rows(self, result) -> List[Any]:
+        row_class = self.row_class
+        return [row_class(*row) for row in result]
+
+    def _route(self, db: Session, owner_id: Optional[int], write: bool = False) -> None:
+        """
+        Chọn shard cho các câu lệnh tiếp theo của session: shard của owner_id, None là mọi shard.
+        Không làm gì nếu bảng không được shard.
+
+        Raises:
+            ShardMovingError: write=True và khoảng key của owner đang được chuyển shard.
+        """
+        if self.sharded:
+            shard_router.route(db, owner_id, write=write)
+
+    def _gather(self, db: Session, stmt, params: Dict[str, Any], rows: bool, limit: Optional[int] = None) -> List[Any]:
+        """
+        Scatter-gather trên mọi shard (`stmt` đã ORDER BY PK), trộn kết quả theo PK.
+
+        Returns:
+            List[Any]: DTO (rows=True) hoặc ORM instance, tối đa `limit` phần tử.
+        """
+        if rows:
+            i = self._pk_index
+            return self._to_rows(shard_router.gather(db, stmt, params, key=lambda r: r[i], limit=limit))
+        pk = self.pk.key
+        return shard_router.gather(db, stmt, params, key=lambda o: getattr(o, pk), scalars=True, limit=limit)
+
+    def get_all_rows(self, db: Session, owner_id: Optional[int] = None) -> List[Any]:
+        """
+        Như get_all nhưng chỉ đọc: trả DTO gọn thay vì ORM instance.
+
+        Args:
+            db (Session): SQLAlchemy session.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
+
+        Returns:
+            List[Any]: Danh sách DTO (`self.row_class`).
+
+        Example:
+            todo_service.get_all_rows(db)
+        """
+        self._route(db, owner_id)
+        return self._to_rows(db.execute(*self._stmt("_rows_all", {}, owner_id)))
+
+    def get_by_id_row(self, db: Session, obj_id: int, owner_id: Optional[int] = None) -> Optional[Any]:
+        """
+        Như get_by_id nhưng chỉ đọc: trả DTO gọn thay vì ORM instance.
+
+        Args:
+            db (Session): SQLAlchemy session.
+            obj_id (int): Id bản ghi.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
+
+        Returns:
+            Optional[Any]: DTO (`self.row_class`) hoặc None nếu không tìm thấy.
+
+        Example:
+            todo_service.get_by_id_row(db, 5)
+        """
+        self._route(db, owner_id)
+        row = db.execute(*self._stmt("_rows_by_id", {"obj_id": obj_id}, owner_id)).first()
+        return self.row_class(*row) if row is not None else None
+
+    def get_page_rows(self, db: Session, skip: int = 0, limit: int = 10, owner_id: Optional[int] = None) -> List[Any]:
+        """
+        Như get_page nhưng chỉ đọc: trả DTO gọn thay vì ORM instance.
+
+        Args:
+            db (Session): SQLAlchemy session.
+            skip (int): Số bản ghi bỏ qua.
+            limit (int): Số bản ghi lấy.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
+
+        Returns:
+            List[Any]: Danh sách DTO (`self.row_class`).
+
+        Example:
+            todo_service.get_page_rows(db, skip=0, limit=20)
+        """
+        self._route(db, owner_id)
+        if self.sharded and owner_id is None:
+            return self._gather(db, self._gather_rows_page, {"limit": skip + limit}, rows=True, limit=skip + limit)[skip:]
+        return self._to_rows(db.execute(*self._stmt("_rows_page", {"skip": skip, "limit": limit}, owner_id)))
+
+    def search_rows(self, db: Session, keyword: str, fields: List[str], owner_id: Optional[int] = None) -> List[Any]:
+        """
+        Như search nhưng chỉ đọc: trả DTO gọn thay vì ORM instance.
+
+        Args:
+            db (Session): SQLAlchemy session.
+            keyword (str): Từ khoá cần tìm.
+            fields (List[str]): Danh sách tên cột để tìm kiếm.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
+
+        Returns:
+            List[Any]: Danh sách DTO (`self.row_class`).
+
+        Example:
+            todo_service.search_rows(db, "report", ["name", "description"])
+        """
+        self._route(db, owner_id)
+        if self.sharded and owner_id is None:
+            return self._gather(db, self._search_stmt(fields, rows=True, ordered=True), {"pattern": f"%{keyword}%"}, True)
+        return self._to_rows(db.execute(*self._search(fields, keyword, True, owner_id)))
 
-    def get_all(self, db: Session) -> List[TModel]:
+    def add_listener(self, listener: WriteListener) -> None:
+        """
+        Đăng ký callback được gọi sau mỗi lần ghi đã commit.
+
+        Args:
+            listener (WriteListener): Hàm nhận (event, obj), event là "created" | "updated" | "deleted".
+
+        Example:
+            todo_service.add_listener(lambda event, obj: print(event, obj))
+        """
+        self._listeners.append(listener)
+
+    def add_change_listener(self, listener: ChangeListener) -> None:
+        """
+        Đăng ký callback nhận diff theo field sau mỗi lần ghi đã commit.
+        Chỉ khi có change listener thì service mới thu thập giá trị cũ để tính diff.
+
+        Args:
+            listener (ChangeListener): Hàm nhận (event, obj_id, changes, actor).
+
+        Example:
+            todo_service.add_change_listener(lambda event, obj_id, changes, actor: print(changes))
+        """
+        self._change_listeners.append(listener)
+
+    @staticmethod
+    def _diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, list]:
+        return {k: [old.get(k), v] for k, v in new.items() if k not in _DIFF_IGNORED and old.get(k) != v}
+
+    def _notify(
+        self,
+        event: str,
+        obj: Any,
+        changes: Optional[Dict[str, list]] = None,
+        actor: Optional[Any] = None,
+        obj_id: Optional[Any] = None,
+    ) -> None:
+        """
+        Gửi sự kiện ghi tới các listener; lỗi của listener không làm hỏng request.
+
+        Args:
+            event (str): "created" | "updated" | "deleted".
+            obj (Any): Record vừa thay đổi.
+            changes (Dict[str, list], optional): Diff theo field cho change listener.
+            actor (Any, optional): Người thực hiện (CreatedBy / UpdatedBy / owner id).
+            obj_id (Any, optional): Id record nếu đã biết (tránh nạp lại object đã expire sau commit).
+        """
+        if event in ("created", "deleted"):
+            self._count_cache.clear()
+        for listener in self._listeners:
+            try:
+                listener(event, obj)
+            except Exception:
+                logger.exception("Write listener failed for %s (%s)", self.model.__name__, event)
+        if changes is None or not self._change_listeners:
+            return
+        if obj_id is None:
+            obj_id = getattr(obj, self.pk.key)
+        actor = str(actor) if actor is not None else None
+        for listener in self._change_listeners:
+            try:
+                listener(event, obj_id, changes, actor)
+            except Exception:
+                logger.exception("Change listener failed for %s (%s)", self.model.__name__, event)
+
+    def get_all(self, db: Session, owner_id: Optional[int] = None) -> List[TModel]:
         """
         Lấy tất cả record còn tồn tại (IsDeleted=False).
 
         Args:
             db (Session): SQLAlchemy session.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
 
         Returns:
             List[TModel]: Danh sách bản ghi.
@@ -31,15 +369,17 @@ class CoreService(Generic[TModel]):
         Example:
             user_service.get_all(db)
         """
-        return db.query(self.model).filter(self.model.IsDeleted == False).all()
+        self._route(db, owner_id)
+        return list(db.scalars(*self._stmt("_stmt_all", {}, owner_id)))
 
-    def get_by_id(self, db: Session, obj_id: int) -> Optional[TModel]:
+    def get_by_id(self, db: Session, obj_id: int, owner_id: Optional[int] = None) -> Optional[TModel]:
         """
         Lấy 1 record theo id (chỉ lấy bản chưa xoá mềm).
 
         Args:
             db (Session): SQLAlchemy session.
             obj_id (int): Id bản ghi.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
 
         Returns:
             Optional[TModel]: Bản ghi hoặc None nếu không tìm thấy.
@@ -47,19 +387,17 @@ class CoreService(Generic[TModel]):
         Example:
             user_service.get_by_id(db, 5)
         """
-        return (
-            db.query(self.model)
-            .filter(self.pk == obj_id, self.model.IsDeleted == False)
-            .first()
-        )
+        self._route(db, owner_id)
+        return db.scalars(*self._stmt("_stmt_by_id", {"obj_id": obj_id}, owner_id)).first()
 
-    def create(self, db: Session, obj_in: dict) -> TModel:
+    def create(self, db: Session, obj_in: dict, owner_id: Optional[int] = None) -> TModel:
         """
         Tạo mới 1 record.
 
         Args:
             db (Session): SQLAlchemy session.
             obj_in (dict): Dữ liệu khởi tạo.
+            owner_id (int, optional): User sở hữu record mới (ghi đè giá trị trong obj_in).
 
         Returns:
             TModel: Record vừa tạo.
@@ -67,13 +405,20 @@ class CoreService(Generic[TModel]):
         Example:
             user_service.create(db, {"username": "admin"})
         """
+        if owner_id is not None:
+            obj_in = {**obj_in, self.owner_field: owner_id}
+        self._route(db, obj_in.get(self.owner_field) if self.owner_field else None, write=True)
         db_obj = self.model(**obj_in)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        changes = self._diff({}, obj_in) if self._change_listeners else None
+        self._notify("created", db_obj, changes, actor=obj_in.get("CreatedBy") or owner_id)
         return db_obj
 
-    def update(self, db: Session, obj_id: int, obj_in: dict) -> Optional[TModel]:
+    def update(
+        self, db: Session, obj_id: int, obj_in: dict, expected_version: Optional[int] = None, owner_id: Optional[int] = None
+    ) -> Optional[TModel]:
         """
         Cập nhật record với toàn bộ field trong obj_in.
 
@@ -81,23 +426,39 @@ class CoreService(Generic[TModel]):
             db (Session): SQLAlchemy session.
             obj_id (int): Id bản ghi cần update.
             obj_in (dict): Dữ liệu mới.
+            expected_version (int, optional): Version client đã đọc (chỉ với model có version).
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
 
         Returns:
             Optional[TModel]: Record sau khi update hoặc None nếu không tìm thấy.
 
+        Raises:
+            VersionConflictError: Version không khớp (model có version).
+
         Example:
             user_service.update(db, 5, {"username": "new_name"})
         """
-        db_obj = self.get_by_id(db, obj_id)
+        if self.owner_field:
+            obj_in = {k: v for k, v in obj_in.items() if k != self.owner_field}  # không đổi owner qua update
+        self._route(db, owner_id, write=True)
+        if self.versioned:
+            allowed = set(self.model.__table__.c.keys()) - {self.pk.key, "CreatedAt", "version"}
+            return self._conditional_update(db, obj_id, obj_in, allowed, expected_version, owner_id)
+        db_obj = self.get_by_id(db, obj_id, owner_id=owner_id)
         if not db_obj:
             return None
+        old = {field: getattr(db_obj, field, None) for field in obj_in} if self._change_listeners else None
         for field, value in obj_in.items():
             setattr(db_obj, field, value)
         db.commit()
         db.refresh(db_obj)
+        changes = self._diff(old, obj_in) if old is not None else None
+        self._notify("updated", db_obj, changes, actor=obj_in.get("UpdatedBy") or owner_id)
         return db_obj
 
-    def soft_delete(self, db: Session, obj_id: int, deleted_by: Optional[str] = None) -> bool:
+    def soft_delete(
+        self, db: Session, obj_id: int, deleted_by: Optional[str] = None, owner_id: Optional[int] = None
+    ) -> bool:
         """
         Xoá mềm 1 record (IsDeleted=True).
 
@@ -105,6 +466,7 @@ class CoreService(Generic[TModel]):
             db (Session): SQLAlchemy session.
             obj_id (int): Id bản ghi cần xoá.
             deleted_by (str, optional): Người thực hiện xoá.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
 
         Returns:
             bool: True nếu xoá thành công, False nếu không tìm thấy.
@@ -112,16 +474,18 @@ class CoreService(Generic[TModel]):
         Example:
             user_service.soft_delete(db, 5, deleted_by="admin")
         """
-        db_obj = self.get_by_id(db, obj_id)
+        self._route(db, owner_id, write=True)
+        db_obj = self.get_by_id(db, obj_id, owner_id=owner_id)
         if not db_obj:
             return False
         db_obj.IsDeleted = True
         db_obj.UpdatedBy = deleted_by
         db_obj.UpdatedAt = datetime.datetime.utcnow()
         db.commit()
+        self._notify("deleted", db_obj, {"IsDeleted": [False, True]}, actor=deleted_by or owner_id, obj_id=obj_id)
         return True
 
-    def search(self, db: Session, keyword: str, fields: List[str]) -> List[TModel]:
+    def search(self, db: Session, keyword: str, fields: List[str], owner_id: Optional[int] = None) -> List[TModel]:
         """
         Tìm kiếm record theo từ khoá trong nhiều field.
 
@@ -129,6 +493,7 @@ class CoreService(Generic[TModel]):
             db (Session): SQLAlchemy session.
             keyword (str): Từ khoá cần tìm.
             fields (List[str]): Danh sách tên cột để tìm kiếm.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
 
         Returns:
             List[TModel]: Các bản ghi phù hợp.
@@ -136,22 +501,21 @@ class CoreService(Generic[TModel]):
         Example:
             user_service.search(db, "admin", ["username", "email"])
         """
-        filters = [getattr(self.model, f).ilike(f"%{keyword}%") for f in fields]
-        return (
-            db.query(self.model)
-            .filter(self.model.IsDeleted == False)
-            .filter(or_(*filters))
-            .all()
-        )
+        self._route(db, owner_id)
+        if self.sharded and owner_id is None:
+            return self._gather(db, self._search_stmt(fields, ordered=True), {"pattern": f"%{keyword}%"}, False)
+        return list(db.scalars(*self._search(fields, keyword, False, owner_id)))
 
-    def get_page(self, db: Session, skip: int = 0, limit: int = 10) -> List[TModel]:
+    def get_page(self, db: Session, skip: int = 0, limit: int = 10, owner_id: Optional[int] = None) -> List[TModel]:
         """
-        Phân trang dữ liệu.
+        Phân trang dữ liệu. Bảng được shard, không lọc owner: trộn kết quả của mọi shard theo PK
+        (mỗi shard đọc skip+limit dòng đầu).
 
         Args:
             db (Session): SQLAlchemy session.
             skip (int): Số bản ghi bỏ qua.
             limit (int): Số bản ghi lấy.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
 
         Returns:
             List[TModel]: Danh sách record.
@@ -159,13 +523,72 @@ class CoreService(Generic[TModel]):
         Example:
             user_service.get_page(db, skip=0, limit=20)
         """
-        return (
-            db.query(self.model)
-            .filter(self.model.IsDeleted == False)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        self._route(db, owner_id)
+        if self.sharded and owner_id is None:
+            return self._gather(db, self._gather_page, {"limit": skip + limit}, rows=False, limit=skip + limit)[skip:]
+        return list(db.scalars(*self._stmt("_stmt_page", {"skip": skip, "limit": limit}, owner_id)))
+
+    def count_total(
+        self, db: Session, exact_threshold: int = 10000, ttl: float = 30.0, owner_id: Optional[int] = None
+    ) -> tuple[int, bool]:
+        """
+        Đếm tổng số record còn tồn tại cho phân trang, tránh COUNT(*) quét cả bảng lớn.
+
+        - Bảng nhỏ (theo `pg_class.reltuples` < exact_threshold): COUNT(*) chính xác.
+        - Bảng lớn: lấy số dòng ước lượng của planner (EXPLAIN) cho đúng điều kiện lọc.
+        - Lọc theo owner: COUNT(*) chính xác qua index của owner (chi phí theo số record của user đó).
+        - Bảng được shard, không lọc owner: cộng kết quả (chính xác / ước lượng) của từng shard.
+        Kết quả được cache `ttl` giây; ghi tạo/xoá trong process này sẽ xoá cache.
+
+        Args:
+            db (Session): SQLAlchemy session.
+            exact_threshold (int): Ngưỡng số dòng để chuyển sang ước lượng.
+            ttl (float): Số giây cache kết quả.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
+
+        Returns:
+            tuple[int, bool]: (tổng số, True nếu là số ước lượng).
+
+        Example:
+            total, is_estimate = todo_service.count_total(db)
+        """
+        cache_key = "all" if owner_id is None else ("owner", owner_id)
+        cached = self._count_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[2] < ttl:
+            return cached[0], cached[1]
+
+        self._route(db, owner_id)
+        if owner_id is not None:
+            total = db.execute(*self._stmt("_stmt_count", {}, owner_id)).scalar_one()
+            if len(self._count_cache) > 10000:
+                self._count_cache.clear()
+            self._count_cache[cache_key] = (total, False, time.monotonic())
+            return total, False
+
+        if self.sharded:
+            counts = [self._count_all(db, exact_threshold, shard_id) for shard_id in shard_router.shard_ids]
+            total, is_estimate = sum(c[0] for c in counts), any(c[1] for c in counts)
+        else:
+            total, is_estimate = self._count_all(db, exact_threshold)
+        self._count_cache["all"] = (total, is_estimate, time.monotonic())
+        return total, is_estimate
+
+    def _count_all(self, db: Session, exact_threshold: int, shard_id: Optional[str] = None) -> tuple[int, bool]:
+        # shard_id: đếm trên 1 shard (bảng được shard), None là DB của session
+        bind_arguments = {"shard_id": shard_id} if shard_id is not None else None
+        reltuples = db.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": self.model.__table__.fullname},
+            bind_arguments=bind_arguments,
+        ).scalar()
+        # reltuples = -1 (hoặc NULL) khi bảng chưa từng được ANALYZE
+        if reltuples is None or reltuples < exact_threshold:
+            return db.execute(self._stmt_count, bind_arguments=bind_arguments).scalar_one(), False
+        # EXPLAIN câu không aggregate: plan COUNT(*) song song dừng ở Gather với Plan Rows ~ số worker,
+        # còn Plan Rows gốc của SELECT 1 ... WHERE alive là ước lượng số dòng còn sống
+        compiled = self._stmt_alive_rows.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+        plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"), bind_arguments=bind_arguments).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"]), True
 
     @staticmethod
     def _as_dict(obj: Any) -> Dict[str, Any]:
@@ -195,40 +618,225 @@ class CoreService(Generic[TModel]):
         Returns:
             set[str]: Các cột hợp lệ để update.
         """
-        audit = {"CreatedAt", "UpdatedAt", "CreatedBy", "UpdatedBy", "IsDeleted"}
+        audit = {"CreatedAt", "UpdatedAt", "CreatedBy", "UpdatedBy", "IsDeleted", "version"}
         mapper = sa_inspect(self.model)
         cols = {c.key for c in mapper.columns}
         cols.discard(self.pk.key)
+        if self.owner_field:
+            cols.discard(self.owner_field)  # owner chỉ được gán lúc tạo
         cols = cols.difference(audit)
         return cols
 
-    def clone(self, db: Session, obj_id: int, overrides: Optional[Dict[str, Any]] = None) -> Optional[TModel]:
+    def _conditional_update(
+        self,
+        db: Session,
+        obj_id: int,
+        values: Dict[str, Any],
+        allowed: set,
+        expected_version: Optional[int],
+        owner_id: Optional[int] = None,
+    ) -> Optional[Any]:
+        """
+        Cập nhật model có version bằng 1 câu `UPDATE ... WHERE id = :id [AND version = :v] RETURNING ...`,
+        tăng version lên 1; không đọc trước, không khoá dòng.
+
+        Args:
+            db (Session): SQLAlchemy session.
+            obj_id (int): Id record cần cập nhật.
+            values (Dict[str, Any]): Dữ liệu mới (key "version" được dùng làm expected_version nếu chưa có).
+            allowed (set): Các cột được phép ghi.
+            expected_version (int, optional): Version client đã đọc; None là không kiểm tra.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
+
+        Returns:
+            Optional[Any]: DTO (`self.row_class`) sau khi update hoặc None nếu không tìm thấy.
+
+        Raises:
+            VersionConflictError: Record tồn tại nhưng version đã khác.
         """
-        Nhân bản 1 record.
+        if expected_version is None:
+            expected_version = values.get("version")
+        data = {k: v for k, v in values.items() if k in allowed}
+        model = self.model
+        stmt = update(model).where(self.pk == obj_id, model.IsDeleted == false())
+        if owner_id is not None:
+            stmt = stmt.where(self.owner_col == owner_id)
+        if expected_version is not None:
+            stmt = stmt.where(model.version == expected_version)
+        # Có change listener: lấy giá trị cũ trong cùng câu lệnh (UPDATE ... FROM bản khoá FOR UPDATE
+        # của chính dòng đó), vẫn 1 round trip
+        tracked = [k for k in data if k not in _DIFF_IGNORED] if self._change_listeners else []
+        old_cols = []
+        if tracked:
+            table = model.__table__
+            old = (
+                select(self.pk, *(table.c[k] for k in tracked))
+                .where(self.pk == obj_id)
+                .with_for_update()
+                .subquery("old")
+            )
+            stmt = stmt.where(self.pk == old.c[self.pk.key])
+            old_cols = [old.c[k].label(f"old_{k}") for k in tracked]
+        stmt = stmt.values(**data, version=model.version + 1).returning(*self._row_columns, *old_cols)
+        row = db.execute(stmt, execution_options={"synchronize_session": False}).first()
+        if row is None:
+            current = db.execute(*self._stmt("_stmt_version", {"obj_id": obj_id}, owner_id)).scalar()
+            db.rollback()
+            if current is None:
+                return None
+            raise VersionConflictError(obj_id, expected_version, current)
+        db.commit()
+        n = len(self._row_columns)
+        obj = self.row_class(*row[:n])
+        changes = None
+        if self._change_listeners:
+            changes = self._diff(dict(zip(tracked, row[n:])), {k: data[k] for k in tracked})
+        self._notify("updated", obj, changes, actor=data.get("UpdatedBy") or owner_id)
+        return obj
+
+    def clone(
+        self, db: Session, obj_id: int, overrides: Optional[Dict[str, Any]] = None, owner_id: Optional[int] = None
+    ) -> Optional[TModel]:
+        """
+        Nhân bản 1 record (1 câu `INSERT ... SELECT`, xem `clone_many`).
 
         Args:
             db (Session): SQLAlchemy session.
             obj_id (int): Id bản ghi cần clone.
             overrides (Dict[str, Any], optional): Giá trị ghi đè.
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
 
         Returns:
-            Optional[TModel]: Record mới được clone.
+            Optional[TModel]: Record mới được clone (DTO `self.row_class`) hoặc None nếu không tìm thấy.
 
         Example:
             user_service.clone(db, 5, overrides={"username": "copy_user"})
         """
-        src = self.get_by_id(db, obj_id)
-        if not src:
-            return None
-        writable = self._writable_columns()
-        payload = {col: getattr(src, col) for col in writable}
-        if overrides:
-            payload.update({k: v for k, v in overrides.items() if k in writable})
-        if "IsActive" in sa_inspect(self.model).columns:
-            payload.setdefault("IsActive", True)
-        return self.create(db, payload)
+        objs = self.clone_many(db, [obj_id], overrides=[overrides], owner_id=owner_id)
+        return objs[0] if objs else None
+
+    def clone_many(
+        self,
+        db: Session,
+        obj_ids: Sequence[int],
+        overrides: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+        owner_id: Optional[int] = None,
+        created_by: Optional[str] = None,
+    ) -> Optional[List[Any]]:
+        """
+        Nhân bản nhiều record bằng 1 câu `INSERT ... SELECT ... RETURNING` (không đọc record nguồn
+        vào Python). Cùng 1 id có thể xuất hiện nhiều lần để tạo nhiều bản sao.
+        Giống `clone`: copy các cột ghi được + owner của bản gốc, audit field lấy giá trị mặc định
+        (CreatedAt = now(), IsDeleted = False, version = 1).
+
+        Args:
+            db (Session): SQLAlchemy session.
+            obj_ids (Sequence[int]): Id bản ghi nguồn, mỗi phần tử là 1 bản sao.
+            overrides (Sequence[dict], optional): Giá trị ghi đè cho từng bản sao (cùng thứ tự với obj_ids).
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
+            created_by (str, optional): Ghi vào CreatedBy của các bản sao.
+
+        Returns:
+            Optional[List[Any]]: DTO (`self.row_class`) của các bản sao theo thứ tự obj_ids,
+            hoặc None nếu có id nguồn không tồn tại (không tạo bản nào).
 
-    def update_from(self, db: Session, obj_id: int, source_obj: Any, fields: Iterable[str]) -> Optional[TModel]:
+        Example:
+            todo_service.clone_many(db, [5] * 3, overrides=[{"name": f"Copy {i}"} for i in range(3)])
+        """
+        if not obj_ids:
+            return []
+        self._route(db, owner_id, write=True)
+        overrides = list(overrides or [])
+        if len(overrides) > len(obj_ids):
+            raise ValueError("More overrides than obj_ids")
+        overrides += [None] * (len(obj_ids) - len(overrides))
+
+        model = self.model
+        table = model.__table__
+        writable = sorted(self._writable_columns())
+        copied = writable + ([self.owner_field] if self.owner_field else [])
+        # Chỉ đưa vào VALUES các cột thật sự được ghi đè: mỗi cột 1 cặp (giá trị, có ghi đè hay không)
+        # để phân biệt "ghi đè bằng NULL" với "giữ giá trị gốc"
+        override_cols = sorted({k for o in overrides if o for k in o if k in writable})
+        copies = values(
+            column("ord", Integer),
+            column("src_id", self.pk.type),
+            *(column(f"o_{i}", table.c[k].type) for i, k in enumerate(override_cols)),
+            *(column(f"h_{i}", Boolean) for i in range(len(override_cols))),
+            name="copies",
+        ).data([
+            (
+                ord_,
+                obj_id,
+                *((o or {}).get(k) for k in override_cols),
+                *(bool(o) and k in o for k in override_cols),
+            )
+            for ord_, (obj_id, o) in enumerate(zip(obj_ids, overrides))
+        ])
+
+        exprs = []
+        for name in copied:
+            if name in override_cols:
+                i = override_cols.index(name)
+                value = cast(copies.c[f"o_{i}"], table.c[name].type)
+                exprs.append(case((copies.c[f"h_{i}"], value), else_=table.c[name]))
+            else:
+                exprs.append(table.c[name])
+        target = list(copied)
+        if created_by is not None and "CreatedBy" in table.c:
+            target.append("CreatedBy")
+            exprs.append(bindparam("created_by", created_by))
+
+        # PK lấy từ sequence ngay trong SELECT để nối kết quả RETURNING về lại `ord` của từng bản sao
+        # (RETURNING của INSERT chỉ thấy cột của bảng đích)
+        new_id = func.nextval(func.pg_get_serial_sequence(table.fullname, self.pk.key))
+        src = (
+            select(new_id.label("new_id"), copies.c.ord, *(e.label(f"v_{i}") for i, e in enumerate(exprs)))
+            .select_from(copies.join(table, self.pk == copies.c.src_id))
+            .where(model.IsDeleted == false())
+        )
+        if owner_id is not None:
+            if self.owner_col is None:
+                raise ValueError(f"{model.__name__} has no owner column")
+            src = src.where(self.owner_col == owner_id)
+        src = src.cte("src")
+        # Các cột không nằm trong `target` (IsActive, IsDeleted, version...) nhận default của model
+        inserted = (
+            insert(model)
+            .from_select([self.pk.key, *target], select(src.c.new_id, *(src.c[f"v_{i}"] for i in range(len(exprs)))))
+            .returning(*self._row_columns)
+            .cte("inserted")
+        )
+        stmt = (
+            select(*(inserted.c[k] for k in self.row_keys), src.c.ord)
+            .join_from(inserted, src, inserted.c[self.pk.key] == src.c.new_id)
+            .order_by(src.c.ord)
+        )
+        # Câu lệnh không có entity ORM: chỉ rõ mapper để session chọn đúng DB / shard
+        rows = db.execute(stmt, bind_arguments={"mapper": sa_inspect(model)}).all()
+        if len(rows) != len(obj_ids):
+            db.rollback()
+            return None
+        db.commit()
+        # Nhiều shard (owner_id=None) trả về từng phần đã sắp theo ord: sắp lại toàn bộ theo ord = thứ tự obj_ids
+        rows.sort(key=lambda r: r[-1])
+        objs = self._to_rows(r[:-1] for r in rows)
+        for obj in objs:
+            changes = None
+            if self._change_listeners:
+                changes = self._diff({}, {k: getattr(obj, k) for k in target if getattr(obj, k) is not None})
+            self._notify("created", obj, changes, actor=created_by or owner_id)
+        return objs
+
+    def update_from(
+        self,
+        db: Session,
+        obj_id: int,
+        source_obj: Any,
+        fields: Iterable[str],
+        expected_version: Optional[int] = None,
+        owner_id: Optional[int] = None,
+    ) -> Optional[TModel]:
         """
         Cập nhật record từ 1 object nguồn (dict/Pydantic/ORM) theo danh sách field.
 
@@ -237,27 +845,48 @@ class CoreService(Generic[TModel]):
             obj_id (int): Id record cần cập nhật.
             source_obj (Any): Object chứa dữ liệu nguồn.
             fields (Iterable[str]): Danh sách field cần copy.
+            expected_version (int, optional): Version client đã đọc (chỉ với model có version).
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
 
         Returns:
             Optional[TModel]: Record đã cập nhật hoặc None nếu không có.
 
+        Raises:
+            VersionConflictError: Version không khớp (model có version).
+
         Example:
             user_service.update_from(db, 5, user_update_schema, ["username", "email"])
         """
-        db_obj = self.get_by_id(db, obj_id)
-        if not db_obj:
-            return None
         src = self._as_dict(source_obj)
         writable = self._writable_columns()
-        for name in fields:
-            if name in src and name in writable:
-                setattr(db_obj, name, src[name])
+        self._route(db, owner_id, write=True)
+        if self.versioned:
+            values = {name: src[name] for name in fields if name in src}
+            if expected_version is None:
+                expected_version = src.get("version")
+            return self._conditional_update(db, obj_id, values, writable, expected_version, owner_id)
+        db_obj = self.get_by_id(db, obj_id, owner_id=owner_id)
+        if not db_obj:
+            return None
+        values = {name: src[name] for name in fields if name in src and name in writable}
+        old = {name: getattr(db_obj, name) for name in values} if self._change_listeners else None
+        for name, value in values.items():
+            setattr(db_obj, name, value)
         db_obj.UpdatedAt = datetime.datetime.utcnow()
         db.commit()
         db.refresh(db_obj)
+        changes = self._diff(old, values) if old is not None else None
+        self._notify("updated", db_obj, changes, actor=src.get("UpdatedBy") or owner_id)
         return db_obj
 
-    def update_fields(self, db: Session, obj_id: int, values: Dict[str, Any]) -> Optional[TModel]:
+    def update_fields(
+        self,
+        db: Session,
+        obj_id: int,
+        values: Dict[str, Any],
+        expected_version: Optional[int] = None,
+        owner_id: Optional[int] = None,
+    ) -> Optional[TModel]:
         """
         Cập nhật record bằng dict field->value.
 
@@ -265,21 +894,32 @@ class CoreService(Generic[TModel]):
             db (Session): SQLAlchemy session.
             obj_id (int): Id record cần cập nhật.
             values (Dict[str, Any]): Dữ liệu mới.
+            expected_version (int, optional): Version client đã đọc (chỉ với model có version).
+            owner_id (int, optional): Chỉ thao tác trên record của user này; None là không lọc theo owner.
 
         Returns:
             Optional[TModel]: Record đã cập nhật hoặc None nếu không có.
 
+        Raises:
+            VersionConflictError: Version không khớp (model có version).
+
         Example:
             user_service.update_fields(db, 5, {"username": "new_name"})
         """
-        db_obj = self.get_by_id(db, obj_id)
+        writable = self._writable_columns()
+        self._route(db, owner_id, write=True)
+        if self.versioned:
+            return self._conditional_update(db, obj_id, values, writable, expected_version, owner_id)
+        db_obj = self.get_by_id(db, obj_id, owner_id=owner_id)
         if not db_obj:
             return None
-        writable = self._writable_columns()
+        values = {k: v for k, v in values.items() if k in writable}
+        old = {k: getattr(db_obj, k) for k in values} if self._change_listeners else None
         for k, v in values.items():
-            if k in writable:
-                setattr(db_obj, k, v)
+            setattr(db_obj, k, v)
         db_obj.UpdatedAt = datetime.datetime.utcnow()
         db.commit()
         db.refresh(db_obj)
+        changes = self._diff(old, values) if old is not None else None
+        self._notify("updated", db_obj, changes, actor=owner_id)
         return db_obj
@@ -0,0 +1,160 @@
+import datetime
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from config import settings
+from database.db import engine
+
+logger = logging.getLogger(__name__)
+
+_LAG_SQL = text(
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class HealthChecker:
+    """
+    Kiểm tra sức khoẻ định kỳ trong thread nền, probe chỉ đọc kết quả đã cache (không I/O):
+      - db: kết nối riêng ngoài pool (NullPool) để đo khả năng kết nối + độ trễ `SELECT 1`,
+        không bị ảnh hưởng khi pool của app đang cạn;
+      - pool: tỉ lệ connection đang dùng / tối đa của engine chính;
+      - replication: độ trễ replay (giây) nếu DB là replica, None nếu là primary;
+      - các check bổ sung đăng ký qua `add_check` (trả về True / False).
+    Trạng thái quá cũ (> 3 chu kỳ) bị coi là chưa sẵn sàng.
+    """
+
+    def __init__(self, interval: float, db_timeout: int, max_pool_saturation: float, max_replication_lag: float):
+        self.interval = interval
+        self.db_timeout = db_timeout
+        self.max_pool_saturation = max_pool_saturation
+        self.max_replication_lag = max_replication_lag
+        self.state: Dict[str, Any] = {"ready": False, "checked_at": None, "checks": {}}
+        self._checked_at = 0.0
+        self._checks: Dict[str, Callable[[], bool]] = {}
+        self._probe_engine = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_check(self, name: str, fn: Callable[[], bool]) -> None:
+        self._checks[name] = fn
+
+    def _check_db(self) -> Tuple[Dict[str, Any], Optional[float]]:
+        if self._probe_engine is None:
+            self._probe_engine = create_engine(
+                settings.DATABASE_URL,
+                poolclass=NullPool,
+                connect_args={"connect_timeout": self.db_timeout},
+            )
+        start = time.perf_counter()
+        try:
+            with self._probe_engine.connect() as conn:
+                conn.execute(text(f"SET statement_timeout = {int(self.db_timeout * 1000)}"))
+                conn.execute(text("SELECT 1"))
+                lag = conn.execute(_LAG_SQL).scalar()
+        except Exception as e:
+            # Một số lỗi (vd timeout) có message rỗng: dùng tên lớp lỗi
+            return {"ok": False, "error": (str(e).splitlines() or [type(e).__name__])[0]}, None
+        latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        return {"ok": True, "latency_ms": latency_ms}, (float(lag) if lag is not None else None)
+
+    def _check_pool(self) -> Dict[str, Any]:
+        pool = engine.pool
+        try:
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            in_use = pool.checkedout()
+        except AttributeError:  # pool không phải QueuePool
+            return {"ok": True}
+        saturation = in_use / capacity if capacity else 0.0
+        return {
+            "ok": saturation < self.max_pool_saturation,
+            "in_use": in_use,
+            "capacity": capacity,
+            "saturation": round(saturation, 3),
+        }
+
+    def check_now(self) -> Dict[str, Any]:
+        """
+        Chạy mọi check ngay lập tức và cập nhật trạng thái cache.
+
+        Returns:
+            Dict[str, Any]: Trạng thái mới ({"ready": bool, "checked_at": ..., "checks": {...}}).
+        """
+        db, lag = self._check_db()
+        checks = {"db": db, "pool": self._check_pool()}
+        checks["replication"] = {
+            "ok": lag is None or lag <= self.max_replication_lag,
+            "lag_seconds": lag,
+        }
+        for name, fn in self._checks.items():
+            try:
+                checks[name] = {"ok": bool(fn())}
+            except Exception as e:
+                checks[name] = {"ok": False, "error": str(e)}
+        self.state = {
+            "ready": all(c["ok"] for c in checks.values()),
+            "checked_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "checks": checks,
+        }
+        self._checked_at = time.monotonic()
+        return self.state
+
+    def readiness(self) -> Dict[str, Any]:
+        """Trạng thái cache cho /readyz (không I/O)."""
+        state = dict(self.state)
+        if time.monotonic() - self._checked_at > 3 * self.interval:
+            state.update(ready=False, reason="stale")
+        return state
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-checker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.db_timeout + 1)
+            self._thread = None
+        if self._probe_engine is not None:
+            self._probe_engine.dispose()
+            self._probe_engine = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check_now()
+            except Exception:
+                # Không để thread chết: trạng thái cũ sẽ thành "stale" sau 3 chu kỳ
+                logger.exception("Health check failed")
+
+
+health_checker = HealthChecker(
+    interval=settings.HEALTH_CHECK_INTERVAL_SECONDS,
+    db_timeout=settings.HEALTH_DB_TIMEOUT_SECONDS,
+    max_pool_saturation=settings.HEALTH_MAX_POOL_SATURATION,
+    max_replication_lag=settings.HEALTH_MAX_REPLICATION_LAG_SECONDS,
+)
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/healthz")
+async def healthz():
+    # Liveness: process còn phục vụ được request, không chạm DB
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz():
+    state = health_checker.readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
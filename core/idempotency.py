@@ -0,0 +1,182 @@
+import datetime
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, String, JSON, delete, select, func
+from sqlalchemy.dialects.postgresql import JSONB, insert
+
+from config import settings
+from database.db import Base, engine
+
+
+class IdempotencyKeyModel(Base):
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String(100), primary_key=True)      # vd "POST /api/todo"
+    key = Column(String(255), primary_key=True)        # giá trị header Idempotency-Key
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(10), nullable=False)        # "pending" | "done"
+    response = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)   # lúc worker nhận chạy; cũng là token của lần claim
+
+
+class IdempotencyError(Exception):
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class IdempotencyStore:
+    """
+    Lưu kết quả của các request POST theo Idempotency-Key để client retry nhận lại đúng kết quả cũ.
+
+    - Dòng "pending" được INSERT ... ON CONFLICT DO NOTHING trước khi chạy: ai insert được thì
+      là người duy nhất thực thi (single-flight giữa các worker), các request trùng sẽ chờ kết quả.
+    - Dòng "pending" chỉ giữ trong thời gian lease ngắn: worker chết giữa chừng (OOM, SIGKILL, deploy)
+      thì hết lease request khác nhận lại key; chỉ kết quả "done" mới giữ đủ TTL.
+    - Trong cùng process, lock theo key giúp request trùng chờ mà không phải poll DB.
+    - Kết quả lỗi không được lưu, dòng pending bị xoá để client có thể thử lại.
+    """
+
+    def __init__(self, ttl_seconds: int, wait_seconds: float, lease_seconds: int, poll_interval: float = 0.05):
+        self.ttl = datetime.timedelta(seconds=ttl_seconds)
+        self.lease = datetime.timedelta(seconds=lease_seconds)
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+        self._guard = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], List[Any]] = {}
+        self._last_purge = 0.0
+
+    @contextmanager
+    def _key_lock(self, scope: str, key: str):
+        # Lock theo key, có đếm tham chiếu để dict không phình theo số key đã thấy
+        with self._guard:
+            entry = self._key_locks.setdefault((scope, key), [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[(scope, key)]
+
+    @staticmethod
+    def hash_payload(payload: Any) -> str:
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def run(self, scope: str, key: str, payload: Any, fn: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Thực thi `fn` đúng 1 lần cho mỗi (scope, key) trong thời gian TTL.
+
+        Args:
+            scope (str): Phạm vi của key (method + path).
+            key (str): Idempotency-Key do client gửi.
+            payload (Any): Body request, dùng để phát hiện key bị dùng lại với dữ liệu khác.
+            fn (Callable): Hàm thực thi, trả về response dạng dict (JSON-able) có "is_success".
+
+        Returns:
+            Tuple[Dict[str, Any], bool]: (response, True nếu là kết quả phát lại).
+
+        Raises:
+            IdempotencyError: Key dùng lại với payload khác (422) hoặc request trùng vẫn đang chạy (409).
+        """
+        request_hash = self.hash_payload(payload)
+        self._maybe_purge()
+        with self._key_lock(scope, key):
+            deadline = time.monotonic() + self.wait_seconds
+            while True:
+                claimed_at = self._claim(scope, key, request_hash)
+                if claimed_at is not None:
+                    break
+                row = self._load(scope, key)
+                if row is not None:
+                    if row.request_hash != request_hash:
+                        raise IdempotencyError("Idempotency-Key was already used with a different payload", 422)
+                    if row.status == "done":
+                        return row.response, True
+                # row is None: vừa bị xoá (hết hạn / hết lease / lần trước lỗi) nên claim lại ngay
+                if time.monotonic() >= deadline:
+                    raise IdempotencyError("A request with this Idempotency-Key is still in progress", 409)
+                if row is not None:
+                    time.sleep(self.poll_interval)
+
+            try:
+                result = fn()
+            except Exception:
+                self._release(scope, key, claimed_at)
+                raise
+            if result.get("is_success"):
+                self._complete(scope, key, claimed_at, result)
+            else:
+                self._release(scope, key, claimed_at)
+            return result, False
+
+    def _claim(self, scope: str, key: str, request_hash: str) -> Optional[datetime.datetime]:
+        # Trả về claimed_at nếu nhận được key, None nếu đang có dòng khác (done / pending còn lease)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        table = IdempotencyKeyModel.__table__
+        with engine.begin() as conn:
+            # expires_at của dòng pending là hạn lease -> xoá luôn claim của worker đã chết
+            conn.execute(delete(table).where(table.c.scope == scope, table.c.key == key, table.c.expires_at < now))
+            inserted = conn.execute(
+                insert(table)
+                .values(
+                    scope=scope, key=key, request_hash=request_hash, status="pending",
+                    claimed_at=now, expires_at=now + self.lease,
+                )
+                .on_conflict_do_nothing(index_elements=[table.c.scope, table.c.key])
+                .returning(table.c.key)
+            ).first()
+        return now if inserted is not None else None
+
+    def _load(self, scope: str, key: str):
+        table = IdempotencyKeyModel.__table__
+        with engine.connect() as conn:
+            return conn.execute(
+                select(table.c.request_hash, table.c.status, table.c.response)
+                .where(table.c.scope == scope, table.c.key == key)
+            ).first()
+
+    def _complete(self, scope: str, key: str, claimed_at: datetime.datetime, response: Dict[str, Any]) -> None:
+        # Chỉ ghi nếu claim vẫn là của mình (không bị request khác nhận lại sau khi hết lease); giữ đủ TTL từ đây
+        table = IdempotencyKeyModel.__table__
+        with engine.begin() as conn:
+            conn.execute(
+                table.update()
+                .where(table.c.scope == scope, table.c.key == key, table.c.claimed_at == claimed_at)
+                .values(status="done", response=response, expires_at=func.now() + self.ttl)
+            )
+
+    def _release(self, scope: str, key: str, claimed_at: datetime.datetime) -> None:
+        table = IdempotencyKeyModel.__table__
+        with engine.begin() as conn:
+            conn.execute(
+                delete(table).where(
+                    table.c.scope == scope, table.c.key == key,
+                    table.c.status == "pending", table.c.claimed_at == claimed_at,
+                )
+            )
+
+    def _maybe_purge(self) -> None:
+        # Dọn key hết hạn tối đa 5 phút/lần trong mỗi process
+        if time.monotonic() - self._last_purge < 300:
+            return
+        self._last_purge = time.monotonic()
+        table = IdempotencyKeyModel.__table__
+        with engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.expires_at < func.now()))
+
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+    lease_seconds=settings.IDEMPOTENCY_LEASE_SECONDS,
+)
@@ -0,0 +1,30 @@
+class InFlightTracker:
+    """
+    Đếm số request HTTP đang xử lý trong worker hiện tại.
+    Việc chờ request khi tắt do uvicorn làm (`timeout_graceful_shutdown` = GRACEFUL_TIMEOUT_SECONDS);
+    lúc lifespan shutdown chạy mà số này > 0 nghĩa là request bị cắt ngang.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+
+class InFlightMiddleware:
+    """ASGI middleware cập nhật InFlightTracker cho mỗi request HTTP."""
+
+    def __init__(self, app, tracker: InFlightTracker):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self.tracker.count += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.tracker.count -= 1
+
+
+inflight = InFlightTracker()
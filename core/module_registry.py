@@ -0,0 +1,103 @@
+import importlib
+import pkgutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi import APIRouter, FastAPI
+from starlette.staticfiles import StaticFiles
+
+
+@dataclass
+class ModuleInfo:
+    name: str
+    routers: List[APIRouter] = field(default_factory=list)
+    import_ms: Dict[str, float] = field(default_factory=dict)
+    static_dir: Optional[Path] = None
+    on_startup: List[Callable[[], None]] = field(default_factory=list)
+    on_shutdown: List[Callable[[], None]] = field(default_factory=list)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.import_ms.values())
+
+
+class ModuleRegistry:
+    """
+    Tự phát hiện các module trong package `modules/` thay cho import tay trong main.py.
+
+    Với mỗi thư mục `modules/<name>/`:
+      - import mọi file `*_controller.py` và `view/controller.py`, lấy biến `router`;
+      - nếu controller có hàm `on_startup()` / `on_shutdown()` thì gọi trong lifespan;
+      - nếu có `view/static/` thì mount tại `/modules/<name>/static`.
+    Thời gian import của từng file được ghi lại để xem module nào làm chậm khởi động.
+    """
+
+    def __init__(self, package: str = "modules"):
+        self.package = package
+        self.modules: List[ModuleInfo] = []
+
+    def discover(self) -> List[ModuleInfo]:
+        root = importlib.import_module(self.package)
+        self.modules = []
+        for pkg in sorted(pkgutil.iter_modules(root.__path__), key=lambda m: m.name):
+            if not pkg.ispkg:
+                continue
+            pkg_dir = Path(root.__path__[0]) / pkg.name
+            info = ModuleInfo(name=pkg.name)
+
+            targets = [f"{self.package}.{pkg.name}.{p.stem}" for p in sorted(pkg_dir.glob("*_controller.py"))]
+            if (pkg_dir / "view" / "controller.py").exists():
+                targets.append(f"{self.package}.{pkg.name}.view.controller")
+
+            for target in targets:
+                start = time.perf_counter()
+                mod = importlib.import_module(target)
+                info.import_ms[target] = (time.perf_counter() - start) * 1000
+                router = getattr(mod, "router", None)
+                if isinstance(router, APIRouter):
+                    info.routers.append(router)
+                if callable(getattr(mod, "on_startup", None)):
+                    info.on_startup.append(mod.on_startup)
+                if callable(getattr(mod, "on_shutdown", None)):
+                    info.on_shutdown.append(mod.on_shutdown)
+
+            static_dir = pkg_dir / "view" / "static"
+            if static_dir.is_dir():
+                info.static_dir = static_dir
+            if info.routers:
+                self.modules.append(info)
+        return self.modules
+
+    def register(self, app: FastAPI) -> None:
+        for info in self.modules:
+            if info.static_dir is not None:
+                app.mount(
+                    f"/{self.package}/{info.name}/static",
+                    StaticFiles(directory=str(info.static_dir)),
+                    name=f"{info.name}_static",
+                )
+            for router in info.routers:
+                app.include_router(router)
+
+    def startup(self) -> None:
+        for info in self.modules:
+            for hook in info.on_startup:
+                hook()
+
+    def shutdown(self) -> None:
+        for info in reversed(self.modules):
+            for hook in info.on_shutdown:
+                hook()
+
+    def report(self) -> List[str]:
+        """Các dòng mô tả thời gian import theo module, chậm nhất trước."""
+        lines = []
+        for info in sorted(self.modules, key=lambda m: m.total_ms, reverse=True):
+            parts = ", ".join(f"{name.rsplit('.', 1)[-1]}={ms:.1f}ms" for name, ms in info.import_ms.items())
+            lines.append(f"{info.name}: {info.total_ms:.1f}ms ({parts})")
+        return lines
+
+
+module_registry = ModuleRegistry()
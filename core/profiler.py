@@ -0,0 +1,250 @@
+import contextvars
+import functools
+import inspect
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from fastapi.routing import APIRoute
+
+from config import settings
+
+OTHER_STACK = "[other]"
+
+
+class SamplingProfiler:
+    """
+    Profiler lấy mẫu cho từng route, chỉ bật khi cần (opt-in):
+      - route được bật cố định theo key "METHOD /path" (vd "GET /api/todo/page"),
+      - hoặc theo header (mặc định `X-Profile: 1`) trên từng request,
+      - hoặc ngẫu nhiên `sample_rate` phần lưu lượng.
+
+    Thread nền đọc `sys._current_frames()` mỗi `interval` giây, chỉ cho các thread đang chạy
+    endpoint được profile, rồi gộp stack về dạng collapsed ("a;b;c count") để vẽ flame graph
+    (flamegraph.pl, speedscope...). Thread nền tự dừng khi không còn request nào được profile.
+    Bộ nhớ có giới hạn: tối đa `max_stacks` stack khác nhau mỗi route (phần dư gộp vào "[other]"),
+    mỗi stack tối đa `max_depth` frame tính từ endpoint. Dữ liệu nằm trong từng worker process.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        routes: Iterable[str] = (),
+        sample_rate: float = 0.0,
+        header: str = "x-profile",
+        interval: float = 0.005,
+        max_stacks: int = 2000,
+        max_depth: int = 128,
+        max_routes: int = 200,
+    ):
+        self.enabled = enabled
+        self.routes: Set[str] = set(routes)
+        self.sample_rate = sample_rate
+        self.header = header.lower()
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.max_routes = max_routes
+        self.stacks: Dict[str, Counter] = {}
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+        self._threads: Dict[int, str] = {}   # thread id -> route key đang được profile
+        self._sampler: Optional[threading.Thread] = None
+        self._current: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("profile_route", default=None)
+        self._stop_codes: Set[Any] = set()  # code object của wrapper: stack được cắt tại đây
+        self._root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..")) + os.sep
+
+    def should_profile(self, key: str, headers) -> bool:
+        if not self.enabled:
+            return False
+        if key in self.routes:
+            return True
+        if headers.get(self.header) in ("1", "true"):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    # --- đánh dấu thread đang chạy endpoint ---
+    def _enter(self, key: str) -> int:
+        tid = threading.get_ident()
+        with self._lock:
+            self._threads[tid] = key
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+                self._sampler.start()
+        return tid
+
+    def _exit(self, tid: int) -> None:
+        with self._lock:
+            self._threads.pop(tid, None)
+
+    def wrap_endpoint(self, endpoint: Callable) -> Callable:
+        """
+        Bọc endpoint để đăng ký thread đang chạy nó khi request được đánh dấu profile.
+        Endpoint sync chạy trong threadpool (context được copy sang nên đọc được contextvar);
+        endpoint async chạy trên thread event loop nên mẫu có thể lẫn với request khác.
+        """
+        current = self._current
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def async_wrapper(*args, **kwargs):
+                key = current.get()
+                if key is None:
+                    return await endpoint(*args, **kwargs)
+                tid = self._enter(key)
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    self._exit(tid)
+            self._stop_codes.add(async_wrapper.__code__)
+            return async_wrapper
+
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            key = current.get()
+            if key is None:
+                return endpoint(*args, **kwargs)
+            tid = self._enter(key)
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                self._exit(tid)
+        self._stop_codes.add(wrapper.__code__)
+        return wrapper
+
+    # --- lấy mẫu ---
+    def _run(self) -> None:
+        idle_since = None
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                targets = dict(self._threads)
+            if not targets:
+                # Không còn gì để lấy mẫu: chờ thêm 1 chút rồi dừng thread
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since > 1.0:
+                    with self._lock:
+                        if not self._threads:
+                            self._sampler = None
+                            return
+                continue
+            idle_since = None
+            frames = sys._current_frames()
+            for tid, key in targets.items():
+                frame = frames.get(tid)
+                if frame is not None:
+                    self._add(key, self._collapse(frame))
+
+    def _collapse(self, frame) -> str:
+        # Đi từ frame lá lên tới wrapper của endpoint, bỏ phần threadpool / event loop phía trên
+        names = []
+        while frame is not None and frame.f_code not in self._stop_codes:
+            if len(names) >= self.max_depth:
+                names.append("[truncated]")
+                break
+            code = frame.f_code
+            filename = code.co_filename
+            if filename.startswith(self._root):
+                filename = filename[len(self._root):]
+            else:
+                filename = os.path.basename(filename)
+            names.append(f"{code.co_name} ({filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def _add(self, key: str, stack: str) -> None:
+        with self._lock:
+            counter = self.stacks.get(key)
+            if counter is None:
+                if len(self.stacks) >= self.max_routes:
+                    return
+                counter = self.stacks[key] = Counter()
+            if stack not in counter and len(counter) >= self.max_stacks:
+                stack = OTHER_STACK
+            counter[stack] += 1
+
+    # --- đọc kết quả ---
+    def collapsed(self, key: Optional[str] = None) -> str:
+        """
+        Xuất dạng collapsed stack, mỗi dòng "frame1;frame2;... số_mẫu".
+
+        Args:
+            key (str, optional): Route cần xuất; None là gộp mọi route (route làm frame gốc).
+
+        Returns:
+            str: Nội dung để đưa vào flamegraph.pl / speedscope.
+        """
+        with self._lock:
+            items = {k: dict(v) for k, v in self.stacks.items() if key is None or k == key}
+        lines = []
+        for route, counter in items.items():
+            prefix = "" if key is not None else route.replace(";", ":") + ";"
+            for stack, n in counter.items():
+                lines.append(f"{prefix}{stack} {n}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {
+                k: {"requests": self.requests[k], "samples": sum(v.values()), "stacks": len(v)}
+                for k, v in self.stacks.items()
+            }
+            active = len(self._threads)
+        return {
+            "enabled": self.enabled,
+            "interval_ms": self.interval * 1000,
+            "sample_rate": self.sample_rate,
+            "pinned_routes": sorted(self.routes),
+            "active": active,
+            "routes": routes,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stacks.clear()
+            self.requests.clear()
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute hỗ trợ profiler: quyết định có profile request hay không (theo route / header /
+    tỉ lệ mẫu) rồi đặt contextvar để endpoint đã bọc đăng ký thread của nó với sampler.
+    Dùng qua `APIRouter(route_class=ProfiledRoute)`.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, profiler.wrap_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        keys = [f"{method} {self.path}" for method in sorted(self.methods or ())]
+
+        async def route_handler(request):
+            if not profiler.enabled:
+                return await handler(request)
+            key = keys[0] if len(keys) == 1 else f"{request.method} {self.path}"
+            if not profiler.should_profile(key, request.headers):
+                return await handler(request)
+            profiler.requests[key] += 1
+            token = profiler._current.set(key)
+            try:
+                return await handler(request)
+            finally:
+                profiler._current.reset(token)
+
+        return route_handler
+
+
+profiler = SamplingProfiler(
+    enabled=settings.PROFILER_ENABLED,
+    routes=[r.strip() for r in settings.PROFILER_ROUTES.split(",") if r.strip()],
+    sample_rate=settings.PROFILER_SAMPLE_RATE,
+    header=settings.PROFILER_HEADER,
+    interval=settings.PROFILER_INTERVAL_MS / 1000,
+    max_stacks=settings.PROFILER_MAX_STACKS,
+)
@@ -3,16 +3,23 @@ from pydantic import BaseModel
 
 T = TypeVar("T")
 
+class PageMeta(BaseModel):
+    skip: int
+    limit: int
+    total: Optional[int] = None     # Tổng số record (nếu client yêu cầu)
+    total_is_estimate: bool = False # True nếu total là số ước lượng từ planner
+
 class ResponseSchema(BaseModel, Generic[T]):
     status_code: int = 200          # HTTP status code (200, 404, 500,...)
     is_success: bool = True         # True nếu thành công, False nếu lỗi
     message: str = "Success"        # Nội dung kèm theo
     data: Optional[T] = None        # Payload (có thể None)
+    meta: Optional[PageMeta] = None # Thông tin phân trang (chỉ có ở route phân trang)
 
     # Helper methods để tạo response nhanh
     @classmethod
-    def success(cls, data: Optional[T] = None, message: str = "Success", status_code: int = 200):
-        return cls(status_code=status_code, is_success=True, message=message, data=data)
+    def success(cls, data: Optional[T] = None, message: str = "Success", status_code: int = 200, meta: Optional[PageMeta] = None):
+        return cls(status_code=status_code, is_success=True, message=message, data=data, meta=meta)
 
     @classmethod
     def fail(cls, message: str = "Failed", status_code: int = 400, data: Optional[Any] = None):
@@ -0,0 +1,338 @@
+import asyncio
+import datetime
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, List, Optional, Protocol, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DueEvent:
+    key: Hashable
+    due_at: datetime.datetime
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"key": self.key, "due_at": self.due_at.isoformat(), **self.payload}
+
+
+# Loader trả về các (key, due_at, payload) có hạn <= until
+Loader = Callable[[datetime.datetime], Iterable[Tuple[Hashable, datetime.datetime, Dict[str, Any]]]]
+
+
+class EventSink(Protocol):
+    def emit(self, event: DueEvent) -> None: ...
+
+
+class LogSink:
+    """Ghi sự kiện đến hạn ra log."""
+
+    def emit(self, event: DueEvent) -> None:
+        logger.info("Deadline due: %s", event.to_dict())
+
+
+class WebhookSink:
+    """
+    Stub webhook: dựng sẵn payload JSON sẽ POST tới url và ghi log.
+    Thay `emit` bằng HTTP client thật khi cần gửi đi.
+    """
+
+    def __init__(self, url: Optional[str]):
+        self.url = url
+
+    def emit(self, event: DueEvent) -> None:
+        body = json.dumps(event.to_dict(), default=str)
+        logger.info("Webhook stub POST %s %s", self.url or "<unset>", body)
+
+
+class SSESink:
+    """
+    Phát sự kiện tới các client đang nghe Server-Sent Events.
+    `emit` được gọi từ thread của scheduler nên đẩy vào queue qua `call_soon_threadsafe`.
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue, Optional[Callable[[DueEvent], bool]]]] = []
+        self._lock = threading.Lock()
+
+    def emit(self, event: DueEvent) -> None:
+        data = json.dumps(event.to_dict(), default=str)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue, match in subscribers:
+            if match is None or match(event):
+                loop.call_soon_threadsafe(self._offer, queue, data)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, data: str) -> None:
+        # Client đọc chậm thì bỏ sự kiện thay vì giữ bộ nhớ vô hạn
+        if not queue.full():
+            queue.put_nowait(data)
+
+    async def subscribe(self, match: Optional[Callable[[DueEvent], bool]] = None) -> AsyncIterator[str]:
+        """Async generator trả về từng frame SSE cho 1 client; `match` lọc sự kiện client được nhận (vd theo owner)."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        entry = (asyncio.get_running_loop(), queue, match)
+        with self._lock:
+            self._subscribers.append(entry)
+        try:
+            while True:
+                data = await queue.get()
+                yield f"event: deadline\ndata: {data}\n\n"
+        finally:
+            with self._lock:
+                self._subscribers.remove(entry)
+
+
+def build_sink(kind: str, webhook_url: Optional[str] = None) -> EventSink:
+    """
+    Tạo sink theo cấu hình SCHEDULER_SINK.
+
+    Args:
+        kind (str): "log" | "webhook" | "sse".
+        webhook_url (str, optional): Url cho webhook sink.
+
+    Returns:
+        EventSink: Sink tương ứng.
+    """
+    if kind == "webhook":
+        return WebhookSink(webhook_url)
+    if kind == "sse":
+        return SSESink()
+    return LogSink()
+
+
+def advisory_lock_id(name: str) -> int:
+    """
+    Id advisory lock (bigint) ổn định suy ra từ tên, để các module không phải tự chọn số và tránh trùng nhau.
+
+    Example:
+        advisory_lock_id("todo.reminders")
+    """
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big", signed=True)
+
+
+class AdvisoryLockLeader:
+    """
+    Bầu leader giữa các worker bằng Postgres advisory lock.
+    Lock gắn với session nên phải giữ 1 connection riêng suốt thời gian làm leader.
+    """
+
+    def __init__(self, engine: Engine, lock_id: int):
+        self.engine = engine
+        self.lock_id = lock_id
+        self._conn: Optional[Connection] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None
+
+    def try_acquire(self) -> bool:
+        """
+        Giữ/kiểm tra quyền leader. Gọi định kỳ: nếu connection giữ lock đã chết thì mất quyền leader.
+
+        Returns:
+            bool: True nếu process này đang là leader.
+        """
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                logger.warning("Lost scheduler leader connection")
+                self._close()
+        conn = None
+        try:
+            conn = self.engine.connect()
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": self.lock_id}).scalar()
+            conn.commit()
+        except Exception:
+            logger.exception("Scheduler leader election failed")
+            if conn is not None:
+                conn.close()
+            return False
+        if acquired:
+            self._conn = conn
+            return True
+        conn.close()
+        return False
+
+    def release(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": self.lock_id})
+            self._conn.commit()
+        except Exception:
+            pass
+        self._close()
+
+    def _close(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+
+class DeadlineScheduler:
+    """
+    Scheduler chạy trong 1 thread nền: giữ các deadline sắp tới trong min-heap
+    và phát sự kiện tới sink khi đến hạn.
+
+    - Mỗi `refresh_seconds` nạp lại cửa sổ [now, now + lookahead] qua `loader`
+      (bắt được cả thay đổi từ worker khác).
+    - `schedule`/`cancel` cập nhật tăng dần ngay khi có ghi trong process này.
+    - Entry cũ trong heap được bỏ qua lười (so với `_entries`), không cần xoá khỏi heap.
+    """
+
+    def __init__(
+        self,
+        loader: Loader,
+        sink: EventSink,
+        lookahead_seconds: int = 3600,
+        refresh_seconds: int = 60,
+        leader: Optional[AdvisoryLockLeader] = None,
+    ):
+        self.loader = loader
+        self.sink = sink
+        self.lookahead = datetime.timedelta(seconds=lookahead_seconds)
+        self.refresh_seconds = refresh_seconds
+        self.leader = leader
+
+        self._heap: List[Tuple[datetime.datetime, int, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[datetime.datetime, int, Dict[str, Any]]] = {}
+        self._fired: Dict[Hashable, datetime.datetime] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _now() -> datetime.datetime:
+        return datetime.datetime.now(datetime.timezone.utc)
+
+    @property
+    def horizon(self) -> datetime.datetime:
+        return self._now() + self.lookahead
+
+    # --- Cập nhật tăng dần ---
+    def schedule(self, key: Hashable, due_at: datetime.datetime, payload: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Thêm/cập nhật deadline cho key. Deadline ngoài cửa sổ lookahead sẽ được nạp ở lần refresh sau.
+
+        Args:
+            key (Hashable): Id duy nhất (vd todo_id).
+            due_at (datetime): Thời điểm đến hạn (timezone-aware).
+            payload (Dict[str, Any], optional): Dữ liệu kèm sự kiện.
+        """
+        with self._cond:
+            if due_at > self.horizon:
+                self._entries.pop(key, None)
+                return
+            if self._fired.get(key) == due_at:
+                return
+            seq = next(self._seq)
+            self._entries[key] = (due_at, seq, payload or {})
+            heapq.heappush(self._heap, (due_at, seq, key))
+            self._cond.notify()
+
+    def cancel(self, key: Hashable) -> None:
+        with self._cond:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # --- Vòng đời ---
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="deadline-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.leader is not None:
+            self.leader.release()
+
+    def _reload(self) -> None:
+        items = list(self.loader(self.horizon))
+        with self._cond:
+            self._heap.clear()
+            self._entries.clear()
+            for key, due_at, payload in items:
+                if self._fired.get(key) == due_at:
+                    continue
+                seq = next(self._seq)
+                self._entries[key] = (due_at, seq, payload)
+                self._heap.append((due_at, seq, key))
+            heapq.heapify(self._heap)
+            # Chỉ cần nhớ các key đã phát còn nằm trong cửa sổ để tránh phát lại
+            cutoff = self._now() - datetime.timedelta(seconds=self.refresh_seconds * 2)
+            self._fired = {k: d for k, d in self._fired.items() if d >= cutoff}
+
+    def _pop_due(self) -> List[DueEvent]:
+        now = self._now()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, seq, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != seq:
+                continue  # entry đã bị huỷ hoặc thay thế
+            del self._entries[key]
+            self._fired[key] = due_at
+            due.append(DueEvent(key=key, due_at=due_at, payload=entry[2]))
+        return due
+
+    def _run(self) -> None:
+        next_refresh = 0.0
+        while True:
+            with self._cond:
+                if self._stop:
+                    return
+            now_ts = self._now().timestamp()
+            if now_ts >= next_refresh:
+                next_refresh = now_ts + self.refresh_seconds
+                if self.leader is None or self.leader.try_acquire():
+                    try:
+                        self._reload()
+                    except Exception:
+                        logger.exception("Deadline scheduler reload failed")
+                else:
+                    with self._cond:
+                        self._heap.clear()
+                        self._entries.clear()
+
+            with self._cond:
+                events = self._pop_due() if (self.leader is None or self.leader.is_leader) else []
+            for event in events:
+                try:
+                    self.sink.emit(event)
+                except Exception:
+                    logger.exception("Deadline sink failed for %s", event.key)
+
+            with self._cond:
+                if self._stop:
+                    return
+                wait = next_refresh - self._now().timestamp()
+                if self._heap:
+                    wait = min(wait, (self._heap[0][0] - self._now()).total_seconds())
+                if wait > 0:
+                    self._cond.wait(wait)
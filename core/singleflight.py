@@ -0,0 +1,131 @@
+import asyncio
+import inspect
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Hashable
+
+from starlette.concurrency import run_in_threadpool
+
+
+class SingleFlight:
+    """
+    Gộp các lời gọi đọc giống hệt nhau đang chạy đồng thời thành 1 lần gọi thật.
+
+    Lời gọi đầu tiên cho 1 key (leader) thực thi `fn`; các lời gọi cùng key tới trong lúc đó
+    (follower) chờ và nhận chung kết quả. Follower chờ quá `wait_timeout` thì tự chạy `fn`.
+    Kết quả được chia sẻ giữa các request nên `fn` phải trả về dữ liệu không gắn Session
+    (vd DTO của chế độ chỉ đọc trong CoreService).
+
+    Dùng được cả trong thread của threadpool (`do`) lẫn trong event loop (`ado`),
+    hai phía dùng chung bảng lời gọi đang chạy.
+    """
+
+    def __init__(self, wait_timeout: float = 2.0, max_tracked_keys: int = 1000):
+        self.wait_timeout = wait_timeout
+        self.max_tracked_keys = max_tracked_keys
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._stats: "OrderedDict[Hashable, Dict[str, int]]" = OrderedDict()
+
+    def _join(self, key: Hashable):
+        """Trả về (future, is_leader)."""
+        with self._lock:
+            fut = self._calls.get(key)
+            if fut is not None:
+                self._count(key, "shared")
+                return fut, False
+            fut = Future()
+            self._calls[key] = fut
+            self._count(key, "leader")
+            return fut, True
+
+    def _finish(self, key: Hashable, fut: Future, result: Any = None, error: BaseException = None) -> None:
+        with self._lock:
+            if self._calls.get(key) is fut:
+                del self._calls[key]
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+    def _count(self, key: Hashable, field: str) -> None:
+        # Chỉ giữ số liệu cho `max_tracked_keys` key gần nhất
+        stats = self._stats.pop(key, None) or {"leader": 0, "shared": 0, "timeout": 0}
+        stats[field] += 1
+        self._stats[key] = stats
+        if len(self._stats) > self.max_tracked_keys:
+            self._stats.popitem(last=False)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Phiên bản đồng bộ (route sync chạy trong threadpool).
+
+        Args:
+            key (Hashable): Khoá định danh lời gọi (vd ("by_id", 5)).
+            fn (Callable): Hàm đọc dữ liệu.
+
+        Returns:
+            Any: Kết quả của fn (có thể dùng chung với request khác).
+        """
+        fut, leader = self._join(key)
+        if leader:
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, fut, error=e)
+                raise
+            self._finish(key, fut, result)
+            return result
+        try:
+            return fut.result(timeout=self.wait_timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._count(key, "timeout")
+            return fn()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Phiên bản async: `fn` có thể là hàm sync (chạy trong threadpool) hoặc coroutine function.
+
+        Args:
+            key (Hashable): Khoá định danh lời gọi.
+            fn (Callable): Hàm đọc dữ liệu.
+
+        Returns:
+            Any: Kết quả của fn.
+        """
+        async def call():
+            if inspect.iscoroutinefunction(fn):
+                return await fn()
+            return await run_in_threadpool(fn)
+
+        fut, leader = self._join(key)
+        if leader:
+            try:
+                result = await call()
+            except BaseException as e:
+                self._finish(key, fut, error=e)
+                raise
+            self._finish(key, fut, result)
+            return result
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), self.wait_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._count(key, "timeout")
+            return await call()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_key = {str(k): dict(v) for k, v in self._stats.items()}
+            in_flight = len(self._calls)
+        totals = {"leader": 0, "shared": 0, "timeout": 0}
+        for v in per_key.values():
+            for field, n in v.items():
+                totals[field] += n
+        return {"in_flight": in_flight, "totals": totals, "keys": per_key}
+
+
+# Các SingleFlight đang dùng theo tên (vd prefix route của CoreController), xem qua /admin/singleflight
+singleflights: Dict[str, SingleFlight] = {}
@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Mapping
+
+from config import settings
+
+
+class LazyTemplates:
+    """
+    Bọc Jinja2Templates nhưng chỉ import jinja2 và dựng Environment ở lần render đầu tiên,
+    để việc import router (lúc khởi động / spawn worker) không phải trả chi phí này.
+
+    Environment cấu hình cho production: không kiểm tra file thay đổi mỗi lần render
+    (trừ khi TEMPLATE_AUTO_RELOAD), bytecode đã compile được cache ra đĩa để worker mới
+    không phải compile lại template.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._templates = None
+
+    @property
+    def templates(self):
+        if self._templates is None:
+            from fastapi.templating import Jinja2Templates
+            from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+            if settings.TEMPLATE_CACHE_DIR:
+                bytecode_cache = FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR)
+            else:
+                bytecode_cache = FileSystemBytecodeCache()
+            env = Environment(
+                loader=FileSystemLoader(self.directory),
+                autoescape=True,
+                auto_reload=settings.TEMPLATE_AUTO_RELOAD,
+                bytecode_cache=bytecode_cache,
+            )
+            self._templates = Jinja2Templates(env=env)
+        return self._templates
+
+    def get_template(self, name: str):
+        return self.templates.get_template(name)
+
+    def TemplateResponse(self, *args: Any, **kwargs: Any):
+        return self.templates.TemplateResponse(*args, **kwargs)
+
+    def StreamingTemplateResponse(self, request, name: str, context: Mapping[str, Any]):
+        """
+        Render template theo từng đoạn (Template.generate) để byte đầu tiên tới client sớm
+        thay vì chờ render xong cả trang; hợp với danh sách dài.
+        """
+        from starlette.responses import StreamingResponse
+
+        template = self.get_template(name)
+        chunks = template.generate({"request": request, **context})
+        return StreamingResponse(chunks, media_type="text/html")
+
+
+class FragmentCache:
+    """
+    LRU cache cho đoạn HTML đã render (vd 1 dòng trong danh sách), key do caller quyết định,
+    nên đưa vào key những gì làm nội dung thay đổi (id + UpdatedAt).
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, key: Hashable, render: Callable[[], str]):
+        """
+        Lấy fragment từ cache hoặc render mới.
+
+        Args:
+            key (Hashable): Khoá fragment.
+            render (Callable[[], str]): Hàm render khi cache miss.
+
+        Returns:
+            Markup: HTML đã an toàn để chèn vào template cha.
+        """
+        with self._lock:
+            html = self._items.get(key)
+            if html is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return html
+        from markupsafe import Markup
+
+        html = Markup(render())
+        with self._lock:
+            self.misses += 1
+            self._items[key] = html
+            if len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return html
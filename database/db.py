@@ -1,13 +1,36 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from config import settings
+from database.query_monitor import query_monitor
 
-engine = create_engine(settings.DATABASE_URL, future=True, pool_pre_ping=True)
+engine = create_engine(
+    settings.DATABASE_URL,
+    future=True,
+    pool_pre_ping=True,
+    connect_args={"prepare_threshold": settings.DB_PREPARE_THRESHOLD},
+)
+if settings.QUERY_MONITOR_ENABLED:
+    query_monitor.attach(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+def reset_engine_after_fork():
+    """
+    Gọi trong process con sau khi fork: bỏ các connection kế thừa từ process cha
+    (không đóng chúng, vì socket vẫn thuộc về cha) để con tự mở pool mới.
+    """
+    engine.dispose(close=False)
+    query_monitor.reset_after_fork()
+    if settings.SHARD_URLS:
+        from database.sharding import shard_router
+        shard_router.reset_after_fork()
+
 class Base(DeclarativeBase):
     pass
 
+if settings.SHARD_URLS:
+    # Bảng được shard (SHARDED_TABLES) đi tới DB theo shard key: database/sharding.py thay SessionLocal
+    import database.sharding  # noqa: F401
+
 def get_db():
     db = SessionLocal()
     try:
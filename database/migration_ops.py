@@ -0,0 +1,135 @@
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from alembic import op
+from sqlalchemy import text
+
+
+def _quote(name: str) -> str:
+    return op.get_bind().dialect.identifier_preparer.quote(name)
+
+
+def _drop_invalid_index(index_name: str) -> None:
+    # Lần CREATE INDEX CONCURRENTLY trước bị huỷ (lock_timeout...) để lại index INVALID cùng tên
+    invalid = op.get_bind().execute(
+        text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": index_name},
+    ).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_quote(index_name)}")
+
+
+class _no_statement_timeout:
+    # Build index / backfill có thể lâu hơn statement_timeout của online mode: tắt tạm, trả lại sau
+    def __enter__(self):
+        bind = op.get_bind()
+        self.previous = bind.execute(text("SHOW statement_timeout")).scalar()
+        bind.execute(text("SET statement_timeout = 0"))
+
+    def __exit__(self, *exc):
+        op.get_bind().execute(text("SELECT set_config('statement_timeout', :v, false)"), {"v": self.previous})
+
+
+def create_index_concurrently(index_name: str, table_name: str, columns: Sequence[Any], **kw: Any) -> None:
+    """
+    Tạo index bằng CREATE INDEX CONCURRENTLY (không chặn ghi vào bảng), chạy ngoài transaction
+    của migration. An toàn khi chạy lại: index INVALID từ lần trước bị xoá, index hợp lệ thì bỏ qua.
+
+    Args:
+        index_name (str): Tên index.
+        table_name (str): Tên bảng.
+        columns (Sequence): Danh sách cột / biểu thức như `op.create_index`.
+        **kw: Tham số khác của `op.create_index` (unique, postgresql_where...).
+
+    Example:
+        create_index_concurrently("ix_todo_deadline", "todo", ["deadline"])
+    """
+    with op.get_context().autocommit_block():
+        _drop_invalid_index(index_name)
+        with _no_statement_timeout():
+            op.create_index(
+                index_name, table_name, columns, postgresql_concurrently=True, if_not_exists=True, **kw
+            )
+
+
+def drop_index_concurrently(index_name: str, table_name: Optional[str] = None) -> None:
+    """Xoá index bằng DROP INDEX CONCURRENTLY, chạy ngoài transaction của migration."""
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill(
+    table: str,
+    set_clause: str,
+    where: str = "true",
+    key: str = "id",
+    batch_size: int = 1000,
+    pause: float = 0.05,
+    params: Optional[Dict[str, Any]] = None,
+    progress: Callable[[str], None] = print,
+    progress_every: float = 2.0,
+) -> int:
+    """
+    Cập nhật dữ liệu theo từng lô nhỏ, mỗi lô một transaction riêng (autocommit) để lock
+    trên từng dòng chỉ giữ trong thời gian ngắn (mỗi lô vẫn chịu lock_timeout / statement_timeout); nghỉ `pause` giây giữa các lô để không
+    chiếm hết I/O / replication. Duyệt theo khoá `key` tăng dần nên mỗi dòng chỉ bị quét 1 lần,
+    chạy lại sau khi bị ngắt sẽ tiếp tục với các dòng còn thoả `where`.
+
+    Args:
+        table (str): Tên bảng.
+        set_clause (str): Vế SET, vd `'"IsActive" = true'`.
+        where (str): Điều kiện các dòng cần cập nhật, vd `'"IsActive" IS NULL'`.
+        key (str): Cột khoá (duy nhất, có index) để chia lô.
+        batch_size (int): Số dòng mỗi lô.
+        pause (float): Thời gian nghỉ giữa các lô (giây).
+        params (dict, optional): Bind params dùng trong `set_clause` / `where`.
+        progress (Callable): Hàm nhận dòng báo tiến độ.
+        progress_every (float): Khoảng thời gian tối thiểu giữa 2 lần báo tiến độ (giây).
+
+    Returns:
+        int: Tổng số dòng đã cập nhật.
+
+    Example:
+        backfill("todo", "owner_id = :uid", where="owner_id IS NULL", key="todo_id", params={"uid": 1})
+    """
+    bind = op.get_bind()
+    params = dict(params or {})
+    t, k = _quote(table), _quote(key)
+
+    def batch_stmt(cmp: str):
+        # Chọn lô theo khoá, UPDATE kèm lại điều kiện `where` (dòng có thể đã đổi giữa 2 bước)
+        return text(
+            f"WITH batch AS ("
+            f"SELECT {k} AS _bk FROM {t} WHERE {k} {cmp} :_last AND ({where}) ORDER BY {k} LIMIT :_n), "
+            f"upd AS (UPDATE {t} SET {set_clause} FROM batch WHERE {t}.{k} = batch._bk AND ({where}) RETURNING 1) "
+            f"SELECT (SELECT max(_bk) FROM batch), (SELECT count(*) FROM upd)"
+        )
+
+    first_stmt, next_stmt = batch_stmt(">="), batch_stmt(">")
+    with op.get_context().autocommit_block():
+        with _no_statement_timeout():
+            total = bind.execute(text(f"SELECT count(*) FROM {t} WHERE {where}"), params).scalar()
+        progress(f"⏳ backfill {table}: {total} dòng cần cập nhật")
+        done, started = 0, time.monotonic()
+        reported = started
+        last = bind.execute(text(f"SELECT min({k}) FROM {t} WHERE {where}"), params).scalar()
+        stmt = first_stmt
+        while last is not None:
+            row = bind.execute(stmt, {**params, "_last": last, "_n": batch_size}).one()
+            stmt = next_stmt
+            last, done = row[0], done + row[1]
+            if last is None:
+                break
+            now = time.monotonic()
+            if now - reported >= progress_every:
+                pct = done * 100 / total if total else 100
+                rate = done / (now - started) if now > started else 0
+                progress(f"⏳ backfill {table}: {done}/{total} ({pct:.0f}%), {rate:.0f} dòng/s")
+                reported = now
+            if pause:
+                time.sleep(pause)
+    progress(f"✅ backfill {table}: {done} dòng trong {time.monotonic() - started:.1f}s")
+    return done
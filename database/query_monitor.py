@@ -0,0 +1,305 @@
+import contextvars
+import datetime
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_SPACE_RE = re.compile(r"\s+")
+_READ_RE = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+_FROM_RE = re.compile(r"\bFROM\b", re.IGNORECASE)
+# Câu có ghi (CTE data-modifying, SELECT ... FOR UPDATE, nextval) không được EXPLAIN ANALYZE
+_WRITE_RE = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+(KEY\s+)?SHARE|nextval|setval)\b", re.IGNORECASE
+)
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Chuẩn hoá câu SQL về "hình dạng": bỏ giá trị tham số / số, gộp danh sách IN (...),
+    gộp khoảng trắng. Hai câu chỉ khác giá trị cho cùng fingerprint.
+    """
+    sql = _PARAM_RE.sub("?", statement)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def bind_shape(parameters: Any) -> Any:
+    """Kiểu của từng tham số (không lưu giá trị để log không chứa dữ liệu người dùng)."""
+    if isinstance(parameters, dict):
+        return {k: type(v).__name__ for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(v).__name__ for v in parameters]
+    return None
+
+
+class QueryTrace:
+    """Các câu lệnh SQL chạy trong 1 phạm vi (1 request hoặc 1 khối `track`/`capture`)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.by_fingerprint: Counter = Counter()
+
+    def record(self, fp: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.by_fingerprint[fp] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Các câu cùng fingerprint chạy từ `threshold` lần trở lên (dấu hiệu N+1)."""
+        return [(fp, n) for fp, n in self.by_fingerprint.most_common() if n >= threshold]
+
+
+class QueryMonitor:
+    """
+    Gắn vào Engine qua event before/after_cursor_execute để:
+      - ghi lại câu lệnh chậm hơn `slow_ms` (fingerprint + kiểu tham số, không lưu giá trị);
+      - lấy mẫu 1 phần slow SELECT để chạy lại EXPLAIN (ANALYZE, BUFFERS) trong thread nền,
+        mỗi fingerprint tối đa 1 lần / `explain_interval` giây;
+      - đếm query theo request (contextvar do QueryMonitorMiddleware đặt) và đánh dấu
+        request có câu lệnh giống hệt nhau lặp lại >= `n_plus_one_threshold` lần.
+    """
+
+    def __init__(
+        self,
+        slow_ms: float = 200,
+        log_size: int = 200,
+        explain_sample_rate: float = 0.1,
+        explain_interval: int = 300,
+        n_plus_one_threshold: int = 5,
+    ):
+        self.slow_ms = slow_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_interval = explain_interval
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=log_size)
+        self.n_plus_one: Deque[Dict[str, Any]] = deque(maxlen=log_size)
+        self.plans: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_plans = log_size
+        self._engine = None
+        self._lock = threading.Lock()
+        self._captures: List[QueryTrace] = []
+        self._current: contextvars.ContextVar[Optional[QueryTrace]] = contextvars.ContextVar("query_trace", default=None)
+        self._explaining = threading.local()
+        self._last_explain: Dict[str, float] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # --- gắn vào engine ---
+    def attach(self, engine, explain: bool = True) -> None:
+        # explain=False: chỉ đo thời gian (vd engine của shard phụ), EXPLAIN mẫu vẫn chạy trên engine chính
+        if explain:
+            self._engine = engine
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def reset_after_fork(self) -> None:
+        # Thread của executor không tồn tại trong process con
+        self._executor = None
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+        if getattr(self._explaining, "active", False):
+            return
+        fp = fingerprint(statement)
+
+        trace = self._current.get()
+        if trace is not None:
+            trace.record(fp, elapsed_ms)
+        if self._captures:
+            with self._lock:
+                for capture in self._captures:
+                    capture.record(fp, elapsed_ms)
+
+        if elapsed_ms >= self.slow_ms:
+            self._record_slow(fp, statement, parameters, elapsed_ms, executemany)
+
+    # --- slow query + EXPLAIN ---
+    def _record_slow(self, fp: str, statement: str, parameters: Any, elapsed_ms: float, executemany: bool) -> None:
+        entry = {
+            "at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "duration_ms": round(elapsed_ms, 2),
+            "fingerprint": fp,
+            "params": bind_shape(parameters) if not executemany else "executemany",
+        }
+        self.slow_queries.append(entry)
+        logger.warning("Slow query (%.1f ms): %s params=%s", elapsed_ms, fp, entry["params"])
+
+        if executemany or not self._should_explain(fp, statement):
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        self._executor.submit(self._explain, fp, statement, parameters)
+
+    def _should_explain(self, fp: str, statement: str) -> bool:
+        if self._engine is None or self.explain_sample_rate <= 0:
+            return False
+        if not _READ_RE.match(statement) or not _FROM_RE.search(statement) or _WRITE_RE.search(statement):
+            return False  # ANALYZE chạy thật câu lệnh nên chỉ áp dụng cho câu chỉ đọc bảng
+        if random.random() >= self.explain_sample_rate:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_explain.get(fp, -self.explain_interval) < self.explain_interval:
+                return False
+            self._last_explain[fp] = now
+        return True
+
+    def _explain(self, fp: str, statement: str, parameters: Any) -> None:
+        self._explaining.active = True
+        try:
+            with self._engine.connect() as conn:
+                trans = conn.begin()
+                try:
+                    plan = conn.exec_driver_sql(
+                        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+                    ).scalar()
+                finally:
+                    trans.rollback()  # phòng khi câu SELECT gọi hàm có ghi dữ liệu
+                    # Bỏ hẳn connection thay vì trả về pool: trạng thái phiên (vd advisory lock) không rò sang request khác
+                    conn.invalidate()
+            with self._lock:
+                self.plans.pop(fp, None)
+                self.plans[fp] = {
+                    "at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    "plan": plan,
+                }
+                if len(self.plans) > self.max_plans:
+                    self.plans.popitem(last=False)
+        except Exception as e:
+            logger.warning("EXPLAIN failed for %s: %s", fp, e)
+        finally:
+            self._explaining.active = False
+
+    # --- theo dõi theo phạm vi ---
+    @contextmanager
+    def track(self):
+        """
+        Đếm query chạy trong context hiện tại (cùng request / cùng task, kể cả route sync
+        chạy trong threadpool vì context được copy sang).
+
+        Example:
+            with query_monitor.track() as trace:
+                todo_service.get_all(db)
+            print(trace.count, trace.repeated(2))
+        """
+        trace = QueryTrace()
+        token = self._current.set(trace)
+        try:
+            yield trace
+        finally:
+            self._current.reset(token)
+
+    @contextmanager
+    def capture(self):
+        """
+        Đếm mọi query trong process khi khối lệnh đang chạy, không phụ thuộc context;
+        dùng khi gọi app qua TestClient (app chạy ở thread khác).
+        """
+        trace = QueryTrace()
+        with self._lock:
+            self._captures.append(trace)
+        try:
+            yield trace
+        finally:
+            with self._lock:
+                self._captures.remove(trace)
+
+    def finish_request(self, method: str, path: str, trace: QueryTrace) -> None:
+        repeated = trace.repeated(self.n_plus_one_threshold)
+        if not repeated:
+            return
+        self.n_plus_one.append({
+            "at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "route": f"{method} {path}",
+            "queries": trace.count,
+            "repeated": [{"fingerprint": fp, "count": n} for fp, n in repeated],
+        })
+        logger.warning("Possible N+1 in %s %s: %s", method, path, repeated[0])
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "slow_ms": self.slow_ms,
+            "slow_queries": list(self.slow_queries),
+            "n_plus_one": list(self.n_plus_one),
+            "plans": dict(self.plans),
+        }
+
+
+class QueryMonitorMiddleware:
+    """ASGI middleware: mỗi request HTTP có 1 QueryTrace, trả số query qua header `X-Query-Count`."""
+
+    def __init__(self, app, monitor: QueryMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = QueryTrace()
+        token = self.monitor._current.set(trace)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(trace.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.monitor._current.reset(token)
+            self.monitor.finish_request(scope["method"], scope["path"], trace)
+
+
+@contextmanager
+def assert_max_queries(limit: int, monitor: Optional[QueryMonitor] = None):
+    """
+    Helper cho test: lỗi nếu khối lệnh chạy quá `limit` câu SQL.
+
+    Args:
+        limit (int): Số query tối đa cho phép.
+        monitor (QueryMonitor, optional): Mặc định là `query_monitor`.
+
+    Example:
+        with assert_max_queries(2):
+            client.get("/api/todo/page?skip=0&limit=20")
+    """
+    monitor = monitor or query_monitor
+    with monitor.capture() as trace:
+        yield trace
+    if trace.count > limit:
+        detail = "\n".join(f"  {n}x {fp}" for fp, n in trace.by_fingerprint.most_common())
+        raise AssertionError(f"Expected at most {limit} queries, got {trace.count}:\n{detail}")
+
+
+query_monitor = QueryMonitor(
+    slow_ms=settings.SLOW_QUERY_MS,
+    log_size=settings.SLOW_QUERY_LOG_SIZE,
+    explain_sample_rate=settings.EXPLAIN_SAMPLE_RATE,
+    explain_interval=settings.EXPLAIN_MIN_INTERVAL_SECONDS,
+    n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD,
+)
@@ -0,0 +1,380 @@
+import hashlib
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, create_engine, delete, func, insert, select, text, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from database.db import Base, engine
+from database.sharding import HashRing, ShardRingModel, ShardRouter, in_range, key_hash
+
+_ring = ShardRingModel.__table__
+
+
+def sharded_tables(router: ShardRouter) -> List[Table]:
+    missing = router.tables - set(Base.metadata.tables)
+    if missing:
+        raise ValueError(f"Unknown sharded tables (model not imported?): {sorted(missing)}")
+    return [Base.metadata.tables[name] for name in sorted(router.tables)]
+
+
+def _load_points(conn) -> List[Tuple[int, str, Optional[str]]]:
+    return [tuple(row) for row in conn.execute(select(_ring.c.token, _ring.c.shard, _ring.c.moving_to))]
+
+
+# --- khởi tạo ---
+def create_databases(router: ShardRouter, progress: Callable[[str], None] = print) -> None:
+    """CREATE DATABASE cho các shard chưa có DB (vd nhiều database trên cùng 1 Postgres khi thử ở local)."""
+    for name, raw_url in router.urls.items():
+        url = make_url(raw_url)
+        admin = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+        try:
+            with admin.connect() as conn:
+                exists = conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :n"), {"n": url.database}).scalar()
+                if not exists:
+                    conn.execute(text(f"CREATE DATABASE {conn.dialect.identifier_preparer.quote(url.database)}"))
+                    progress(f"🆕 {name}: đã tạo database {url.database}")
+        finally:
+            admin.dispose()
+
+
+def create_tables(router: ShardRouter, progress: Callable[[str], None] = print) -> None:
+    """
+    Tạo các bảng được shard (kèm index) trên shard chưa có; DB chính đã có bảng qua Alembic.
+    Không tạo foreign key: bảng được tham chiếu (vd users) chỉ nằm ở DB chính.
+    """
+    for name in router.shard_ids:
+        shard_engine = router.engines[name]
+        if shard_engine is engine:
+            continue
+        existing = set(sa_inspect(shard_engine).get_table_names())
+        with shard_engine.begin() as conn:
+            for table in sharded_tables(router):
+                if table.name in existing:
+                    continue
+                conn.execute(CreateTable(table, include_foreign_key_constraints=[]))
+                for index in table.indexes:
+                    conn.execute(CreateIndex(index))
+                progress(f"🆕 {name}: đã tạo bảng {table.name}")
+
+
+def align_sequences(router: ShardRouter, stride: int, progress: Callable[[str], None] = print) -> None:
+    """
+    Chia không gian id giữa các shard: shard thứ i (theo thứ tự SHARD_URLS) sinh id ≡ i (mod stride),
+    bắt đầu từ bội số của stride lớn hơn mọi id đã cấp trên mọi shard -> id không trùng khi chuyển
+    record giữa các shard. Chạy lại được (ví dụ sau khi thêm shard): id luôn tiến lên, không lùi.
+    """
+    if len(router.shard_ids) > stride:
+        raise ValueError(f"{len(router.shard_ids)} shards but SHARD_ID_STRIDE is {stride}")
+    for table in sharded_tables(router):
+        pk = list(table.primary_key.columns)[0]
+        sequences: Dict[str, str] = {}
+        top = 0
+        for name in router.shard_ids:
+            with router.engines[name].connect() as conn:
+                seq = conn.execute(
+                    text("SELECT pg_get_serial_sequence(:t, :c)"), {"t": table.fullname, "c": pk.name}
+                ).scalar()
+                top = max(top, conn.execute(select(func.max(pk))).scalar() or 0)
+                if seq is not None:
+                    sequences[name] = seq
+                    top = max(top, conn.execute(text(f"SELECT last_value FROM {seq}")).scalar() or 0)
+        if not sequences:
+            progress(f"⚠️  {table.name}.{pk.name} không dùng sequence, bỏ qua")
+            continue
+        base = (top // stride + 1) * stride
+        for i, name in enumerate(router.shard_ids):
+            if name not in sequences:
+                continue
+            with router.engines[name].begin() as conn:
+                conn.execute(text(f"ALTER SEQUENCE {sequences[name]} INCREMENT BY {stride}"))
+                conn.execute(text("SELECT setval(:s, :v, false)"), {"s": sequences[name], "v": base + i})
+        progress(f"🔢 {table.name}: id mới từ {base}, bước {stride} (shard thứ i sinh id ≡ i mod {stride})")
+
+
+def persist_ring(router: ShardRouter, progress: Callable[[str], None] = print) -> bool:
+    """
+    Lưu ring ban đầu vào `shard_ring` nếu chưa có: toàn bộ key thuộc shard đầu tiên (nơi dữ liệu đang nằm),
+    các shard còn lại nhận dữ liệu qua `add_shard`.
+
+    Returns:
+        bool: True nếu vừa lưu, False nếu ring đã có.
+    """
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(_ring)).scalar():
+            return False
+        ring = HashRing.build([router.default_shard], router.vnodes)
+        conn.execute(insert(_ring), [{"token": t, "shard": s, "moving_to": None} for t, s, _ in ring.points])
+    router.invalidate()
+    progress(f"💍 đã lưu ring: {len(ring.points)} điểm, mọi key ở {router.default_shard}")
+    return True
+
+
+# --- xem trạng thái ---
+def status(router: ShardRouter) -> Dict[str, Any]:
+    """
+    Số dòng trên từng shard và số dòng đang nằm sai shard so với ring (cần `resume` / `add`).
+
+    Returns:
+        Dict[str, Any]: {"ring": ..., "tables": {table: {shard: {"rows": n, "misplaced": m}}}}.
+    """
+    router.invalidate()
+    out: Dict[str, Any] = {"ring": router.describe(), "tables": {}}
+    for table in sharded_tables(router):
+        key_col = table.c[router.key_column]
+        per_shard = {}
+        for name in router.shard_ids:
+            with router.engines[name].connect() as conn:
+                counts = conn.execute(select(key_col, func.count()).group_by(key_col)).all()
+            per_shard[name] = {
+                "rows": sum(n for _, n in counts),
+                "misplaced": sum(n for key, n in counts if router.locate(key)[0] != name),
+            }
+        out["tables"][table.name] = per_shard
+    return out
+
+
+# --- chuyển khoảng key ---
+def _shard_keys(router: ShardRouter, shard: str) -> List[Any]:
+    # Các shard key (khác NULL) đang có trên shard; lọc theo khoảng làm ở Python (cùng hàm hash với router)
+    keys = set()
+    for table in sharded_tables(router):
+        key_col = table.c[router.key_column]
+        with router.engines[shard].connect() as conn:
+            keys.update(conn.execute(select(key_col).where(key_col.isnot(None)).distinct()).scalars())
+    return sorted(keys)
+
+
+def _upsert(table: Table):
+    pk = list(table.primary_key.columns)[0]
+    stmt = pg_insert(table)
+    return stmt.on_conflict_do_update(index_elements=[pk], set_={c.name: stmt.excluded[c.name] for c in table.c if c is not pk})
+
+
+def _digest(row) -> bytes:
+    # Dấu vân tay nội dung 1 dòng: nhận ra dòng bị ghi muộn vào shard nguồn sau khi đã copy
+    return hashlib.md5(repr(tuple(row)).encode()).digest()
+
+
+def _copy_rows(
+    router: ShardRouter, table: Table, src: str, dst: str, keys: Sequence[Any], batch_size: int, pause: float,
+    copied: Dict[Any, bytes],
+) -> int:
+    # Duyệt theo PK, upsert sang shard đích: chạy lại sau khi bị ngắt không tạo dòng trùng.
+    # `copied` nhận {pk: digest} của các dòng đã copy để bước xoá so lại.
+    pk = list(table.primary_key.columns)[0]
+    stmt = _upsert(table)
+    count, last = 0, None
+    while True:
+        q = select(table).where(table.c[router.key_column].in_(keys)).order_by(pk).limit(batch_size)
+        if last is not None:
+            q = q.where(pk > last)
+        with router.engines[src].connect() as conn:
+            rows = conn.execute(q).all()
+        if not rows:
+            return count
+        with router.engines[dst].begin() as conn:
+            conn.execute(stmt, [dict(row._mapping) for row in rows])
+        copied.update((row._mapping[pk.name], _digest(row)) for row in rows)
+        count, last = count + len(rows), rows[-1]._mapping[pk.name]
+        if pause:
+            time.sleep(pause)
+
+
+def _delete_rows(
+    router: ShardRouter, table: Table, src: str, dst: str, keys: Sequence[Any], batch_size: int, pause: float,
+    copied: Dict[Any, bytes],
+) -> Tuple[int, int]:
+    """
+    Xoá các dòng đã chuyển khỏi shard nguồn, từng lô khoá FOR UPDATE.
+    Dòng khác bản đã copy (ghi muộn vào nguồn: worker chưa nạp ring mới, hoặc ghi không qua CoreService)
+    chỉ được mang sang đích nếu dòng ở đích chưa có / chưa đổi so với bản đã copy; ngược lại giữ lại ở nguồn.
+
+    Returns:
+        Tuple[int, int]: (số dòng đã xoá, số dòng giữ lại do xung đột).
+    """
+    pk = list(table.primary_key.columns)[0]
+    upsert = _upsert(table)
+    deleted, kept, last = 0, 0, None
+    while True:
+        q = select(table).where(table.c[router.key_column].in_(keys)).order_by(pk).limit(batch_size).with_for_update()
+        if last is not None:
+            q = q.where(pk > last)
+        with router.engines[src].begin() as conn:
+            rows = conn.execute(q).all()
+            if not rows:
+                return deleted, kept
+            last = rows[-1]._mapping[pk.name]
+            done = [row for row in rows if copied.get(row._mapping[pk.name]) == _digest(row)]
+            late = [row for row in rows if copied.get(row._mapping[pk.name]) != _digest(row)]
+            if late:
+                late_ids = [row._mapping[pk.name] for row in late]
+                with router.engines[dst].begin() as dst_conn:
+                    current = {
+                        row._mapping[pk.name]: _digest(row)
+                        for row in dst_conn.execute(select(table).where(pk.in_(late_ids)).with_for_update())
+                    }
+                    carry = [
+                        row for row in late
+                        if row._mapping[pk.name] not in current or current[row._mapping[pk.name]] == copied.get(row._mapping[pk.name])
+                    ]
+                    if carry:
+                        dst_conn.execute(upsert, [dict(row._mapping) for row in carry])
+                done += carry
+                kept += len(late) - len(carry)
+            if done:
+                conn.execute(delete(table).where(pk.in_([row._mapping[pk.name] for row in done])))
+                deleted += len(done)
+        if pause:
+            time.sleep(pause)
+
+
+def move_ranges(
+    router: ShardRouter,
+    plan: Optional[Sequence[Tuple[int, str]]] = None,
+    batch_size: int = 1000,
+    pause: float = 0.0,
+    grace: Optional[float] = None,
+    step: int = 8,
+    progress: Callable[[str], None] = print,
+) -> int:
+    """
+    Chuyển online các khoảng key sang shard đích, từng nhóm `step` khoảng:
+      1. đánh dấu khoảng `moving_to = đích` trong shard_ring, chờ `grace` giây để mọi worker nạp ring mới
+         (từ đó ghi vào khoảng bị từ chối với 503 + Retry-After, đọc vẫn ở shard nguồn);
+      2. copy các dòng có shard key thuộc khoảng sang shard đích (upsert theo PK, từng lô `batch_size`);
+      3. chuyển khoảng sang shard đích, chờ `grace` giây để mọi worker đọc/ghi ở shard đích;
+      4. xoá các dòng đã chuyển khỏi shard nguồn (từng lô), so với bản đã copy: dòng bị ghi muộn vào nguồn
+         được mang sang đích nếu đích chưa đổi, còn xung đột thì giữ lại ở nguồn và báo (xem `status`).
+    Chỉ các key trong nhóm đang chuyển bị chặn ghi, phần còn lại phục vụ bình thường.
+    Chỉ ghi qua CoreService (`shard_router.route(..., write=True)`) bị chặn; code ghi thẳng vào bảng được shard
+    phải tự gọi `route` / `check_writable`. Worker có thể kiểm tra ring cũ tới `SHARD_RING_REFRESH_SECONDS`
+    trước khi ghi, nên bước 4 không tin vào `grace` mà so lại từng dòng.
+    Bị ngắt giữa chừng thì chạy lại (`resume`): khoảng còn `moving_to` được làm lại từ bước 1.
+
+    Args:
+        router (ShardRouter): Router của app (SHARD_URLS).
+        plan (Sequence[Tuple[int, str]], optional): (token, shard đích); token chưa có trên ring được thêm mới.
+            None: làm tiếp các khoảng đang dở (moving_to khác NULL).
+        batch_size (int): Số dòng mỗi lô copy / xoá.
+        pause (float): Nghỉ giữa các lô (giây).
+        grace (float, optional): Thời gian chờ worker nạp ring, mặc định 2 x SHARD_RING_REFRESH_SECONDS.
+        step (int): Số khoảng chuyển cùng lúc.
+        progress (Callable): Hàm nhận dòng báo tiến độ.
+
+    Returns:
+        int: Tổng số dòng đã chuyển.
+
+    Example:
+        move_ranges(shard_router, [(123456, "s1")], grace=0)
+    """
+    grace = 2 * router.refresh_seconds if grace is None else grace
+    if plan is None:
+        with engine.connect() as conn:
+            plan = [(t, m) for t, _, m in _load_points(conn) if m is not None]
+    plan = list(plan)
+    moved = 0
+    for i in range(0, len(plan), step):
+        group = plan[i:i + step]
+        # 1. đánh dấu
+        with engine.begin() as conn:
+            current = {t: (s, m) for t, s, m in _load_points(conn)}
+            ring = HashRing((t, s, m) for t, (s, m) in current.items())
+            for token, dst in group:
+                if token in current:
+                    if current[token][0] != dst:
+                        conn.execute(update(_ring).where(_ring.c.token == token).values(moving_to=dst))
+                    continue
+                src = ring.point_for_hash(token)[1]
+                # Token mới: khoảng (điểm trước, token] hiện thuộc shard của điểm kế tiếp
+                conn.execute(insert(_ring).values(token=token, shard=src, moving_to=dst if src != dst else None))
+            points = _load_points(conn)
+        ring = HashRing(points)
+        ranges = [(start, end, shard, to) for start, end, shard, to in ring.ranges() if to is not None and end in dict(group)]
+        if not ranges:
+            continue
+        router.invalidate()
+        progress(f"🚧 {len(ranges)} khoảng đang chuyển ({i + len(group)}/{len(plan)}), chờ {grace:g}s cho các worker")
+        time.sleep(grace)
+
+        # 2. copy
+        moves, shard_keys = [], {}
+        for start, end, src, dst in ranges:
+            if src not in shard_keys:
+                shard_keys[src] = _shard_keys(router, src)
+            keys = [k for k in shard_keys[src] if in_range(key_hash(k), start, end)]
+            copied = {table.name: {} for table in sharded_tables(router)}
+            moves.append((src, dst, keys, copied))
+            for table in sharded_tables(router):
+                if keys:
+                    n = _copy_rows(router, table, src, dst, keys, batch_size, pause, copied[table.name])
+                    moved += n
+                    progress(f"📦 {table.name}: {n} dòng ({len(keys)} key) {src} -> {dst}")
+
+        # 3. chuyển chủ khoảng
+        with engine.begin() as conn:
+            conn.execute(
+                update(_ring)
+                .where(_ring.c.token.in_([end for _, end, _, _ in ranges]), _ring.c.moving_to.isnot(None))
+                .values(shard=_ring.c.moving_to, moving_to=None)
+            )
+        router.invalidate()
+        time.sleep(grace)
+
+        # 4. dọn shard nguồn
+        for src, dst, keys, copied in moves:
+            for table in sharded_tables(router):
+                if keys:
+                    _, kept = _delete_rows(router, table, src, dst, keys, batch_size, pause, copied[table.name])
+                    if kept:
+                        progress(f"⚠️  {table.name}: giữ lại {kept} dòng ở {src} (ghi muộn xung đột với {dst}), kiểm tra bằng `status`")
+    progress(f"✅ đã chuyển {moved} dòng")
+    return moved
+
+
+def _require_ring(router: ShardRouter) -> List[Tuple[int, str, Optional[str]]]:
+    with engine.connect() as conn:
+        points = _load_points(conn)
+    if not points:
+        raise RuntimeError("Shard ring is not initialized, run `python shard.py init` first")
+    return points
+
+
+def add_shard(router: ShardRouter, name: str, **options: Any) -> int:
+    """
+    Đưa shard `name` (đã khai báo trong SHARD_URLS) vào ring: thêm các điểm vnode của nó và chuyển
+    online các khoảng key tương ứng từ shard đang giữ sang (xem `move_ranges`).
+
+    Example:
+        add_shard(shard_router, "s2", batch_size=500)
+    """
+    if name not in router.shard_ids:
+        raise ValueError(f"Unknown shard {name!r}, add it to SHARD_URLS first")
+    current = {t: s for t, s, _ in _require_ring(router)}
+    plan = [(t, name) for t in HashRing.tokens_for(name, router.vnodes) if current.get(t) != name]
+    return move_ranges(router, plan, **options)
+
+
+def remove_shard(router: ShardRouter, name: str, **options: Any) -> int:
+    """
+    Rút shard `name` khỏi ring: mỗi khoảng của nó được chuyển online sang shard giữ điểm kế tiếp trên vòng.
+    Xong thì có thể bỏ shard khỏi SHARD_URLS.
+
+    Example:
+        remove_shard(shard_router, "s2")
+    """
+    if name == router.default_shard:
+        raise ValueError(f"{name} is the default shard (rows without shard key live there), cannot remove it")
+    points = sorted(_require_ring(router))
+    others = [p for p in points if p[1] != name]
+    if not others:
+        raise ValueError(f"{name} holds the whole ring, add another shard first")
+    plan = []
+    for token, shard, _ in points:
+        if shard == name:
+            nxt = next((p for p in others if p[0] > token), others[0])
+            plan.append((token, nxt[1]))
+    return move_ranges(router, plan, **options)
@@ -0,0 +1,358 @@
+import bisect
+import hashlib
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import BigInteger, Column, String, create_engine, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from config import settings
+from database import db as _db
+from database.db import Base, engine
+from database.query_monitor import query_monitor
+
+logger = logging.getLogger(__name__)
+
+# Bind của các bảng không shard (users, idempotency_key, activity_log, shard_ring...): DB chính
+MAIN = "main"
+# Key trong Session.info: shard key của request hiện tại (không có / None = mọi shard)
+SESSION_KEY = "shard_key"
+
+
+def key_hash(key: Any) -> int:
+    """Vị trí của shard key trên ring: 32 bit đầu của md5(str(key))."""
+    return int(hashlib.md5(str(key).encode()).hexdigest()[:8], 16)
+
+
+def in_range(h: int, start: int, end: int) -> bool:
+    """h thuộc khoảng (start, end] trên vòng (start >= end là khoảng vòng qua 0)."""
+    return start < h <= end if start < end else h > start or h <= end
+
+
+class ShardMovingError(Exception):
+    """Khoảng key đang được chuyển sang shard khác (python shard.py ...): tạm thời không ghi được."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Shard key range is being moved, retry shortly")
+        self.retry_after = retry_after
+
+
+class ShardRingModel(Base):
+    __tablename__ = "shard_ring"
+
+    token = Column(BigInteger, primary_key=True)             # điểm trên ring, sở hữu khoảng (điểm trước, token]
+    shard = Column(String(50), nullable=False)               # shard đang giữ dữ liệu của khoảng
+    moving_to = Column(String(50), nullable=True)            # khác NULL: khoảng đang được chuyển tới shard này
+
+
+class HashRing:
+    """
+    Consistent-hash ring: mỗi shard có nhiều điểm (vnode) trên vòng 0..2^32-1, key thuộc điểm đầu tiên
+    có token >= key_hash(key) (quá điểm cuối thì vòng về điểm đầu). Thêm/bớt shard chỉ làm đổi chủ
+    các khoảng kề với điểm được thêm/bớt, không xáo trộn toàn bộ key.
+
+    Example:
+        ring = HashRing.build(["s0", "s1"], vnodes=64)
+        ring.locate(42)  # ("s1", None)
+    """
+
+    def __init__(self, points: Iterable[Tuple[int, str, Optional[str]]]):
+        self.points: List[Tuple[int, str, Optional[str]]] = sorted((int(t), s, m) for t, s, m in points)
+        if not self.points:
+            raise ValueError("Hash ring has no points")
+        self._tokens = [p[0] for p in self.points]
+
+    @classmethod
+    def tokens_for(cls, shard: str, vnodes: int) -> List[int]:
+        return [key_hash(f"{shard}#{i}") for i in range(vnodes)]
+
+    @classmethod
+    def build(cls, shards: Iterable[str], vnodes: int) -> "HashRing":
+        points: Dict[int, Tuple[int, str, None]] = {}
+        for shard in shards:
+            for token in cls.tokens_for(shard, vnodes):
+                points.setdefault(token, (token, shard, None))  # trùng token (hiếm): giữ shard khai báo trước
+        return cls(points.values())
+
+    def point_for_hash(self, h: int) -> Tuple[int, str, Optional[str]]:
+        i = bisect.bisect_left(self._tokens, h)
+        return self.points[i % len(self.points)]
+
+    def locate(self, key: Any) -> Tuple[str, Optional[str]]:
+        """
+        Shard chứa dữ liệu của key.
+
+        Returns:
+            Tuple[str, Optional[str]]: (shard, shard đích nếu khoảng của key đang được chuyển).
+        """
+        _, shard, moving_to = self.point_for_hash(key_hash(key))
+        return shard, moving_to
+
+    def ranges(self) -> List[Tuple[int, int, str, Optional[str]]]:
+        """Các khoảng (start, end, shard, moving_to): key có start < hash <= end (vòng qua 0 ở khoảng đầu)."""
+        prev = self.points[-1][0]
+        out = []
+        for token, shard, moving_to in self.points:
+            out.append((prev, token, shard, moving_to))
+            prev = token
+        return out
+
+    @property
+    def moving(self) -> bool:
+        return any(p[2] is not None for p in self.points)
+
+    def describe(self) -> Dict[str, Any]:
+        share: Dict[str, float] = {}
+        for start, end, shard, _ in self.ranges():
+            share[shard] = share.get(shard, 0) + ((end - start) % 2 ** 32 or 2 ** 32) / 2 ** 32
+        return {
+            "points": {s: sum(1 for p in self.points if p[1] == s) for s in share},
+            "key_share": {s: round(v, 4) for s, v in share.items()},
+            "moving": [{"token": t, "from": s, "to": m} for t, s, m in self.points if m is not None],
+        }
+
+
+def parse_shard_urls(value: str) -> Dict[str, str]:
+    """
+    "s0=url0,s1=url1" -> {"s0": url0, "s1": url1}; URL không kèm tên được đặt tên s0, s1... theo thứ tự.
+    """
+    urls: Dict[str, str] = {}
+    for i, item in enumerate(x.strip() for x in value.split(",") if x.strip()):
+        name, sep, url = item.partition("=")
+        if not sep or "://" in name:
+            name, url = f"s{i}", item
+        name = name.strip()
+        if name == MAIN or name in urls:
+            raise ValueError(f"Invalid or duplicate shard name: {name}")
+        urls[name] = url.strip()
+    return urls
+
+
+class RoutedSession(ShardedSession):
+    """ShardedSession chạy được cả câu SQL không gắn model (text(), EXPLAIN, get_bind()): dùng DB chính."""
+
+    def get_bind(self, mapper=None, *, shard_id=None, instance=None, clause=None, **kw):
+        if shard_id is None and mapper is None and instance is None:
+            shard_id = MAIN
+        return super().get_bind(mapper, shard_id=shard_id, instance=instance, clause=clause, **kw)
+
+
+class ShardRouter:
+    """
+    Định tuyến các bảng được shard (SHARDED_TABLES) tới DB theo shard key (SHARD_KEY, mặc định owner_id):
+      - ring lưu ở bảng `shard_ring` trên DB chính, mỗi worker nạp lại sau `refresh_seconds`
+        (chưa `python shard.py init`: mọi key ở shard đầu tiên);
+      - Session từ `sessionmaker()`: CoreService gắn shard key vào session (`route`), câu lệnh ORM
+        trên bảng được shard chạy ở shard của key, không có key thì chạy trên mọi shard;
+        bảng không shard và SQL thuần luôn ở DB chính;
+      - record có shard key NULL (todo cũ chưa có chủ) nằm ở shard đầu tiên và không bao giờ bị chuyển;
+      - khoảng key đang được chuyển (`moving_to`): đọc vẫn ở shard cũ, ghi bị từ chối (ShardMovingError).
+    """
+
+    def __init__(
+        self,
+        urls: Dict[str, str],
+        tables: Iterable[str],
+        key_column: str,
+        vnodes: int = 64,
+        refresh_seconds: float = 5.0,
+    ):
+        if not urls:
+            raise ValueError("No shard configured")
+        self.urls = urls
+        self.shard_ids = list(urls)
+        self.default_shard = self.shard_ids[0]
+        self.tables = set(tables)
+        self.key_column = key_column
+        self.vnodes = vnodes
+        self.refresh_seconds = refresh_seconds
+        self.engines = {MAIN: engine}
+        for name, url in urls.items():
+            # Shard trỏ vào chính DB chính thì dùng chung engine (chung pool, chung transaction)
+            self.engines[name] = engine if make_url(url) == engine.url else self._create_engine(url)
+        self.persisted = False
+        self._ring: Optional[HashRing] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create_engine(url: str):
+        shard_engine = create_engine(
+            url,
+            future=True,
+            pool_pre_ping=True,
+            connect_args={"prepare_threshold": settings.DB_PREPARE_THRESHOLD},
+        )
+        if settings.QUERY_MONITOR_ENABLED:
+            query_monitor.attach(shard_engine, explain=False)
+        return shard_engine
+
+    def shards_table(self, table: str) -> bool:
+        return table in self.tables
+
+    # --- ring ---
+    def ring(self) -> HashRing:
+        if self._ring is None or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            with self._lock:
+                if self._ring is None or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                    self._ring = self._load_ring()
+                    self._loaded_at = time.monotonic()
+        return self._ring
+
+    def _load_ring(self) -> HashRing:
+        t = ShardRingModel.__table__
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(select(t.c.token, t.c.shard, t.c.moving_to)).all()
+        except Exception:
+            if self._ring is None:
+                raise
+            logger.exception("Reloading shard ring failed, keeping the previous one")
+            return self._ring
+        if not rows:
+            # Chưa init: mọi key ở shard đầu tiên (nơi dữ liệu sẵn có), shard khác nhận key qua `shard.py add`
+            self.persisted = False
+            return HashRing.build([self.default_shard], self.vnodes)
+        ring = HashRing(rows)
+        named = {p[1] for p in ring.points} | {p[2] for p in ring.points if p[2] is not None}
+        unknown = named - set(self.shard_ids)
+        if unknown:
+            raise RuntimeError(f"Shard ring references shards missing from SHARD_URLS: {sorted(unknown)}")
+        self.persisted = True
+        return ring
+
+    def invalidate(self) -> None:
+        self._loaded_at = 0.0
+
+    def locate(self, key: Any) -> Tuple[str, Optional[str]]:
+        if key is None:
+            return self.default_shard, None
+        return self.ring().locate(key)
+
+    def check_writable(self, key: Any) -> None:
+        """
+        Raises:
+            ShardMovingError: Khoảng của key đang được chuyển (key None: có bất kỳ khoảng nào đang chuyển,
+                vì ghi không có key có thể chạm mọi shard).
+        """
+        moving = self.ring().moving if key is None else self.locate(key)[1] is not None
+        if moving:
+            raise ShardMovingError(retry_after=max(1, round(self.refresh_seconds)))
+
+    # --- session ---
+    def route(self, db: Session, key: Any, write: bool = False) -> None:
+        """
+        Gắn shard key cho session: các câu lệnh tiếp theo trên bảng được shard chỉ chạy ở shard của key
+        (None = mọi shard). Chỉ kiểm tra khoảng đang chuyển khi write=True (CoreService luôn truyền khi ghi);
+        kiểm tra dựa trên ring nạp tối đa `refresh_seconds` trước.
+
+        Args:
+            db (Session): Session tạo từ `sessionmaker()`.
+            key (Any): Giá trị shard key (vd owner_id).
+            write (bool): True nếu sắp ghi, kiểm tra khoảng key không đang được chuyển.
+
+        Raises:
+            ShardMovingError: write=True và khoảng của key đang được chuyển.
+        """
+        db.info[SESSION_KEY] = key
+        if write:
+            self.check_writable(key)
+
+    def _sharded_mapper(self, mapper) -> bool:
+        return mapper is not None and mapper.local_table.name in self.tables
+
+    def _shard_chooser(self, mapper, instance, **kw) -> str:
+        # Flush (INSERT/UPDATE của ORM instance): theo shard key trên chính instance
+        if not self._sharded_mapper(mapper):
+            return MAIN
+        key = getattr(instance, self.key_column, None) if instance is not None else None
+        return self.locate(key)[0]
+
+    def _identity_chooser(self, mapper, primary_key, *, lazy_loaded_from, **kw) -> List[str]:
+        if lazy_loaded_from is not None:
+            return [lazy_loaded_from.identity_token]
+        return self.shard_ids if self._sharded_mapper(mapper) else [MAIN]
+
+    def _execute_chooser(self, context) -> List[str]:
+        if not self._sharded_mapper(context.bind_mapper):
+            return [MAIN]
+        key = context.session.info.get(SESSION_KEY)
+        return self.shard_ids if key is None else [self.locate(key)[0]]
+
+    def sessionmaker(self) -> sessionmaker:
+        return sessionmaker(
+            class_=RoutedSession,
+            shards=self.engines,
+            shard_chooser=self._shard_chooser,
+            identity_chooser=self._identity_chooser,
+            execute_chooser=self._execute_chooser,
+            autoflush=False,
+            future=True,
+        )
+
+    def gather(
+        self,
+        db: Session,
+        stmt,
+        params: Dict[str, Any],
+        key: Callable[[Any], Any],
+        scalars: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        """
+        Scatter-gather: chạy `stmt` (đã ORDER BY theo `key`) trên từng shard rồi trộn các kết quả đã
+        sắp xếp (heap merge), lấy tối đa `limit` phần tử đầu.
+
+        Example:
+            shard_router.gather(db, stmt.order_by(TodoModel.todo_id), {}, key=lambda o: o.todo_id, scalars=True)
+        """
+        parts = []
+        for shard_id in self.shard_ids:
+            result = db.execute(stmt, params, bind_arguments={"shard_id": shard_id})
+            parts.append(result.scalars().all() if scalars else result.all())
+        return list(itertools.islice(heapq.merge(*parts, key=key), limit))
+
+    def describe(self) -> Dict[str, Any]:
+        ring = self.ring()
+        return {
+            "shards": {name: make_url(url).render_as_string(hide_password=True) for name, url in self.urls.items()},
+            "tables": sorted(self.tables),
+            "key": self.key_column,
+            "persisted": self.persisted,
+            **ring.describe(),
+        }
+
+    def reset_after_fork(self) -> None:
+        for name in self.shard_ids:
+            if self.engines[name] is not engine:
+                self.engines[name].dispose(close=False)
+        self._ring = None
+
+
+def route(db: Session, key: Any, write: bool = False) -> None:
+    """`ShardRouter.route` nếu bật sharding, ngược lại không làm gì."""
+    if shard_router is not None:
+        shard_router.route(db, key, write=write)
+
+
+shard_router: Optional[ShardRouter] = (
+    ShardRouter(
+        parse_shard_urls(settings.SHARD_URLS),
+        tables=[t.strip() for t in settings.SHARDED_TABLES.split(",") if t.strip()],
+        key_column=settings.SHARD_KEY,
+        vnodes=settings.SHARD_VNODES,
+        refresh_seconds=settings.SHARD_RING_REFRESH_SECONDS,
+    )
+    if settings.SHARD_URLS
+    else None
+)
+
+if shard_router is not None:
+    # get_db / SessionLocal của mọi module dùng Session định tuyến theo shard
+    _db.SessionLocal = shard_router.sessionmaker()
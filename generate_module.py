@@ -1,20 +1,50 @@
 import os
 import sys
 import shutil
+import datetime
+import importlib
+import uuid
 from pathlib import Path
 
 BASE_DIR = Path(__file__).parent
-MAIN_FILE = BASE_DIR / "main.py"
 MODULES_DIR = BASE_DIR / "modules"
+BENCH_DIR = BASE_DIR / "benchmarks"
+VERSIONS_DIR = BASE_DIR / "migrations" / "versions"
+
+# kiểu field (-fields=name:str,...) -> (cột SQLAlchemy, kiểu Python, giá trị mẫu cho benchmark theo i)
+FIELD_TYPES = {
+    "str": ("String(255)", "str", 'f"{module} {{i}}"'),
+    "text": ("Text", "str", 'f"{module} text {{i}}"'),
+    "int": ("Integer", "int", "i"),
+    "float": ("Float", "float", "i * 1.5"),
+    "bool": ("Boolean", "bool", "i % 2 == 0"),
+    "datetime": ("DateTime(timezone=True)", "dt.datetime", "(NOW + dt.timedelta(hours=i)).isoformat()"),
+}
 
 MODEL_TEMPLATE = """\
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, Index, func, text
 from core.basemodel import BaseModel
 
 class {ModelName}Model(BaseModel):
     __tablename__ = '{module}'
     {module}_id = Column(Integer, primary_key=True)
-    # Add your fields here
+{columns}    # Add your fields here
+{table_args}"""
+
+FILTER_INDEX_TEMPLATE = """\
+        # Lọc theo {column} trên các record chưa xoá mềm
+        Index("ix_{module}_{column}", "{column}", postgresql_where=text('"IsDeleted" = false')),
+"""
+
+SEARCH_INDEX_TEMPLATE = """\
+        # Search ILIKE '%kw%' trên {column}: GIN trigram (cần extension pg_trgm, migration đã tạo)
+        Index(
+            "ix_{module}_{column}_trgm",
+            "{column}",
+            postgresql_using="gin",
+            postgresql_ops={{"{column}": "gin_trgm_ops"}},
+            postgresql_where=text('"IsDeleted" = false'),
+        ),
 """
 
 SCHEMA_TEMPLATE = """\
@@ -22,14 +52,11 @@ import datetime as dt
 from core.core_schema import CoreSchema, CoreCreateSchema, CoreUpdateSchema
 
 class {ModelName}Create(CoreCreateSchema):
-    pass
-
+{create_fields}
 class {ModelName}Update(CoreUpdateSchema):
-    pass
-
+{update_fields}
 class {ModelName}Out(CoreSchema[int]):
-    pass
-    
+{out_fields}    
     class Config:
         from_attributes = True
 """
@@ -43,11 +70,8 @@ from core.core_service import CoreService
 
 CONTROLLER_TEMPLATE = """\
 from core.core_controller import CoreController
-from core.core_service import CoreService
-from modules.{module}.{module}_model import {ModelName}Model
 from modules.{module}.{module}_schema import {ModelName}Create, {ModelName}Update, {ModelName}Out
-
-{module}_service = CoreService({ModelName}Model)
+from modules.{module}.{module}_service import {module}_service
 
 {module}_controller = CoreController(
     service={module}_service,
@@ -56,26 +80,193 @@ from modules.{module}.{module}_schema import {ModelName}Create, {ModelName}Updat
     out_schema={ModelName}Out,
     prefix="/{module}",
     tag="{ModelName}s",
-    search_fields=[],
+    search_fields={search_fields},
+    max_page_size={max_page_size},
 )
 
 router = {module}_controller.router
 """
 
+MIGRATION_TEMPLATE = """\
+\"\"\"create {module}
+
+Revision ID: {revision}
+Revises: {down_revision}
+Create Date: {create_date}
+
+\"\"\"
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = {revision!r}
+down_revision: Union[str, Sequence[str], None] = {down_revision!r}
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    \"\"\"Upgrade schema.\"\"\"
+{upgrades}
+
+
+def downgrade() -> None:
+    \"\"\"Downgrade schema.\"\"\"
+{downgrades}
+"""
+
+BENCH_TEMPLATE = '''\
+"""
+Baseline hiệu năng + ngân sách query cho module {module} (sinh bởi generate_module.py).
+Gọi các route CoreController qua TestClient, đo thời gian và số câu SQL mỗi request;
+request nào vượt QUERY_BUDGET thì thoát với mã 1 (dùng được trong CI).
+
+Chạy với DB trong .env (đã `python migrate.py upgrade head`):
+    python benchmarks/bench_{module}.py --rows 500 --n 100
+    python benchmarks/bench_{module}.py --save      # ghi baseline vào benchmarks/baselines/{module}.json
+    python benchmarks/bench_{module}.py --compare   # so p50 với baseline đã lưu
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("QUERY_MONITOR_ENABLED", "true")
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+PREFIX = "/api/{module}"
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "{module}.json")
+NOW = dt.datetime.now(dt.timezone.utc)
+
+# Số câu SQL tối đa mỗi request (theo số câu CoreService của module sinh ra phát ra):
+# tăng lên là dấu hiệu N+1 / query thừa
+QUERY_BUDGET = {{
+    "GET /page": 1,              # SELECT trang
+    "GET /page?with_total": 3,   # SELECT trang + reltuples + COUNT / EXPLAIN (cache miss)
+    "GET /{{id}}": 1,              # SELECT theo id
+    "GET /search": 1,            # SELECT search
+    "POST": 2,                   # INSERT + SELECT refresh
+    "PUT /{{id}}": 3,              # SELECT get_by_id + UPDATE + SELECT refresh (model không có version)
+    "POST /{{id}}/clone": 1,       # INSERT ... SELECT (CTE)
+    "DELETE /{{id}}": 2,           # SELECT get_by_id + UPDATE IsDeleted
+}}
+
+
+def payload(i):
+    return {{{payload}}}
+
+
+def measure(client, method, url, n, body=None):
+    # url / body: giá trị cố định hoặc hàm nhận số thứ tự request k
+    # Số query lấy từ header X-Query-Count (QueryMonitorMiddleware đếm theo request), không đếm query
+    # của thread nền (scheduler, activity log...) chạy cùng lúc
+    times, queries, responses = [], [], []
+    for k in range(n):
+        start = time.perf_counter()
+        r = client.request(
+            method,
+            url(k) if callable(url) else url,
+            json=body(k) if callable(body) else body,
+        )
+        times.append((time.perf_counter() - start) * 1000)
+        if r.status_code >= 400:
+            raise SystemExit(f"{{method}} {{r.url}} -> {{r.status_code}}: {{r.text[:200]}}")
+        queries.append(int(r.headers["x-query-count"]))
+        responses.append(r)
+    times.sort()
+    stats = {{
+        "p50_ms": round(times[len(times) // 2], 3),
+        "p99_ms": round(times[max(int(len(times) * 0.99) - 1, 0)], 3),
+        "mean_ms": round(statistics.mean(times), 3),
+        "max_queries": max(queries),
+    }}
+    return stats, responses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500, help="số record tạo trước khi đo")
+    parser.add_argument("--n", type=int, default=100, help="số request mỗi route")
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="p50 chậm hơn baseline quá x lần là lỗi")
+    args = parser.parse_args()
+    n = min(args.n, args.rows)
+
+    results = {{}}
+    with TestClient(app) as client:
+        ids = [client.post(PREFIX, json=payload(i)).json()["data"]["{module}_id"] for i in range(args.rows)]
+        results["POST"], new = measure(client, "POST", PREFIX, n, body=lambda k: payload(args.rows + k))
+        ids += [r.json()["data"]["{module}_id"] for r in new]
+        results["GET /page"], _ = measure(client, "GET", lambda k: f"{{PREFIX}}/page?skip={{k * 10 % args.rows}}&limit=10", n)
+        results["GET /page?with_total"], _ = measure(client, "GET", f"{{PREFIX}}/page?limit=10&with_total=true", n)
+        results["GET /{{id}}"], _ = measure(client, "GET", lambda k: f"{{PREFIX}}/{{ids[k]}}", n)
+{search_case}        # Body khác giá trị lúc tạo, nếu không ORM thấy không có gì đổi và bỏ qua UPDATE
+        results["PUT /{{id}}"], _ = measure(
+            client, "PUT", lambda k: f"{{PREFIX}}/{{ids[k]}}", n, body=lambda k: payload(2 * args.rows + k)
+        )
+        results["POST /{{id}}/clone"], clones = measure(client, "POST", lambda k: f"{{PREFIX}}/{{ids[k]}}/clone", n)
+        ids += [r.json()["data"]["{module}_id"] for r in clones]
+        # Dọn dữ liệu benchmark (xoá mềm), đồng thời đo DELETE
+        results["DELETE /{{id}}"], _ = measure(client, "DELETE", lambda k: f"{{PREFIX}}/{{ids[k]}}", n)
+        for obj_id in ids[n:]:
+            client.delete(f"{{PREFIX}}/{{obj_id}}")
+
+    baseline = {{}}
+    if args.compare and os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+
+    failed = False
+    print(f"{{'route':<22}}{{'p50 ms':>9}}{{'p99 ms':>9}}{{'queries':>9}}{{'budget':>8}}{{'baseline':>10}}")
+    for route, stats in results.items():
+        budget = QUERY_BUDGET.get(route)
+        over = budget is not None and stats["max_queries"] > budget
+        base = baseline.get(route, {{}}).get("p50_ms")
+        slow = base is not None and stats["p50_ms"] > base * args.tolerance
+        failed = failed or over or slow
+        flag = " ❌ queries" if over else " ⚠️ slower" if slow else ""
+        print(
+            f"{{route:<22}}{{stats['p50_ms']:>9.2f}}{{stats['p99_ms']:>9.2f}}{{stats['max_queries']:>9}}"
+            f"{{budget if budget is not None else '-':>8}}{{base if base is not None else '-':>10}}{{flag}}"
+        )
+
+    if args.save:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline saved to {{BASELINE}}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
+'''
+
 VIEW_CONTROLLER_TEMPLATE = '''\
 from pathlib import Path
 from fastapi import APIRouter, Request
-from starlette.templating import Jinja2Templates
 from starlette.responses import HTMLResponse
+from core.templating import LazyTemplates
 
 router = APIRouter(prefix="/{module}/view", tags=["{ModelName} Views"])
 
 BASE_DIR = Path(__file__).parent
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+templates = LazyTemplates(directory=str(BASE_DIR / "templates"))
 
 @router.get("", response_class=HTMLResponse)
 def index(request: Request):
-    return templates.TemplateResponse("index.html", {{"request": request}})
+    return templates.TemplateResponse(request, "index.html", {{}})
 '''
 
 HTML_INDEX = """<!DOCTYPE html>
@@ -105,21 +296,106 @@ def ensure_modules_dir():
     if not init_file.exists():
         init_file.write_text("")
 
-def create_module(module_name: str, with_view: bool):
+def parse_fields(spec: str) -> dict:
+    """ "name:str,deadline:datetime" -> {"name": "str", "deadline": "datetime"} (mặc định str)"""
+    fields = {}
+    for item in filter(None, (x.strip() for x in spec.split(","))):
+        name, _, kind = item.partition(":")
+        kind = kind or "str"
+        if kind not in FIELD_TYPES:
+            raise SystemExit(f"❌ Unknown field type '{kind}' (supported: {', '.join(FIELD_TYPES)})")
+        fields[name] = kind
+    return fields
+
+def render_model(module_name: str, model_name: str, fields: dict, filter_cols: list, search_cols: list) -> str:
+    columns = "".join(f"    {name} = Column({FIELD_TYPES[kind][0]})\n" for name, kind in fields.items())
+    indexes = "".join(FILTER_INDEX_TEMPLATE.format(module=module_name, column=c) for c in filter_cols)
+    indexes += "".join(SEARCH_INDEX_TEMPLATE.format(module=module_name, column=c) for c in search_cols)
+    table_args = f"\n    __table_args__ = (\n{indexes}    )\n" if indexes else ""
+    return MODEL_TEMPLATE.format(ModelName=model_name, module=module_name, columns=columns, table_args=table_args)
+
+def render_schema(module_name: str, model_name: str, fields: dict) -> str:
+    create = "".join(f"    {n}: {FIELD_TYPES[k][1]}\n" for n, k in fields.items()) or "    pass\n"
+    update = "".join(f"    {n}: {FIELD_TYPES[k][1]} | None = None\n" for n, k in fields.items()) or "    pass\n"
+    out = f"    {module_name}_id: int | None = None\n"
+    out += "".join(f"    {n}: {FIELD_TYPES[k][1]} | None = None\n" for n, k in fields.items())
+    return SCHEMA_TEMPLATE.format(
+        ModelName=model_name, module=module_name, create_fields=create, update_fields=update, out_fields=out
+    )
+
+def write_migration(module_name: str, model_name: str, search_cols: list) -> Path:
+    """Sinh migration tạo bảng + index từ model vừa tạo (giống autogenerate nhưng không cần DB)."""
+    sys.path.insert(0, str(BASE_DIR))
+    from alembic.autogenerate import render_python_code
+    from alembic.config import Config
+    from alembic.operations import ops
+    from alembic.script import ScriptDirectory
+
+    model = getattr(importlib.import_module(f"modules.{module_name}.{module_name}_model"), f"{model_name}Model")
+    table = model.__table__
+    upgrade_ops = ops.UpgradeOps(ops=[
+        ops.CreateTableOp.from_table(table),
+        *(ops.CreateIndexOp.from_index(ix) for ix in sorted(table.indexes, key=lambda ix: ix.name)),
+    ])
+    upgrades = render_python_code(upgrade_ops)
+    if search_cols:
+        upgrades = 'op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")\n    ' + upgrades
+    downgrades = render_python_code(upgrade_ops.reverse())
+
+    revision = uuid.uuid4().hex[:12]
+    down_revision = ScriptDirectory.from_config(Config(str(BASE_DIR / "alembic.ini"))).get_current_head()
+    path = VERSIONS_DIR / f"{revision}_create_{module_name}.py"
+    path.write_text(MIGRATION_TEMPLATE.format(
+        module=module_name,
+        revision=revision,
+        down_revision=down_revision,
+        create_date=datetime.datetime.now(),
+        upgrades="    " + upgrades,
+        downgrades="    " + downgrades,
+    ))
+    return path
+
+def write_benchmark(module_name: str, fields: dict, search_cols: list) -> Path:
+    payload = ", ".join(f'"{n}": {FIELD_TYPES[k][2].format(module=module_name)}' for n, k in fields.items())
+    search_case = ""
+    if search_cols:
+        search_case = '        results["GET /search"], _ = measure(client, "GET", f"{PREFIX}/search?q=1", n)\n'
+    path = BENCH_DIR / f"bench_{module_name}.py"
+    path.write_text(BENCH_TEMPLATE.format(module=module_name, payload=payload, search_case=search_case))
+    return path
+
+def create_module(
+    module_name: str,
+    with_view: bool,
+    fields: dict = None,
+    filter_cols: list = (),
+    search_cols: list = (),
+    with_perf: bool = False,
+    max_page_size: int = 100,
+):
     ensure_modules_dir()
 
     model_name = module_name.capitalize()
     module_dir = MODULES_DIR / module_name
     module_dir.mkdir(exist_ok=True)
 
+    # Cột dùng để lọc / search mà chưa khai báo trong -fields thì thêm với kiểu str
+    fields = dict(fields or {})
+    for col in [*filter_cols, *search_cols]:
+        fields.setdefault(col, "str")
+
     # __init__.py cho module
     (module_dir / "__init__.py").write_text("")
 
     # Core files
-    (module_dir / f"{module_name}_model.py").write_text(MODEL_TEMPLATE.format(ModelName=model_name, module=module_name))
-    (module_dir / f"{module_name}_schema.py").write_text(SCHEMA_TEMPLATE.format(ModelName=model_name, module=module_name))
+    (module_dir / f"{module_name}_model.py").write_text(
+        render_model(module_name, model_name, fields, list(filter_cols), list(search_cols))
+    )
+    (module_dir / f"{module_name}_schema.py").write_text(render_schema(module_name, model_name, fields))
     (module_dir / f"{module_name}_service.py").write_text(SERVICE_TEMPLATE.format(ModelName=model_name, module=module_name))
-    (module_dir / f"{module_name}_controller.py").write_text(CONTROLLER_TEMPLATE.format(ModelName=model_name, module=module_name))
+    (module_dir / f"{module_name}_controller.py").write_text(CONTROLLER_TEMPLATE.format(
+        ModelName=model_name, module=module_name, search_fields=list(search_cols), max_page_size=max_page_size
+    ))
 
     # Views
     if with_view:
@@ -139,73 +415,56 @@ def create_module(module_name: str, with_view: bool):
         (templates_dir / "form.html").write_text(HTML_FORM.format(ModelName=model_name))
         (static_dir / "style.css").write_text("body { font-family: sans-serif; }")
 
-    # Update main.py (import + include router)
-    import_lines = []
-    include_lines = []
+    # Migration + benchmark/query budget: module mới có baseline hiệu năng ngay từ đầu
+    if with_perf:
+        print(f"📄 Migration: {write_migration(module_name, model_name, list(search_cols)).relative_to(BASE_DIR)}")
+        print(f"📄 Benchmark: {write_benchmark(module_name, fields, list(search_cols)).relative_to(BASE_DIR)}")
 
-    import_lines.append(f"from modules.{module_name}.{module_name}_controller import router as {module_name}_router\n")
-    include_lines.append(f"app.include_router({module_name}_router)\n")
-
-    if with_view:
-        import_lines.append(f"from modules.{module_name}.view.controller import router as {module_name}_view_router\n")
-        include_lines.append(f"app.include_router({module_name}_view_router)\n")
-
-    with open(MAIN_FILE, "r+", encoding="utf-8") as f:
-        content = f.read()
-        imports_to_add = "".join(l for l in import_lines if l not in content)
-        includes_to_add = "".join(l for l in include_lines if l not in content)
-
-        # đặt import lên đầu file
-        if imports_to_add:
-            content = imports_to_add + content
-        # thêm include xuống cuối file
-        if includes_to_add:
-            if not content.endswith("\n"):
-                content += "\n"
-            content += "\n" + includes_to_add
-
-        f.seek(0)
-        f.write(content)
-        f.truncate()
+    # Không cần sửa main.py: core.module_registry tự phát hiện router của module mới
 
 def delete_module(module_name: str):
     module_dir = MODULES_DIR / module_name
     if module_dir.exists():
         shutil.rmtree(module_dir)
         print(f"🗑️  Deleted module folder: {module_dir}")
-
-    # Xóa import và include trong main.py
-    if MAIN_FILE.exists():
-        content = MAIN_FILE.read_text(encoding="utf-8")
-
-        import_lines = [
-            f"from modules.{module_name}.{module_name}_controller import router as {module_name}_router\n",
-            f"from modules.{module_name}.view.controller import router as {module_name}_view_router\n",
-        ]
-        include_lines = [
-            f"app.include_router({module_name}_router)\n",
-            f"app.include_router({module_name}_view_router)\n",
-        ]
-
-        for line in import_lines + include_lines:
-            content = content.replace(line, "")
-
-        MAIN_FILE.write_text(content, encoding="utf-8")
-        print(f"🗑️  Removed imports and routers for '{module_name}' from main.py")
+    bench = BENCH_DIR / f"bench_{module_name}.py"
+    if bench.exists():
+        bench.unlink()
+        print(f"🗑️  Deleted benchmark: {bench}")
+    for migration in VERSIONS_DIR.glob(f"*_create_{module_name}.py"):
+        # Migration có thể đã chạy trên DB: không tự xoá
+        print(f"⚠️  Migration kept: {migration} (downgrade rồi xoá tay nếu cần)")
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
         print("Usage:")
-        print("  python generate_module.py <module_name> -view=true/false")
+        print("  python generate_module.py <module_name> -view=true/false [options]")
+        print("      -fields=name:str,deadline:datetime   (str | text | int | float | bool | datetime)")
+        print("      -filter=status,deadline              index cho cột dùng để lọc")
+        print("      -search=name,description             search_fields + index trigram")
+        print("      -perf=true                           sinh migration + benchmark/query budget")
+        print("      -max_page=100                        giới hạn limit của /page")
         print("  python generate_module.py <module_name> delete")
         sys.exit(1)
 
     module_name = sys.argv[1].lower()
     action = sys.argv[2].lower()
+    options = dict(arg.lstrip("-").partition("=")[::2] for arg in sys.argv[3:])
+
+    def csv(name):
+        return [c.strip() for c in options.get(name, "").split(",") if c.strip()]
 
     if action.startswith("-view="):
         with_view = action == "-view=true"
-        create_module(module_name, with_view)
+        create_module(
+            module_name,
+            with_view,
+            fields=parse_fields(options.get("fields", "")),
+            filter_cols=csv("filter"),
+            search_cols=csv("search"),
+            with_perf=options.get("perf", "false").lower() == "true",
+            max_page_size=int(options.get("max_page", "100")),
+        )
         print(f"✅ Module '{module_name}' created in 'modules/' with view={with_view}")
     elif action == "delete":
         delete_module(module_name)
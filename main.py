@@ -1,33 +1,43 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from sqlalchemy import text
-from starlette.staticfiles import StaticFiles
 
+from config import settings
+from core.activity_log import activity_log
+from core.admission import AdmissionControlMiddleware
+from core.health import health_checker, router as health_router
+from core.lifecycle import InFlightMiddleware, inflight
+from core.module_registry import module_registry
 from database.db import engine
+from database.query_monitor import QueryMonitorMiddleware, query_monitor
 
-from pathlib import Path
-
-from modules.todo.todo_controller import router as todos_router
-from modules.auths.auth_controller import router as auth_router
-from modules.user.user_controller import router as user_router
-
-from modules.todo.view.controller import router as todo_view_router
+# Tự phát hiện router của mọi module trong modules/ (không cần sửa file này khi thêm module)
+module_registry.discover()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- Startup ---
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-            print("✅ Database connected")
-    except Exception as e:
-        print("❌ Database connection failed:", str(e))
-        raise e
+    db = health_checker.check_now()["checks"]["db"]
+    if not db["ok"]:
+        print("❌ Database connection failed:", db["error"])
+        raise RuntimeError(db["error"])
+    print(f"✅ Database connected ({db['latency_ms']} ms)")
+    health_checker.start()
+
+    for line in module_registry.report():
+        print("📦", line)
+    module_registry.startup()
 
     yield   # 👈 chỗ này nhường cho app chạy
 
     # --- Shutdown ---
+    # Uvicorn đã ngừng nhận kết nối và chờ request đang chạy (timeout_graceful_shutdown) trước bước này
     print("👋 Shutting down app...")
+    if inflight.count:
+        print(f"⚠️ {inflight.count} request(s) still running after graceful timeout")
+    module_registry.shutdown()
+    activity_log.stop()   # ghi nốt lịch sử thay đổi còn trong buffer
+    health_checker.stop()
+    engine.dispose()
 
 app = FastAPI(
     title="My ToDo App",
@@ -37,17 +47,11 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+if settings.QUERY_MONITOR_ENABLED:
+    app.add_middleware(QueryMonitorMiddleware, monitor=query_monitor)
+app.add_middleware(InFlightMiddleware, tracker=inflight)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware, retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS)
 
-TODO_VIEW_DIR = Path(__file__).parent / "modules" / "todo" / "view"
-app.mount(
-    "/modules/todo/static",
-    StaticFiles(directory=str(TODO_VIEW_DIR / "static")),
-    name="todo_static",
-)
-
-app.include_router(todos_router)
-app.include_router(auth_router)
-app.include_router(user_router)
-
-# include router view
-app.include_router(todo_view_router)
\ No newline at end of file
+app.include_router(health_router)
+module_registry.register(app)
@@ -1,33 +1,106 @@
+import random
+import re
 import sys
 import os
+import time
 from alembic.config import Config
 from alembic import command
+from sqlalchemy.exc import OperationalError
+
+from config import settings
 
 alembic_cfg = Config("alembic.ini")
 
+# SQLSTATE 55P03 lock_not_available: hết lock_timeout khi chờ lock (vd ACCESS EXCLUSIVE của ALTER TABLE)
+_LOCK_NOT_AVAILABLE = "55P03"
+_PG_INTERVAL = re.compile(r"^\d+\s*(us|ms|s|min|h|d)?$")
+_OPTIONS = {"online", "lock_timeout", "statement_timeout", "retries", "backoff"}
+USAGE = (
+    "Usage: migrate.py [make|upgrade|downgrade] [message_or_target] "
+    "[--online] [--lock-timeout=2s] [--statement-timeout=5min] [--retries=5] [--backoff=2]"
+)
+
+
 def make_migration(msg: str):
     command.revision(alembic_cfg, message=msg, autogenerate=True)
 
-def upgrade(target="head"):
-    command.upgrade(alembic_cfg, target)
+def _is_lock_timeout(exc: Exception) -> bool:
+    return getattr(getattr(exc, "orig", None), "sqlstate", None) == _LOCK_NOT_AVAILABLE
+
+def _online(action, target, lock_timeout=None, statement_timeout=None, retries=None, backoff=None):
+    """
+    Chạy migration ở online mode: env.py đặt lock_timeout / statement_timeout cho connection và
+    commit từng revision riêng; nếu hết lock_timeout (bảng đang bận) thì chờ lũy thừa + jitter rồi
+    chạy lại từ revision đang dở, các revision đã xong không chạy lại.
+    """
+    lock_timeout = str(settings.MIGRATION_LOCK_TIMEOUT if lock_timeout is None else lock_timeout)
+    statement_timeout = str(settings.MIGRATION_STATEMENT_TIMEOUT if statement_timeout is None else statement_timeout)
+    retries = max(int(settings.MIGRATION_RETRIES if retries is None else retries), 1)
+    backoff = settings.MIGRATION_RETRY_BACKOFF_SECONDS if backoff is None else float(backoff)
+    for value in (lock_timeout, statement_timeout):
+        if not _PG_INTERVAL.match(value):
+            raise ValueError(f"Invalid timeout: {value!r} (vd 500ms, 2s, 5min)")
+
+    alembic_cfg.attributes["online"] = {"lock_timeout": lock_timeout, "statement_timeout": statement_timeout}
+    try:
+        for attempt in range(1, retries + 1):
+            try:
+                return action(alembic_cfg, target)
+            except OperationalError as e:
+                if not _is_lock_timeout(e) or attempt == retries:
+                    raise
+                wait = backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                print(f"🔒 lock_timeout ({lock_timeout}), thử lại {attempt}/{retries - 1} sau {wait:.1f}s")
+                time.sleep(wait)
+    finally:
+        alembic_cfg.attributes.pop("online", None)
 
-def downgrade(target="-1"):
-    command.downgrade(alembic_cfg, target)
+def upgrade(target="head", online=False, **online_options):
+    if online:
+        _online(command.upgrade, target, **online_options)
+    else:
+        command.upgrade(alembic_cfg, target)
+
+def downgrade(target="-1", online=False, **online_options):
+    if online:
+        _online(command.downgrade, target, **online_options)
+    else:
+        command.downgrade(alembic_cfg, target)
+
+def _parse_options(argv):
+    # --online --lock-timeout=2s --statement-timeout=5min --retries=5 --backoff=2
+    args, options = [], {}
+    for arg in argv:
+        if arg.startswith("--"):
+            name, _, value = arg[2:].partition("=")
+            name = name.replace("-", "_")
+            if name not in _OPTIONS:
+                raise ValueError(f"Unknown option: {arg}")
+            options[name] = value or True
+        else:
+            args.append(arg)
+    return args, options
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: migrate.py [make|upgrade|downgrade] [message_or_target]")
+    try:
+        args, options = _parse_options(sys.argv[1:])
+    except ValueError as e:
+        print(f"❌ {e}")
+        print(USAGE)
+        sys.exit(1)
+    if len(args) < 1:
+        print(USAGE)
         sys.exit(1)
 
-    action = sys.argv[1]
+    action = args[0]
     if action == "make":
-        msg = sys.argv[2] if len(sys.argv) > 2 else "new migration"
+        msg = args[1] if len(args) > 1 else "new migration"
         make_migration(msg)
     elif action == "upgrade":
-        target = sys.argv[2] if len(sys.argv) > 2 else "head"
-        upgrade(target)
+        target = args[1] if len(args) > 1 else "head"
+        upgrade(target, **options)
     elif action == "downgrade":
-        target = sys.argv[2] if len(sys.argv) > 2 else "-1"
-        downgrade(target)
+        target = args[1] if len(args) > 1 else "-1"
+        downgrade(target, **options)
     else:
         print("Unknown command")
@@ -4,7 +4,7 @@ import importlib
 import pkgutil
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, pool, text
 from alembic import context
 
 # Đường dẫn project (lấy folder cha của migrations/)
@@ -29,6 +29,11 @@ def import_all_models():
 
 import_all_models()
 
+# Bảng hệ thống nằm ngoài modules/
+import core.idempotency  # noqa: F401
+import core.activity_log  # noqa: F401
+import database.sharding  # noqa: F401
+
 # Đây là metadata để Alembic autogenerate schema
 target_metadata = Base.metadata
 
@@ -50,11 +55,21 @@ def run_migrations_offline():
 def run_migrations_online():
     """Chạy migration ở chế độ online (kết nối DB thật)."""
     connectable = engine
+    # Online mode (migrate.py --online): giới hạn thời gian chờ lock / chạy lệnh để migration
+    # không xếp hàng chặn traffic; mỗi revision commit riêng để lock không bị giữ qua nhiều revision
+    online = config.attributes.get("online")
 
     with connectable.connect() as connection:
+        if online:
+            connection.execute(text("SELECT set_config('lock_timeout', :v, false)"), {"v": online["lock_timeout"]})
+            connection.execute(
+                text("SELECT set_config('statement_timeout', :v, false)"), {"v": online["statement_timeout"]}
+            )
+            connection.commit()
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            transaction_per_migration=bool(online),
         )
 
         with context.begin_transaction():
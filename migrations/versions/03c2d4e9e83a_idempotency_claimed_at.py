@@ -0,0 +1,29 @@
+"""idempotency claimed_at
+
+Revision ID: 03c2d4e9e83a
+Revises: 635627e6508c
+Create Date: 2026-10-19 17:49:58.086873
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '03c2d4e9e83a'
+down_revision: Union[str, Sequence[str], None] = '635627e6508c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Cột nullable không default: chỉ sửa metadata, không rewrite bảng
+    op.add_column('idempotency_keys', sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('idempotency_keys', 'claimed_at')
@@ -0,0 +1,35 @@
+"""todo owner
+
+Revision ID: 0b07e9ee0917
+Revises: 0dd06f8c0194
+Create Date: 2026-10-19 17:34:08.420517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database.migration_ops import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b07e9ee0917'
+down_revision: Union[str, Sequence[str], None] = '0dd06f8c0194'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('todo', sa.Column('owner_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_todo_owner_id_users', 'todo', 'users', ['owner_id'], ['user_id'])
+    # Bảng todo đang có dữ liệu: build index không chặn ghi
+    create_index_concurrently('ix_todo_owner_alive_deadline', 'todo', ['owner_id', 'IsDeleted', 'deadline'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_todo_owner_alive_deadline', table_name='todo')
+    op.drop_constraint('fk_todo_owner_id_users', 'todo', type_='foreignkey')
+    op.drop_column('todo', 'owner_id')
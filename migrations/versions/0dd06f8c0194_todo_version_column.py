@@ -0,0 +1,29 @@
+"""todo version column
+
+Revision ID: 0dd06f8c0194
+Revises: 7ce344d3b1a6
+Create Date: 2026-10-19 17:20:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0dd06f8c0194'
+down_revision: Union[str, Sequence[str], None] = '7ce344d3b1a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Default hằng số: Postgres 11+ chỉ sửa metadata, không rewrite bảng
+    op.add_column('todo', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('todo', 'version')
@@ -0,0 +1,62 @@
+"""todo stats per owner
+
+Revision ID: 5b1e7c3a9d20
+Revises: 03c2d4e9e83a
+Create Date: 2026-10-19 18:05:12.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e7c3a9d20'
+down_revision: Union[str, Sequence[str], None] = '03c2d4e9e83a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS todo_stats")
+    # 1 dòng / owner (owner_key = owner_id, 0 cho todo không có owner) + 1 dòng tổng (owner_key = -1)
+    # luôn tồn tại để đọc được refreshed_at kể cả khi owner chưa có todo nào
+    op.execute("""
+        CREATE MATERIALIZED VIEW todo_stats AS
+        SELECT
+            CASE WHEN grouping(owner_id) = 1 THEN -1 ELSE coalesce(owner_id, 0) END AS owner_key,
+            count(*) FILTER (WHERE complete IS NOT TRUE) AS open,
+            count(*) FILTER (WHERE complete IS TRUE) AS completed,
+            count(*) FILTER (WHERE complete IS NOT TRUE AND deadline < now()) AS overdue,
+            count(*) FILTER (
+                WHERE complete IS NOT TRUE AND deadline >= now() AND deadline < now() + interval '7 days'
+            ) AS due_this_week,
+            now() AS refreshed_at
+        FROM todo
+        WHERE "IsDeleted" = false
+        GROUP BY GROUPING SETS ((owner_id), ())
+    """)
+    # REFRESH ... CONCURRENTLY cần 1 unique index
+    op.create_index('ix_todo_stats_owner_key', 'todo_stats', ['owner_key'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS todo_stats")
+    op.execute("""
+        CREATE MATERIALIZED VIEW todo_stats AS
+        SELECT
+            1 AS id,
+            count(*) FILTER (WHERE complete IS NOT TRUE) AS open,
+            count(*) FILTER (WHERE complete IS TRUE) AS completed,
+            count(*) FILTER (WHERE complete IS NOT TRUE AND deadline < now()) AS overdue,
+            count(*) FILTER (
+                WHERE complete IS NOT TRUE AND deadline >= now() AND deadline < now() + interval '7 days'
+            ) AS due_this_week,
+            now() AS refreshed_at
+        FROM todo
+        WHERE "IsDeleted" = false
+    """)
+    op.create_index('ix_todo_stats_id', 'todo_stats', ['id'], unique=True)
@@ -0,0 +1,43 @@
+"""todo stats materialized view
+
+Revision ID: a96892b622fe
+Revises: e06cd6a5eef9
+Create Date: 2026-10-19 10:03:47.918322
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a96892b622fe'
+down_revision: Union[str, Sequence[str], None] = 'e06cd6a5eef9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE MATERIALIZED VIEW todo_stats AS
+        SELECT
+            1 AS id,
+            count(*) FILTER (WHERE complete IS NOT TRUE) AS open,
+            count(*) FILTER (WHERE complete IS TRUE) AS completed,
+            count(*) FILTER (WHERE complete IS NOT TRUE AND deadline < now()) AS overdue,
+            count(*) FILTER (
+                WHERE complete IS NOT TRUE AND deadline >= now() AND deadline < now() + interval '7 days'
+            ) AS due_this_week,
+            now() AS refreshed_at
+        FROM todo
+        WHERE "IsDeleted" = false
+    """)
+    # REFRESH ... CONCURRENTLY cần 1 unique index
+    op.create_index('ix_todo_stats_id', 'todo_stats', ['id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS todo_stats")
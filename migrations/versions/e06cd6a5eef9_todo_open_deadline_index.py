@@ -0,0 +1,34 @@
+"""todo open deadline index
+
+Revision ID: e06cd6a5eef9
+Revises: 07a2aa0281eb
+Create Date: 2026-10-19 09:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e06cd6a5eef9'
+down_revision: Union[str, Sequence[str], None] = '07a2aa0281eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_todo_open_deadline',
+        'todo',
+        ['deadline'],
+        unique=False,
+        postgresql_where=sa.text('"IsDeleted" = false AND complete IS NOT TRUE'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todo_open_deadline', table_name='todo')
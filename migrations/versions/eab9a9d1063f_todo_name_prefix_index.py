@@ -0,0 +1,38 @@
+"""todo name prefix index
+
+Revision ID: eab9a9d1063f
+Revises: 0b07e9ee0917
+Create Date: 2026-10-19 17:52:16.904311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database.migration_ops import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'eab9a9d1063f'
+down_revision: Union[str, Sequence[str], None] = '0b07e9ee0917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # COLLATE "C": so sánh theo byte để truy vấn khoảng [prefix, prefix_next) dùng được index
+    # Build CONCURRENTLY: không chặn ghi vào todo trong lúc tạo index
+    create_index_concurrently(
+        'ix_todo_owner_name_prefix',
+        'todo',
+        ['owner_id', sa.text('lower(name) COLLATE "C"')],
+        unique=False,
+        postgresql_where=sa.text('"IsDeleted" = false'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_todo_owner_name_prefix', table_name='todo')
@@ -0,0 +1,95 @@
+# admin/admin_controller.py
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from core.activity_log import activity_log
+from core.profiler import profiler
+from core.response_schema import ResponseSchema
+from core.singleflight import singleflights
+from database.db import get_db
+from database.query_monitor import query_monitor
+from database.sharding import shard_router
+from modules.auths.auth_dependencies import require_role
+
+# Mọi route quản trị đều cần role admin.
+# Lưu ý: số liệu nằm trong từng worker process, request sẽ rơi vào worker nào thì thấy số liệu worker đó.
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_role("admin"))],
+)
+
+
+@router.get("/profiler", response_model=ResponseSchema[dict])
+def profiler_summary():
+    return ResponseSchema.success(data=profiler.summary())
+
+
+@router.put("/profiler", response_model=ResponseSchema[dict])
+def configure_profiler(
+    enabled: Optional[bool] = Body(None),
+    sample_rate: Optional[float] = Body(None, ge=0, le=1),
+    route: Optional[str] = Body(None, description='Route cần bật/tắt, vd "GET /api/todo/page"'),
+    pinned: bool = Body(True),
+):
+    if enabled is not None:
+        profiler.enabled = enabled
+    if sample_rate is not None:
+        profiler.sample_rate = sample_rate
+    if route:
+        if pinned:
+            profiler.routes.add(route)
+        else:
+            profiler.routes.discard(route)
+    return ResponseSchema.success(data=profiler.summary(), message="Profiler updated")
+
+
+@router.get("/profiler/flamegraph", response_class=PlainTextResponse)
+def download_flamegraph(route: Optional[str] = Query(None, description="Bỏ trống để gộp mọi route")):
+    filename = "profile.collapsed" if route is None else route.replace(" ", "_").replace("/", "_") + ".collapsed"
+    return PlainTextResponse(
+        profiler.collapsed(route),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.delete("/profiler", response_model=ResponseSchema[dict])
+def reset_profiler():
+    profiler.reset()
+    return ResponseSchema.success(data=profiler.summary(), message="Profiler data cleared")
+
+
+@router.get("/queries", response_model=ResponseSchema[dict])
+def query_report():
+    return ResponseSchema.success(data=query_monitor.report())
+
+
+@router.get("/singleflight", response_model=ResponseSchema[dict])
+def singleflight_stats():
+    # Số lời gọi leader / shared / timeout theo từng key của các route đọc được gộp
+    return ResponseSchema.success(data={name: sf.stats() for name, sf in singleflights.items()})
+
+
+@router.get("/activity-log/stats", response_model=ResponseSchema[dict])
+def activity_log_stats():
+    return ResponseSchema.success(data=activity_log.stats())
+
+
+@router.get("/activity-log", response_model=ResponseSchema[list])
+def activity_log_history(
+    entity: str = Query(..., description='Tên bảng, vd "todo"'),
+    entity_id: int = Query(...),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    return ResponseSchema.success(data=activity_log.history(db, entity, entity_id, limit))
+
+
+@router.get("/shards", response_model=ResponseSchema[dict])
+def shard_ring():
+    if shard_router is None:
+        return ResponseSchema.fail(message="Sharding is not enabled (SHARD_URLS)", status_code=404)
+    return ResponseSchema.success(data=shard_router.describe())
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException
 from fastapi.params import Depends
 from sqlalchemy.orm import Session
 
-from modules.auths.auth_service import verify_password, generate_token
+from modules.auths.auth_service import authenticate, generate_token
 from modules.auths.login_request_model import LoginRequest
 
 from database.db import get_db
@@ -15,8 +15,9 @@ router = APIRouter(
 @router.post('/login')
 def login(request_data: LoginRequest, db: Session = Depends(get_db)):
     print(f'[x] request_data: {request_data.__dict__}')
-    if verify_password(db, username=request_data.username, password=request_data.password):
-        token = generate_token(request_data.username, request_data.role)
+    user = authenticate(db, username=request_data.username, password=request_data.password)
+    if user:
+        token = generate_token(user.username, user.role, user.user_id)
         return {
             'token': token
         }
@@ -1,23 +1,62 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-import jwt
 
 from modules.auths.auth_service import SECRET_KEY, SECURITY_ALGORITHM
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auths/login")
 
+# Trang HTML (view/) không gửi được header Authorization: token nằm trong cookie, đặt ở /auths/view/login
+SESSION_COOKIE = "access_token"
+LOGIN_PAGE = "/auths/view/login"
+
 def get_current_user(token: str = Depends(oauth2_scheme)):
+    import jwt  # import lười: không làm chậm khởi động
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[SECURITY_ALGORITHM])
-        return payload  # {"username": ..., "role": ..., "exp": ...}
+        return payload  # {"username": ..., "role": ..., "user_id": ..., "exp": ...}
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+def get_current_user_id(user: dict = Depends(get_current_user)) -> int:
+    # Token cũ (trước khi có user_id trong payload) phải đăng nhập lại
+    user_id = user.get("user_id")
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has no user id, please log in again")
+    return user_id
+
 def require_role(required_role: str):
     def wrapper(user: dict = Depends(get_current_user)):
         if user["role"] != required_role:
             raise HTTPException(status_code=403, detail="Forbidden")
         return user
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def _decode_session(token: Optional[str]) -> Optional[dict]:
+    import jwt
+
+    if not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[SECURITY_ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+
+def get_session_user_id(request: Request) -> int:
+    """
+    Như get_current_user_id nhưng cho trang HTML: đọc token từ cookie phiên,
+    thiếu / hết hạn thì chuyển hướng (303) tới trang đăng nhập, quay lại trang hiện tại sau khi đăng nhập.
+    """
+    payload = _decode_session(request.cookies.get(SESSION_COOKIE))
+    if payload is None or payload.get("user_id") is None:
+        next_url = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+        raise HTTPException(
+            status_code=status.HTTP_303_SEE_OTHER,
+            headers={"Location": f"{LOGIN_PAGE}?{urlencode({'next': next_url})}"},
+        )
+    return payload["user_id"]
@@ -1,27 +1,31 @@
 from datetime import datetime, timedelta
-from typing import Union, Any
-from passlib.context import CryptContext
+from typing import Optional, Union, Any
 from sqlalchemy.orm import Session
 
+from core.password import get_pwd_context
 from modules.user.user_model import UserModel
 
-import jwt
-
 SECURITY_ALGORITHM = 'HS256'
 SECRET_KEY = '123456'
+TOKEN_EXPIRE_SECONDS = 60 * 60 * 24 * 3  # Expired after 3 days
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def generate_token(username: Union[str, Any], role: str, user_id: Optional[int] = None) -> str:
+    import jwt  # import lười: không làm chậm khởi động
 
-def generate_token(username: Union[str, Any], role: str) -> str:
-    expire = datetime.utcnow() + timedelta(
-        seconds=60 * 60 * 24 * 3  # Expired after 3 days
-    )
+    expire = datetime.utcnow() + timedelta(seconds=TOKEN_EXPIRE_SECONDS)
     to_encode = {
-        "exp": expire, "username": username, "role": role
+        "exp": expire, "username": username, "role": role, "user_id": user_id
     }
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=SECURITY_ALGORITHM)
     return encoded_jwt
 
+def authenticate(db: Session, username: str, password: str) -> Optional[UserModel]:
+    # Trả về user nếu đúng username/password, ngược lại None
+    user = db.query(UserModel).filter(UserModel.username == username).first()
+    if not user or not get_pwd_context().verify(password, user.password):
+        return None
+    return user
+
 def verify_password(db: Session, username: str, password: str) -> bool:
     # Tìm user trong DB
     user = db.query(UserModel).filter(UserModel.username == username).first()
@@ -29,4 +33,4 @@ def verify_password(db: Session, username: str, password: str) -> bool:
         return False
 
     # So sánh password nhập với password hash trong DB
-    return pwd_context.verify(password, user.password)
\ No newline at end of file
+    return get_pwd_context().verify(password, user.password)
\ No newline at end of file
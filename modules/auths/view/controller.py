@@ -0,0 +1,54 @@
+from pathlib import Path
+from fastapi import APIRouter, Request, Depends, Form
+from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy.orm import Session
+from config import settings
+from core.templating import LazyTemplates
+from database.db import get_db
+from modules.auths.auth_dependencies import LOGIN_PAGE, SESSION_COOKIE
+from modules.auths.auth_service import TOKEN_EXPIRE_SECONDS, authenticate, generate_token
+
+router = APIRouter(prefix="/auths/view", tags=["Auth View"])
+
+BASE_DIR = Path(__file__).parent
+templates = LazyTemplates(directory=str(BASE_DIR / "templates"))
+
+def safe_next(next_url: str) -> str:
+    # Chỉ cho quay về đường dẫn nội bộ (chặn open redirect kiểu "//evil.com")
+    if not next_url.startswith("/") or next_url.startswith("//"):
+        return "/todo/view"
+    return next_url
+
+@router.get("/login", response_class=HTMLResponse)
+def login_page(request: Request, next: str = "/todo/view"):
+    return templates.TemplateResponse(request, "login.html", {"next": safe_next(next), "error": None})
+
+@router.post("/login")
+def login_from_form(
+    request: Request,
+    db: Session = Depends(get_db),
+    username: str = Form(...),
+    password: str = Form(...),
+    next: str = Form("/todo/view"),
+):
+    user = authenticate(db, username=username, password=password)
+    if not user:
+        return templates.TemplateResponse(
+            request, "login.html", {"next": safe_next(next), "error": "Invalid username or password"}, status_code=401
+        )
+    response = RedirectResponse(url=safe_next(next), status_code=303)
+    response.set_cookie(
+        SESSION_COOKIE,
+        generate_token(user.username, user.role, user.user_id),
+        max_age=TOKEN_EXPIRE_SECONDS,
+        httponly=True,
+        samesite="lax",
+        secure=settings.AUTH_COOKIE_SECURE,
+    )
+    return response
+
+@router.post("/logout")
+def logout():
+    response = RedirectResponse(url=LOGIN_PAGE, status_code=303)
+    response.delete_cookie(SESSION_COOKIE)
+    return response
@@ -1,9 +1,18 @@
-from core.core_controller import CoreController
-from core.core_service import CoreService
-from modules.todo.todo_model import TodoModel
-from modules.todo.todo_schema import TodoCreate, TodoUpdate, TodoOut
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
 
-todo_service = CoreService(TodoModel)
+from config import settings
+from core.core_controller import CoreController
+from core.response_schema import ResponseSchema
+from core.scheduler import SSESink
+from database.db import get_db
+from modules.auths.auth_dependencies import get_current_user_id
+from modules.todo.todo_schema import TodoCreate, TodoUpdate, TodoOut, TodoStatsOut, TodoSuggestOut
+from modules.todo.todo_service import todo_service
+from modules.todo.todo_scheduler import reminder_scheduler, reminder_sink
+from modules.todo.todo_stats import todo_stats_service
+from modules.todo.todo_suggest import todo_suggest_index
 
 todo_controller = CoreController(
     service=todo_service,
@@ -12,7 +21,56 @@ todo_controller = CoreController(
     out_schema=TodoOut,
     prefix="/todo",
     tag="Todos",
-    search_fields=["name", "description"]  # hỗ trợ /todo/search?q=...
+    search_fields=["name", "description"],  # hỗ trợ /todo/search?q=...
+    owner_dependency=get_current_user_id,     # mỗi user chỉ thấy / sửa todo của mình
 )
 
-router = todo_controller.router
\ No newline at end of file
+# Các route riêng của todo, include trước CRUD để không bị "/{obj_id}" bắt mất
+extra_router = APIRouter(prefix="/api/todo", tags=["Todos"])
+
+@extra_router.get("/stats", response_model=ResponseSchema[TodoStatsOut])
+def stats(db: Session = Depends(get_db), owner_id: int = Depends(get_current_user_id)):
+    try:
+        data = todo_stats_service.get(db, owner_id)
+        return ResponseSchema.success(data=data, message="Todo stats")
+    except Exception as e:
+        return ResponseSchema.fail(message=f"Error fetching stats: {str(e)}", status_code=500)
+
+@extra_router.get("/suggest", response_model=ResponseSchema[list[TodoSuggestOut]])
+def suggest(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    owner_id: int = Depends(get_current_user_id),
+):
+    try:
+        items = todo_suggest_index.suggest(db, owner_id, prefix, limit)
+        return ResponseSchema.success(data=items, message="Suggestions")
+    except Exception as e:
+        return ResponseSchema.fail(message=f"Error suggesting: {str(e)}", status_code=500)
+
+@extra_router.get("/reminders/stream")
+async def reminders_stream(owner_id: int = Depends(get_current_user_id)):
+    if not isinstance(reminder_sink, SSESink):
+        raise HTTPException(status_code=404, detail="SSE reminders are disabled (SCHEDULER_SINK != sse)")
+    # Mỗi user chỉ nhận nhắc hạn todo của mình
+    stream = reminder_sink.subscribe(lambda event: event.payload.get("owner_id") == owner_id)
+    return StreamingResponse(stream, media_type="text/event-stream")
+
+router = APIRouter()
+router.include_router(extra_router)
+router.include_router(todo_controller.router)
+
+def on_startup():
+    if settings.SCHEDULER_ENABLED:
+        reminder_scheduler.start()
+        print("⏰ Deadline scheduler started")
+    if settings.SUGGEST_ENABLED:
+        todo_suggest_index.start()
+    if settings.STATS_REFRESH_ENABLED:
+        todo_stats_service.start()
+
+def on_shutdown():
+    reminder_scheduler.stop()
+    todo_suggest_index.stop()
+    todo_stats_service.stop()
@@ -1,11 +1,29 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, func
-from core.basemodel import BaseModel
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index, func, literal_column, text
+from core.basemodel import BaseModel, VersionedMixin
 
-class TodoModel(BaseModel):
+class TodoModel(BaseModel, VersionedMixin):
     __tablename__ = 'todo'
     todo_id = Column(Integer, primary_key=True)
     name = Column(String)
     description = Column(String)
     complete = Column(Boolean)
     deadline = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.user_id"), nullable=True)  # NULL: todo cũ chưa có chủ
 
+    __table_args__ = (
+        # Deadline của các todo còn mở, dùng cho scheduler nhắc hạn
+        Index(
+            "ix_todo_open_deadline",
+            "deadline",
+            postgresql_where=text('"IsDeleted" = false AND complete IS NOT TRUE'),
+        ),
+        # List / page / search theo từng user: chi phí theo số todo của user đó, không theo cả bảng
+        Index("ix_todo_owner_alive_deadline", "owner_id", "IsDeleted", "deadline"),
+        # Gợi ý theo tiền tố tên (fallback của /api/todo/suggest khi index trong bộ nhớ chưa sẵn sàng)
+        Index(
+            "ix_todo_owner_name_prefix",
+            "owner_id",
+            literal_column('lower(name) COLLATE "C"'),
+            postgresql_where=text('"IsDeleted" = false'),
+        ),
+    )
@@ -0,0 +1,63 @@
+import datetime
+from typing import Any, Dict, Hashable, Iterable, Tuple
+
+from sqlalchemy import select, false, true
+
+from config import settings
+from core.scheduler import AdvisoryLockLeader, DeadlineScheduler, advisory_lock_id, build_sink
+from database.db import SessionLocal, engine
+from modules.todo.todo_model import TodoModel
+from modules.todo.todo_service import todo_service
+
+# Id advisory lock dùng chung giữa các worker để chọn 1 leader phát nhắc hạn
+REMINDER_LOCK_ID = advisory_lock_id("todo.reminders")
+
+
+def _payload(todo: Any) -> Dict[str, Any]:
+    return {"todo_id": todo.todo_id, "owner_id": todo.owner_id, "name": todo.name}
+
+
+def load_upcoming(until: datetime.datetime) -> Iterable[Tuple[Hashable, datetime.datetime, Dict[str, Any]]]:
+    """
+    Nạp các todo chưa hoàn thành có deadline trong cửa sổ (dùng index ix_todo_open_deadline).
+
+    Args:
+        until (datetime): Mốc cuối cửa sổ lookahead.
+
+    Returns:
+        Iterable[Tuple]: (todo_id, deadline, payload).
+    """
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=settings.SCHEDULER_REFRESH_SECONDS)
+    stmt = (
+        select(TodoModel.todo_id, TodoModel.owner_id, TodoModel.name, TodoModel.deadline)
+        .where(
+            TodoModel.IsDeleted == false(),
+            TodoModel.complete.isnot(true()),
+            TodoModel.deadline > since,
+            TodoModel.deadline <= until,
+        )
+        .order_by(TodoModel.deadline)
+    )
+    with SessionLocal() as db:
+        return [(row.todo_id, row.deadline, _payload(row)) for row in db.execute(stmt)]
+
+
+reminder_sink = build_sink(settings.SCHEDULER_SINK, settings.SCHEDULER_WEBHOOK_URL)
+
+reminder_scheduler = DeadlineScheduler(
+    loader=load_upcoming,
+    sink=reminder_sink,
+    lookahead_seconds=settings.SCHEDULER_LOOKAHEAD_SECONDS,
+    refresh_seconds=settings.SCHEDULER_REFRESH_SECONDS,
+    leader=AdvisoryLockLeader(engine, REMINDER_LOCK_ID),
+)
+
+
+def _on_todo_write(event: str, todo: TodoModel) -> None:
+    if event == "deleted" or todo.IsDeleted or todo.complete:
+        reminder_scheduler.cancel(todo.todo_id)
+    else:
+        reminder_scheduler.schedule(todo.todo_id, todo.deadline, _payload(todo))
+
+
+todo_service.add_listener(_on_todo_write)
@@ -20,6 +20,19 @@ class TodoOut(CoreSchema[int]):
     description: str
     complete: bool = False
     deadline: dt.datetime
+    owner_id: int | None = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TodoSuggestOut(BaseModel):
+    todo_id: int
+    name: str
+
+class TodoStatsOut(BaseModel):
+    open: int
+    completed: int
+    overdue: int
+    due_this_week: int
+    refreshed_at: dt.datetime
+    age_seconds: float   # tuổi thật của số liệu lúc trả về
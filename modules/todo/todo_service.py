@@ -1,4 +1,4 @@
 from modules.todo.todo_model import TodoModel
 from core.core_service import CoreService
 
-todo_service = CoreService(TodoModel)
\ No newline at end of file
+todo_service = CoreService(TodoModel, owner_field="owner_id")
\ No newline at end of file
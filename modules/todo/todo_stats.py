@@ -0,0 +1,135 @@
+import datetime
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from core.scheduler import AdvisoryLockLeader, advisory_lock_id
+from database.db import engine
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock bầu 1 worker (leader) refresh materialized view
+STATS_REFRESH_LOCK_ID = advisory_lock_id("todo.stats_refresh")
+
+
+class TodoStatsService:
+    """
+    Đọc thống kê todo của 1 owner từ materialized view `todo_stats` (1 dòng / owner, tra theo unique index).
+
+    - Request chỉ đọc view (hoặc cache trong process theo owner), không bao giờ refresh.
+    - 1 thread nền refresh view (`REFRESH MATERIALIZED VIEW CONCURRENTLY`) mỗi `refresh_interval` giây,
+      chỉ worker giữ advisory lock (leader) mới refresh; interval luôn nhỏ hơn `max_staleness`.
+    - Refresh lỗi / chậm thì request vẫn nhận dữ liệu cũ kèm tuổi thật `age_seconds`.
+    """
+
+    def __init__(self, max_staleness: int, refresh_interval: float):
+        self.max_staleness = max_staleness
+        # Phải refresh kịp trước khi view chạm giới hạn tuổi
+        self.refresh_interval = min(refresh_interval, max_staleness / 2)
+        self.leader = AdvisoryLockLeader(engine, STATS_REFRESH_LOCK_ID)
+        self._cached: Dict[int, Tuple[Dict[str, Any], float]] = {}   # owner -> (stats, hạn cache theo monotonic)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, db: Session, owner_id: int) -> Dict[str, Any]:
+        """
+        Lấy thống kê open / completed / overdue / due_this_week của 1 owner.
+
+        Args:
+            db (Session): SQLAlchemy session.
+            owner_id (int): Id user sở hữu todo.
+
+        Returns:
+            Dict[str, Any]: Dòng thống kê kèm `refreshed_at` và `age_seconds`.
+
+        Example:
+            todo_stats_service.get(db, owner_id=current_user_id)
+        """
+        cached = self._cached.pop(owner_id, None)
+        if cached is not None and time.monotonic() < cached[1]:
+            self._cached[owner_id] = cached
+            return self._with_age(cached[0])
+        stats = self._read(db, owner_id)
+        age = self._age(stats)
+        if age < self.refresh_interval:
+            # Chỉ cache tới lượt refresh kế tiếp
+            self._cached[owner_id] = (stats, time.monotonic() + self.refresh_interval - age)
+        return self._with_age(stats)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="todo-stats-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_interval + 1)
+            self._thread = None
+        self.leader.release()
+
+    def refresh(self) -> bool:
+        """
+        Refresh view nếu đã cũ hơn nửa `refresh_interval` (leader trước có thể vừa refresh xong).
+
+        Returns:
+            bool: True nếu đã chạy REFRESH.
+        """
+        with engine.begin() as conn:
+            age = conn.execute(
+                text("SELECT extract(epoch FROM clock_timestamp() - refreshed_at) FROM todo_stats WHERE owner_key = -1")
+            ).scalar()
+            if age is not None and age < self.refresh_interval / 2:
+                return False
+            conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY todo_stats"))
+        self._cached = {}
+        return True
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if self.leader.try_acquire():
+                    self.refresh()
+            except Exception:
+                logger.exception("Refreshing todo_stats failed")
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    @staticmethod
+    def _read(db: Session, owner_id: int) -> Dict[str, Any]:
+        # Dòng tổng (owner_key = -1) luôn có, cho refreshed_at khi owner chưa có todo nào
+        rows = {
+            row["owner_key"]: dict(row)
+            for row in db.execute(
+                text(
+                    "SELECT owner_key, open, completed, overdue, due_this_week, refreshed_at"
+                    " FROM todo_stats WHERE owner_key IN (:owner, -1)"
+                ),
+                {"owner": owner_id},
+            ).mappings()
+        }
+        refreshed_at = rows[-1]["refreshed_at"] if -1 in rows else datetime.datetime.now(datetime.timezone.utc)
+        stats = rows.get(owner_id) or {"open": 0, "completed": 0, "overdue": 0, "due_this_week": 0}
+        stats = {**stats, "refreshed_at": refreshed_at}
+        stats.pop("owner_key", None)
+        return stats
+
+    @staticmethod
+    def _age(stats: Dict[str, Any]) -> float:
+        return (datetime.datetime.now(datetime.timezone.utc) - stats["refreshed_at"]).total_seconds()
+
+    def _with_age(self, stats: Dict[str, Any]) -> Dict[str, Any]:
+        return {**stats, "age_seconds": round(max(self._age(stats), 0.0), 3)}
+
+
+todo_stats_service = TodoStatsService(
+    max_staleness=settings.STATS_MAX_STALENESS_SECONDS,
+    refresh_interval=settings.STATS_REFRESH_INTERVAL_SECONDS,
+)
@@ -0,0 +1,210 @@
+import bisect
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import false, func, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from database.db import SessionLocal
+from database.sharding import route
+from modules.todo.todo_model import TodoModel
+from modules.todo.todo_service import todo_service
+
+logger = logging.getLogger(__name__)
+
+# Khoá so sánh của tên: khớp với lower("name") COLLATE "C" trong index ix_todo_owner_name_prefix
+_name_key = func.lower(TodoModel.name).collate("C")
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    # "abc" -> "abd": mọi chuỗi bắt đầu bằng "abc" nằm trong [abc, abd)
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class TodoSuggestIndex:
+    """
+    Index tiền tố trong bộ nhớ cho gợi ý tên todo (search-as-you-type).
+
+    - Mỗi owner có 1 mảng đã sắp xếp các cặp (tên viết thường, todo_id); tra cứu bằng bisect,
+      lấy k phần tử đầu tiên có cùng tiền tố: O(log n + k) trên số todo của user đó.
+    - Dựng lúc khởi động (thread nền), cập nhật tăng dần qua listener của todo_service,
+      dựng lại định kỳ để nhận thay đổi từ worker khác.
+    - Giới hạn bộ nhớ `max_entries`: vượt ngưỡng thì index chuyển về trạng thái "cold".
+      Khi cold (chưa dựng xong / quá lớn), `suggest` dùng truy vấn khoảng trên index DB
+      (owner_id, lower(name) COLLATE "C").
+    """
+
+    def __init__(self, max_entries: int, rebuild_seconds: float):
+        self.max_entries = max_entries
+        self.rebuild_seconds = rebuild_seconds
+        self.ready = False
+        self._lock = threading.Lock()
+        self._by_owner: Dict[Optional[int], List[Tuple[str, int]]] = {}
+        self._entries: Dict[int, Tuple[Optional[int], str, str]] = {}  # todo_id -> (owner_id, key, name)
+        self._build_log: Optional[List[Tuple[str, Any]]] = None  # các lần ghi xảy ra trong lúc đang build
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- dựng / cập nhật ---
+    def build(self) -> bool:
+        """
+        Dựng lại toàn bộ index từ DB.
+
+        Returns:
+            bool: True nếu index sẵn sàng, False nếu vượt `max_entries` (giữ trạng thái cold).
+        """
+        stmt = (
+            select(TodoModel.todo_id, TodoModel.owner_id, TodoModel.name)
+            .where(TodoModel.IsDeleted == false())
+            .limit(self.max_entries + 1)
+        )
+        with self._lock:
+            self._build_log = []
+        try:
+            with SessionLocal() as db:
+                rows = db.execute(stmt).all()
+        except Exception:
+            with self._lock:
+                self._build_log = None
+            raise
+        if len(rows) > self.max_entries:
+            logger.warning("Todo suggest index disabled: more than %d todos", self.max_entries)
+            with self._lock:
+                self._clear()
+                self._build_log = None
+            return False
+
+        by_owner: Dict[Optional[int], List[Tuple[str, int]]] = {}
+        entries: Dict[int, Tuple[Optional[int], str, str]] = {}
+        for todo_id, owner_id, name in rows:
+            key = (name or "").lower()
+            by_owner.setdefault(owner_id, []).append((key, todo_id))
+            entries[todo_id] = (owner_id, key, name or "")
+        for items in by_owner.values():
+            items.sort()
+        with self._lock:
+            self._by_owner, self._entries, self.ready = by_owner, entries, True
+            # Áp lại các lần ghi mà snapshot vừa đọc có thể chưa thấy
+            for event, todo in self._build_log:
+                self._apply(event, todo)
+            self._build_log = None
+        return self.ready
+
+    def _clear(self) -> None:
+        self._by_owner, self._entries, self.ready = {}, {}, False
+
+    def _remove(self, todo_id: int) -> None:
+        old = self._entries.pop(todo_id, None)
+        if old is None:
+            return
+        items = self._by_owner.get(old[0], [])
+        i = bisect.bisect_left(items, (old[1], todo_id))
+        if i < len(items) and items[i] == (old[1], todo_id):
+            del items[i]
+
+    def on_write(self, event: str, todo: Any) -> None:
+        """Listener của todo_service: giữ index đồng bộ với các lần ghi trong process này."""
+        with self._lock:
+            if self._build_log is not None:
+                self._build_log.append((event, todo))
+            self._apply(event, todo)
+
+    def _apply(self, event: str, todo: Any) -> None:
+        # Gọi khi đang giữ self._lock
+        if not self.ready:
+            return
+        self._remove(todo.todo_id)
+        if event == "deleted" or todo.IsDeleted:
+            return
+        if len(self._entries) >= self.max_entries:
+            logger.warning("Todo suggest index disabled: more than %d todos", self.max_entries)
+            self._clear()
+            return
+        name = todo.name or ""
+        key = name.lower()
+        bisect.insort(self._by_owner.setdefault(todo.owner_id, []), (key, todo.todo_id))
+        self._entries[todo.todo_id] = (todo.owner_id, key, name)
+
+    # --- tra cứu ---
+    def suggest(self, db: Session, owner_id: Optional[int], prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Gợi ý tối đa `limit` todo của owner có tên bắt đầu bằng `prefix` (không phân biệt hoa thường),
+        sắp theo tên.
+
+        Args:
+            db (Session): SQLAlchemy session (chỉ dùng khi index cold).
+            owner_id (int, optional): User sở hữu.
+            prefix (str): Tiền tố cần gợi ý.
+            limit (int): Số kết quả tối đa.
+
+        Returns:
+            List[Dict[str, Any]]: [{"todo_id": ..., "name": ...}, ...]
+
+        Example:
+            todo_suggest_index.suggest(db, owner_id=3, prefix="rep", limit=5)
+        """
+        key = prefix.lower()
+        if not key:
+            return []
+        with self._lock:
+            if self.ready:
+                items = self._by_owner.get(owner_id, [])
+                out = []
+                i = bisect.bisect_left(items, (key,))
+                while i < len(items) and len(out) < limit and items[i][0].startswith(key):
+                    todo_id = items[i][1]
+                    out.append({"todo_id": todo_id, "name": self._entries[todo_id][2]})
+                    i += 1
+                return out
+        return self._suggest_db(db, owner_id, key, limit)
+
+    def _suggest_db(self, db: Session, owner_id: Optional[int], key: str, limit: int) -> List[Dict[str, Any]]:
+        # So sánh khoảng thay cho LIKE 'x%' để plan dùng được index kể cả với prepared statement
+        route(db, owner_id)  # bật sharding: chỉ hỏi shard chứa todo của owner
+        owner_filter = TodoModel.owner_id.is_(None) if owner_id is None else TodoModel.owner_id == owner_id
+        stmt = (
+            select(TodoModel.todo_id, TodoModel.name)
+            .where(
+                owner_filter,
+                TodoModel.IsDeleted == false(),
+                _name_key >= key,
+                _name_key < _prefix_upper_bound(key),
+            )
+            .order_by(_name_key, TodoModel.todo_id)
+            .limit(limit)
+        )
+        return [{"todo_id": todo_id, "name": name} for todo_id, name in db.execute(stmt)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"ready": self.ready, "entries": len(self._entries), "owners": len(self._by_owner)}
+
+    # --- vòng đời ---
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="todo-suggest-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.build()
+            except Exception:
+                logger.exception("Building todo suggest index failed")
+            if self._stop.wait(self.rebuild_seconds):
+                return
+
+
+todo_suggest_index = TodoSuggestIndex(
+    max_entries=settings.SUGGEST_MAX_ENTRIES,
+    rebuild_seconds=settings.SUGGEST_REBUILD_SECONDS,
+)
+todo_service.add_listener(todo_suggest_index.on_write)
@@ -1,53 +1,79 @@
 from pathlib import Path
-from fastapi import APIRouter, Request, Depends, HTTPException, Form
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Request, Depends, HTTPException, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
+from config import settings
+from core.templating import FragmentCache, LazyTemplates
 from database.db import get_db
+from modules.auths.auth_dependencies import get_session_user_id
 from modules.todo.todo_service import todo_service
 
 router = APIRouter(prefix="/todo/view", tags=["Todo View"])
 
 BASE_DIR = Path(__file__).parent
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+templates = LazyTemplates(directory=str(BASE_DIR / "templates"))
+row_cache = FragmentCache(max_entries=settings.TEMPLATE_FRAGMENT_CACHE_SIZE)
+
+def render_row(t):
+    # Dòng chỉ đổi khi todo được cập nhật nên key theo (todo_id, UpdatedAt)
+    return row_cache.render(
+        (t.todo_id, t.UpdatedAt),
+        lambda: templates.get_template("_row.html").render(t=t),
+    )
 
 @router.get("", response_class=HTMLResponse)
 def list_page(
     request: Request,
     db: Session = Depends(get_db),
+    owner_id: int = Depends(get_session_user_id),
     q: str | None = None,
-    page: int = 1,
-    size: int = 10,
+    page: int = Query(1, ge=1),
+    size: int = Query(10, ge=1, le=100),
 ):
+    total, total_is_estimate = None, False
     if q:
-        items = todo_service.search(db, q, fields=["name", "description"])
+        # Kết quả search đã lọc theo từ khoá (nhỏ): đếm chính xác rồi cắt trang
+        matches = todo_service.search_rows(db, q, fields=["name", "description"], owner_id=owner_id)
+        total = len(matches)
+        items = matches[(page-1)*size : page*size]
     else:
-        items = todo_service.get_page(db, skip=(page-1)*size, limit=size)
+        items = todo_service.get_page_rows(db, skip=(page-1)*size, limit=size, owner_id=owner_id)
+        total, total_is_estimate = todo_service.count_total(
+            db, exact_threshold=settings.COUNT_EXACT_THRESHOLD, ttl=settings.COUNT_CACHE_TTL_SECONDS,
+            owner_id=owner_id,
+        )
 
-    return templates.TemplateResponse(
-        "index.html",
-        {"request": request, "items": items, "q": q, "page": page, "size": size},
-    )
+    pages = -(-total // size) if total is not None else None
+    context = {
+        "items": items, "q": q, "page": page, "size": size, "render_row": render_row,
+        "pages": pages, "total_is_estimate": total_is_estimate,
+    }
+    if len(items) > settings.TEMPLATE_STREAM_THRESHOLD:
+        return templates.StreamingTemplateResponse(request, "index.html", context)
+    return templates.TemplateResponse(request, "index.html", context)
 
 @router.get("/new", response_class=HTMLResponse)
-def new_page(request: Request):
-    return templates.TemplateResponse("form.html", {"request": request})
+def new_page(request: Request, owner_id: int = Depends(get_session_user_id)):
+    return templates.TemplateResponse(request, "form.html", {})
 
 @router.post("/new")
 def create_from_form(
     db: Session = Depends(get_db),
+    owner_id: int = Depends(get_session_user_id),
     name: str = Form(...),
     description: str = Form(""),
     complete: bool = Form(False),
     deadline: str = Form(...),  # "YYYY-MM-DDTHH:MM"
 ):
     obj = {"name": name, "description": description, "complete": complete, "deadline": deadline}
-    todo_service.create(db, obj)
+    todo_service.create(db, obj, owner_id=owner_id)
     return RedirectResponse(url="/todo/view", status_code=303)
 
 @router.get("/{todo_id}", response_class=HTMLResponse)
-def detail_page(request: Request, todo_id: int, db: Session = Depends(get_db)):
-    item = todo_service.get_by_id(db, todo_id)
+def detail_page(
+    request: Request, todo_id: int, db: Session = Depends(get_db), owner_id: int = Depends(get_session_user_id)
+):
+    item = todo_service.get_by_id_row(db, todo_id, owner_id=owner_id)
     if not item:
         raise HTTPException(status_code=404, detail="Todo not found")
-    return templates.TemplateResponse("detail.html", {"request": request, "item": item})
+    return templates.TemplateResponse(request, "detail.html", {"item": item})
@@ -0,0 +1,89 @@
+"""
+Điểm khởi chạy production, đọc cấu hình từ config.Settings (.env).
+
+    python serve.py
+
+- WORKERS > 1 và có gunicorn: gunicorn master nạp sẵn app (preload) rồi fork các worker
+  Uvicorn, các worker dùng chung bộ nhớ đã import theo copy-on-write.
+- Ngược lại: chạy thẳng uvicorn (WORKERS=1 hoặc môi trường không có fork như Windows).
+"""
+import sys
+
+from config import settings
+
+APP = "main:app"
+
+
+def run_uvicorn():
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=settings.WORKERS,
+        loop=settings.LOOP,
+        http=settings.HTTP,
+        timeout_keep_alive=settings.KEEPALIVE_SECONDS,
+        backlog=settings.BACKLOG,
+        timeout_graceful_shutdown=settings.GRACEFUL_TIMEOUT_SECONDS,
+    )
+
+
+def run_gunicorn():
+    from gunicorn.app.base import BaseApplication
+    try:
+        from uvicorn_worker import UvicornWorker
+    except ImportError:
+        from uvicorn.workers import UvicornWorker
+
+    class Worker(UvicornWorker):
+        CONFIG_KWARGS = {
+            **UvicornWorker.CONFIG_KWARGS,
+            "loop": settings.LOOP,
+            "http": settings.HTTP,
+            "timeout_graceful_shutdown": settings.GRACEFUL_TIMEOUT_SECONDS,
+        }
+
+    def post_fork(server, worker):
+        # Pool DB (nếu đã mở lúc preload) không được dùng chung giữa các process
+        from database.db import reset_engine_after_fork
+        reset_engine_after_fork()
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{settings.HOST}:{settings.PORT}",
+                "workers": settings.WORKERS,
+                "worker_class": Worker,
+                "preload_app": True,
+                "keepalive": settings.KEEPALIVE_SECONDS,
+                "backlog": settings.BACKLOG,
+                "graceful_timeout": settings.GRACEFUL_TIMEOUT_SECONDS,
+                "timeout": settings.WORKER_TIMEOUT_SECONDS,
+                "post_fork": post_fork,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    Application().run()
+
+
+if __name__ == "__main__":
+    use_gunicorn = settings.WORKERS > 1 and sys.platform != "win32"
+    if use_gunicorn:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            print("⚠️ gunicorn not installed, falling back to uvicorn (no preload)")
+            use_gunicorn = False
+
+    print(f"🚀 Serving {APP} on {settings.HOST}:{settings.PORT} with {settings.WORKERS} worker(s)")
+    if use_gunicorn:
+        run_gunicorn()
+    else:
+        run_uvicorn()
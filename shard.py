@@ -0,0 +1,67 @@
+"""
+Quản lý sharding dữ liệu todo (SHARD_URLS, xem database/sharding.py):
+    python shard.py init [--create-databases]   # tạo bảng trên shard, chia dải id, lưu ring
+    python shard.py status                      # số dòng / dòng sai shard trên từng shard
+    python shard.py add s1 [--batch-size 1000] [--pause 0] [--grace 10] [--step 8]
+    python shard.py remove s1                   # chuyển hết key của s1 sang shard khác
+    python shard.py resume                      # làm tiếp các khoảng đang chuyển dở
+"""
+import argparse
+import json
+import sys
+
+import main  # noqa: F401  (nạp mọi model vào metadata)
+from config import settings
+from database import shard_ops
+from database.sharding import shard_router
+
+
+def _move_options(args) -> dict:
+    return {"batch_size": args.batch_size, "pause": args.pause, "grace": args.grace, "step": args.step}
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Todo sharding tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    init = sub.add_parser("init")
+    init.add_argument("--create-databases", action="store_true", help="CREATE DATABASE cho shard chưa có DB")
+    sub.add_parser("status")
+    for name in ("add", "remove", "resume"):
+        cmd = sub.add_parser(name)
+        if name != "resume":
+            cmd.add_argument("shard")
+        cmd.add_argument("--batch-size", type=int, default=1000)
+        cmd.add_argument("--pause", type=float, default=0.0, help="nghỉ giữa các lô (giây)")
+        cmd.add_argument("--grace", type=float, default=None, help="chờ worker nạp ring (mặc định 2 x refresh)")
+        cmd.add_argument("--step", type=int, default=8, help="số khoảng key chuyển cùng lúc")
+    args = parser.parse_args(argv)
+
+    if shard_router is None:
+        print("SHARD_URLS is not set")
+        return 1
+    try:
+        if args.command == "init":
+            if args.create_databases:
+                shard_ops.create_databases(shard_router)
+            shard_ops.create_tables(shard_router)
+            shard_ops.align_sequences(shard_router, settings.SHARD_ID_STRIDE)
+            shard_ops.persist_ring(shard_router)
+        elif args.command == "status":
+            print(json.dumps(shard_ops.status(shard_router), indent=2, default=str))
+        elif args.command == "add":
+            # Shard mới: có bảng + dải id riêng trước khi nhận dữ liệu
+            shard_ops.create_tables(shard_router)
+            shard_ops.align_sequences(shard_router, settings.SHARD_ID_STRIDE)
+            shard_ops.add_shard(shard_router, args.shard, **_move_options(args))
+        elif args.command == "remove":
+            shard_ops.remove_shard(shard_router, args.shard, **_move_options(args))
+        elif args.command == "resume":
+            shard_ops.move_ranges(shard_router, **_move_options(args))
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())